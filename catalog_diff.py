@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Schema drift between two catalog snapshots.
+
+Snapshots store a hash per table (catalog_snapshot.table_fingerprint), so a
+diff first compares the {table id: hash} dicts of each database and only
+looks at the fields of tables whose hash differs. For those it reports added
+and removed columns, renamed columns (same field id, new name) and columns
+whose field id changed (same name, new id, as after a table is re-synced).
+
+The field and table ids that drift breaks are looked up in an inverted index
+over the cards cached in inspections/, which tells which questions need
+another look.
+"""
+
+import glob
+import json
+import os
+from collections import defaultdict
+from typing import Dict, List, Set
+
+from catalog_snapshot import snapshot_fingerprints
+from field_resolver import collect_mbql_ids
+
+INSPECTIONS_DIR = 'inspections'
+
+def diff_tables(old: Dict, new: Dict) -> Dict:
+    """Column-level changes between two versions of one table"""
+    old_by_id = {field.get('id'): field.get('name') for field in old.get('fields', [])}
+    new_by_id = {field.get('id'): field.get('name') for field in new.get('fields', [])}
+    new_by_name = {name.lower(): field_id for field_id, name in new_by_id.items() if name}
+
+    added, removed, renamed, id_changes = [], [], [], []
+    for field_id, name in old_by_id.items():
+        if field_id in new_by_id:
+            if new_by_id[field_id] != name:
+                renamed.append({"id": field_id, "old_name": name, "new_name": new_by_id[field_id]})
+        elif name and name.lower() in new_by_name and new_by_name[name.lower()] not in old_by_id:
+            id_changes.append({"name": name, "old_id": field_id, "new_id": new_by_name[name.lower()]})
+        else:
+            removed.append({"id": field_id, "name": name})
+    moved_ids = {change["new_id"] for change in id_changes}
+    for field_id, name in new_by_id.items():
+        if field_id not in old_by_id and field_id not in moved_ids:
+            added.append({"id": field_id, "name": name})
+
+    changes = {}
+    if old.get('name') != new.get('name') or old.get('schema') != new.get('schema'):
+        changes["renamed_from"] = f"{old.get('schema')}.{old.get('name')}"
+    for key, value in (("added_fields", added), ("removed_fields", removed),
+                       ("renamed_fields", renamed), ("field_id_changes", id_changes)):
+        if value:
+            changes[key] = value
+    if not changes:
+        # Same columns, different attributes (types, ...)
+        changes["attributes_changed"] = True
+    return changes
+
+def diff_snapshots(old: Dict, new: Dict) -> Dict[str, Dict]:
+    """Changed tables per database id; databases without changes are left out"""
+    old_fingerprints = snapshot_fingerprints(old)
+    new_fingerprints = snapshot_fingerprints(new)
+    drift = {}
+    for database_id in sorted(set(old_fingerprints) | set(new_fingerprints)):
+        before = old_fingerprints.get(database_id, {})
+        after = new_fingerprints.get(database_id, {})
+        if before == after:
+            continue
+        old_tables = old.get('databases', {}).get(database_id, {})
+        new_tables = new.get('databases', {}).get(database_id, {})
+
+        changed = []
+        for table_id in before.keys() & after.keys():
+            if before[table_id] != after[table_id]:
+                table = new_tables[table_id]
+                changed.append(dict({"id": table['id'], "schema": table.get('schema'), "name": table.get('name')},
+                                    **diff_tables(old_tables[table_id], table)))
+        database_drift = {
+            "added_tables": [_table_ref(new_tables[table_id]) for table_id in sorted(after.keys() - before.keys())],
+            "removed_tables": [_table_ref(old_tables[table_id]) for table_id in sorted(before.keys() - after.keys())],
+            "changed_tables": sorted(changed, key=lambda table: table['id']),
+        }
+        drift[database_id] = {key: value for key, value in database_drift.items() if value}
+    return drift
+
+def _table_ref(table: Dict) -> Dict:
+    field_ids = [field.get('id') for field in table.get('fields', [])]
+    return {"id": table.get('id'), "schema": table.get('schema'), "name": table.get('name'),
+            "fields": len(field_ids), "field_ids": field_ids}
+
+def broken_ids(drift: Dict[str, Dict]) -> Dict[str, Set[int]]:
+    """Field and table ids that references saved before the drift may still use"""
+    field_ids, table_ids = set(), set()
+    for database_drift in drift.values():
+        for table in database_drift.get('removed_tables', []):
+            table_ids.add(table['id'])
+            # Native cards reach a dropped table's columns through template tags only
+            field_ids.update(field_id for field_id in table.get('field_ids', []) if field_id is not None)
+        for table in database_drift.get('changed_tables', []):
+            if 'renamed_from' in table:
+                table_ids.add(table['id'])
+            field_ids.update(field['id'] for field in table.get('removed_fields', []))
+            field_ids.update(field['id'] for field in table.get('renamed_fields', []))
+            field_ids.update(change['old_id'] for change in table.get('field_id_changes', []))
+    return {"fields": field_ids, "tables": table_ids}
+
+class InspectionCardIndex:
+    """Field id and table id -> cards of the cached dashboard inspections"""
+
+    def __init__(self, inspections_dir: str = INSPECTIONS_DIR):
+        self.cards_by_field: Dict[int, Set[int]] = defaultdict(set)
+        self.cards_by_table: Dict[int, Set[int]] = defaultdict(set)
+        self.cards: Dict[int, Dict] = {}
+        for path in sorted(glob.glob(os.path.join(inspections_dir, 'dashboard_*_inspection.json'))):
+            with open(path, 'r') as f:
+                dashboard = json.load(f)
+            for dashcard in dashboard.get('dashcards', []):
+                card = dashcard.get('card') or {}
+                card_id = card.get('id')
+                if not card_id:
+                    continue
+                entry = self.cards.setdefault(card_id, {"id": card_id, "name": card.get('name'), "dashboards": []})
+                if dashboard.get('id') not in entry["dashboards"]:
+                    entry["dashboards"].append(dashboard.get('id'))
+                field_ids, table_ids = collect_mbql_ids([card.get('dataset_query'), card.get('result_metadata'),
+                                                         dashcard.get('parameter_mappings')])
+                if card.get('table_id'):
+                    table_ids.add(card['table_id'])
+                for field_id in field_ids:
+                    self.cards_by_field[field_id].add(card_id)
+                for table_id in table_ids:
+                    self.cards_by_table[table_id].add(card_id)
+
+    def affected_cards(self, field_ids: Set[int], table_ids: Set[int]) -> List[Dict]:
+        """Cards referencing any of the ids, with the ids each one references"""
+        hits = defaultdict(lambda: {"fields": set(), "tables": set()})
+        for field_id in field_ids:
+            for card_id in self.cards_by_field.get(field_id, ()):
+                hits[card_id]["fields"].add(field_id)
+        for table_id in table_ids:
+            for card_id in self.cards_by_table.get(table_id, ()):
+                hits[card_id]["tables"].add(table_id)
+        return [
+            dict(self.cards[card_id], fields=sorted(refs["fields"]), tables=sorted(refs["tables"]))
+            for card_id, refs in sorted(hits.items())
+        ]
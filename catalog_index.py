@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Hash index over a database's table catalog.
+
+StarRocks tables are named <SCHEMA>__<TABLE> after the Exasol schema they were
+migrated from, or carry the bare Exasol table name. Looking an Exasol table up
+by scanning the whole StarRocks catalog (and splitting every name on "__") for
+each of the Exasol tables makes the mapping build O(N x M). The index is built
+once per catalog and answers the same question with dictionary lookups.
+
+The same pass indexes tables by id and name and each table's fields by id and
+lower-cased name, so column mapping is a key-set intersection per table pair.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+class CatalogIndex:
+    """Tables and fields of one metadata payload, keyed for the mapping builders.
+
+    Lookups return the same table a linear scan in metadata order would find
+    first, so results do not change when the index replaces a scan.
+    """
+
+    def __init__(self, metadata: Dict):
+        self.tables: List[Dict] = metadata.get('tables', [])
+        self._position: Dict[int, int] = {}
+        self.by_prefix_and_base: Dict[Tuple[str, str], Dict] = {}
+        self.by_base: Dict[str, Dict] = {}
+        self.by_bare_name: Dict[str, Dict] = {}
+        self.by_id: Dict[int, Dict] = {}
+        self.by_name: Dict[str, Dict] = {}
+        self.by_schema_and_name: Dict[Tuple[str, str], Dict] = {}
+        self.field_by_id: Dict[int, Dict] = {}
+        self._fields_by_name: Dict[int, Dict[str, Dict]] = {}
+
+        for position, table in enumerate(self.tables):
+            self._position[id(table)] = position
+            name = table.get('name', '')
+            self.by_id.setdefault(table.get('id'), table)
+            self.by_name.setdefault(name, table)
+            self.by_schema_and_name.setdefault(((table.get('schema') or '').lower(), name.lower()), table)
+
+            fields = {}
+            for field in table.get('fields', []):
+                self.field_by_id[field.get('id')] = field
+                # Later duplicates win, as they did in the per-table column dicts
+                fields[field.get('name', '').lower()] = field
+            self._fields_by_name[id(table)] = fields
+
+            if '__' in name:
+                prefix, base_name = name.split('__', 1)
+                self.by_prefix_and_base.setdefault((prefix.upper(), base_name.upper()), table)
+                self.by_base.setdefault(base_name.upper(), table)
+            else:
+                self.by_bare_name.setdefault(name.upper(), table)
+
+    def find_table_with_prefix(self, table_name: str, schema: Optional[str] = None) -> Optional[Dict]:
+        """Find the table for an Exasol table, preferring the schema prefix if given"""
+        if schema is None:
+            prefixed = self.by_base.get(table_name.upper())
+        else:
+            prefixed = self.by_prefix_and_base.get((schema.upper(), table_name.upper()))
+        bare = self.by_bare_name.get(table_name.upper())
+        if prefixed is None or bare is None:
+            return prefixed or bare
+        # Both kinds match: the first one in catalog order wins, as in a scan
+        return min(prefixed, bare, key=lambda table: self._position[id(table)])
+
+    def table_by_schema_and_name(self, schema: Optional[str], name: str) -> Optional[Dict]:
+        """Case-insensitive lookup of a table by schema and name"""
+        return self.by_schema_and_name.get(((schema or '').lower(), name.lower()))
+
+    def fields_by_name(self, table: Dict) -> Dict[str, Dict]:
+        """Fields of an indexed table keyed by lower-cased name"""
+        return self._fields_by_name.get(id(table), {})
+
+def map_columns_by_name(source_index: CatalogIndex, source_table: Dict,
+                        target_index: CatalogIndex, target_table: Dict) -> Dict[str, int]:
+    """Map source field ids to target field ids for columns both tables share"""
+    source_fields = source_index.fields_by_name(source_table)
+    target_fields = target_index.fields_by_name(target_table)
+    shared = source_fields.keys() & target_fields.keys()
+    # Keep the source column order so the mapping file diffs cleanly
+    return {
+        str(field.get('id')): target_fields[name].get('id')
+        for name, field in source_fields.items() if name in shared
+    }
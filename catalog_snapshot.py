@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Stored catalog snapshot for incremental metadata refreshes.
+
+A full rebuild of migration_mapping.json streams the metadata of both databases.
+The slim tables it used are saved to migrations/catalog_snapshot.json. The next
+refresh lists each database's tables (without fields), compares every table's
+updated_at with the snapshot and refetches only new or changed tables through
+/api/table/{id}/query_metadata. A refetched table counts as changed only if its
+name, schema or fields differ, since a sync bumps updated_at on its own.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+from metadata_stream import slim_table
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FILE = 'migrations/catalog_snapshot.json'
+# Bumped when slim tables gain attributes; older snapshots need a full rebuild
+SNAPSHOT_VERSION = 2
+
+def mapping_fingerprint(table: Dict) -> Tuple:
+    """What the mappings depend on: name, schema and the (id, name) of every field"""
+    fields = tuple((field.get('id'), field.get('name')) for field in table.get('fields', []))
+    return (table.get('name'), table.get('schema'), len(fields), fields)
+
+def table_fingerprint(table: Dict) -> str:
+    """Hash of everything a slim table carries except its sync timestamp"""
+    content = {key: value for key, value in table.items() if key != 'updated_at'}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode()).hexdigest()
+
+def snapshot_fingerprints(snapshot: Dict) -> Dict[str, Dict[str, str]]:
+    """Per-table fingerprints of a snapshot, read from it if it stores them"""
+    stored = snapshot.get('fingerprints') or {}
+    return {
+        database_id: stored.get(database_id) or {table_id: table_fingerprint(table) for table_id, table in tables.items()}
+        for database_id, tables in snapshot.get('databases', {}).items()
+    }
+
+def snapshot_from_metadata(metadata_by_database: Dict[int, Dict]) -> Dict:
+    """Build a snapshot from slim metadata payloads keyed by database id"""
+    return {
+        "version": SNAPSHOT_VERSION,
+        "created_at": datetime.now().isoformat(),
+        "databases": {
+            str(database_id): {str(table['id']): table for table in metadata.get('tables', [])}
+            for database_id, metadata in metadata_by_database.items()
+        }
+    }
+
+def metadata_from_snapshot(snapshot: Dict, database_id: int) -> Dict:
+    """Rebuild a slim metadata payload for one database from a snapshot"""
+    tables = snapshot.get('databases', {}).get(str(database_id), {})
+    return {"id": database_id, "tables": list(tables.values())}
+
+def load_snapshot(path: str = SNAPSHOT_FILE) -> Optional[Dict]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_snapshot(snapshot: Dict, path: str = SNAPSHOT_FILE):
+    """Write a snapshot atomically, with per-table fingerprints for catalog_diff"""
+    snapshot = dict(snapshot, fingerprints={
+        database_id: {table_id: table_fingerprint(table) for table_id, table in tables.items()}
+        for database_id, tables in snapshot.get('databases', {}).items()
+    })
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+def list_database_tables(migrator, database_id: int) -> Optional[list]:
+    """List a database's tables without their fields"""
+    response = migrator.session.get(
+        urljoin(migrator.config.base_url, f"/api/database/{database_id}"),
+        params={"include": "tables"},
+        headers={"X-Metabase-Session": migrator.session_token}
+    )
+    if response.status_code != 200:
+        logger.error(f"Failed to list tables of database {database_id}: {response.status_code}")
+        return None
+    return response.json().get('tables', [])
+
+def fetch_table_metadata(migrator, table_id: int) -> Optional[Dict]:
+    """Fetch one table with its fields, as a slim table"""
+    response = migrator.session.get(
+        urljoin(migrator.config.base_url, f"/api/table/{table_id}/query_metadata"),
+        headers={"X-Metabase-Session": migrator.session_token}
+    )
+    if response.status_code != 200:
+        logger.error(f"Failed to fetch metadata for table {table_id}: {response.status_code}")
+        return None
+    return slim_table(response.json())
+
+def plan_refresh(snapshot: Dict, database_id: int, listed: list) -> Tuple[Dict, list]:
+    """Split a table listing into snapshot tables that are still current and ids to refetch.
+
+    The returned tables dict follows the listing order, with None for the
+    tables to refetch, so the catalog order survives the refresh.
+    """
+    known = snapshot.get('databases', {}).get(str(database_id), {})
+    tables, stale = {}, []
+    for table in listed:
+        previous = known.get(str(table['id']))
+        if previous is not None and table.get('updated_at') and previous.get('updated_at') == table.get('updated_at'):
+            tables[str(table['id'])] = previous
+        else:
+            tables[str(table['id'])] = None
+            stale.append(table['id'])
+    return tables, stale
+
+def apply_refetched(snapshot: Dict, database_id: int, tables: Dict,
+                    fetched: Dict[int, Optional[Dict]]) -> Tuple[Dict, Set[str], Set[str]]:
+    """Merge refetched tables (None where the fetch failed) into the current ones"""
+    known = snapshot.get('databases', {}).get(str(database_id), {})
+    changed = set()
+    for table_id, table in fetched.items():
+        table_id = str(table_id)
+        previous = known.get(table_id)
+        if table is None:
+            # Keep what we had rather than dropping the table's mappings
+            if previous is not None:
+                tables[table_id] = previous
+            else:
+                tables.pop(table_id, None)
+            continue
+        tables[table_id] = table
+        if previous is None or mapping_fingerprint(previous) != mapping_fingerprint(table):
+            changed.add(table_id)
+
+    removed = set(known) - set(tables)
+    return tables, changed, removed
+
+def refresh_database(migrator, snapshot: Dict, database_id: int) -> Optional[Tuple[Dict, Set[str], Set[str]]]:
+    """Bring one database of the snapshot up to date.
+
+    Returns (tables, changed, removed): the refreshed {table id: slim table}
+    dict, the ids of tables that are new or whose fields changed, and the ids
+    of tables that no longer exist. Returns None if the table list cannot be
+    fetched. Tables are refetched one at a time; metadata_harvester does the
+    same for several databases concurrently.
+    """
+    listed = list_database_tables(migrator, database_id)
+    if listed is None:
+        return None
+
+    tables, stale = plan_refresh(snapshot, database_id, listed)
+    fetched = {table_id: fetch_table_metadata(migrator, table_id) for table_id in stale}
+    return apply_refetched(snapshot, database_id, tables, fetched)
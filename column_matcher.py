@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Ranked fuzzy matches for the columns the exact-name mapping leaves unmapped.
+
+create_column_mapping_for_all_tables maps a column only when the lower-cased
+names are equal. Renamed columns (a dropped prefix, an added _EUR suffix)
+drop out of the mapping and end up fixed by hand. The matcher suggests
+candidates for them without comparing every pair of columns:
+
+- each unmapped target column is posted under its character trigrams and its
+  name tokens, per table (blocking)
+- a query only looks at target columns of the mapped table that share a
+  trigram or token with it; grams posted for most of a large table's columns
+  carry no signal and are not used to find candidates
+- candidates are scored exactly: trigram Dice blended with token overlap, so
+  AMOUNT -> amount_eur scores well and AMOUNT -> discount does not
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+from catalog_index import CatalogIndex
+
+# Grams shared by more than this share of a table's columns (once the table has
+# at least MIN_BLOCK_SIZE of them) are too common to be used for blocking
+MAX_POSTING_SHARE = 0.5
+MIN_BLOCK_SIZE = 20
+
+_TOKEN_SPLIT = re.compile(r'[^0-9a-zA-Z]+|(?<=[a-z])(?=[A-Z])|(?<=[a-zA-Z])(?=[0-9])|(?<=[0-9])(?=[a-zA-Z])')
+
+def name_tokens(name: str) -> Tuple[str, ...]:
+    """Lower-cased word tokens of a column name: 'avgTurnover_EUR2' -> ('avg', 'turnover', 'eur', '2')"""
+    return tuple(token.lower() for token in _TOKEN_SPLIT.split(name or '') if token)
+
+def name_trigrams(tokens: Tuple[str, ...]) -> Set[str]:
+    """Character trigrams of the normalized name, padded so short names have some"""
+    text = f"#{'_'.join(tokens)}#"
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+def similarity(source: Tuple[Set[str], Set[str]], target: Tuple[Set[str], Set[str]]) -> float:
+    """Score two (token set, trigram set) pairs between 0 and 1"""
+    source_tokens, source_grams = source
+    target_tokens, target_grams = target
+    if not source_grams or not target_grams:
+        return 0.0
+    dice = 2 * len(source_grams & target_grams) / (len(source_grams) + len(target_grams))
+    shared = len(source_tokens & target_tokens)
+    token_score = 0.0
+    if source_tokens and target_tokens:
+        # Containment rewards added or dropped prefixes and suffixes
+        jaccard = shared / len(source_tokens | target_tokens)
+        containment = shared / min(len(source_tokens), len(target_tokens))
+        token_score = (jaccard + containment) / 2
+    return 0.5 * dice + 0.5 * token_score
+
+def confidence(score: float) -> str:
+    if score >= 0.8:
+        return "high"
+    if score >= 0.65:
+        return "medium"
+    return "low"
+
+class ColumnIndex:
+    """Inverted trigram/token index over column names, grouped by table"""
+
+    def __init__(self):
+        self._postings: Dict[Tuple[Hashable, str], List[Hashable]] = defaultdict(list)
+        self._columns: Dict[Hashable, Tuple[str, Set[str], Set[str]]] = {}
+        self._group_sizes: Dict[Hashable, int] = defaultdict(int)
+
+    def add(self, key: Hashable, name: str, group: Hashable = None):
+        tokens = name_tokens(name)
+        grams = name_trigrams(tokens)
+        self._columns[key] = (name, set(tokens), grams)
+        self._group_sizes[group] += 1
+        for gram in grams | {f"t:{token}" for token in tokens}:
+            self._postings[(group, gram)].append(key)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def candidates(self, name: str, group: Hashable = None, limit: int = 3,
+                   min_score: float = 0.5) -> List[Tuple[Hashable, str, float]]:
+        """Best (key, name, score) matches for a name within a group, best first"""
+        tokens = name_tokens(name)
+        grams = name_trigrams(tokens)
+        token_set = set(tokens)
+        max_postings = max(MIN_BLOCK_SIZE, MAX_POSTING_SHARE * self._group_sizes.get(group, 0))
+        keys = set()
+        for gram in grams | {f"t:{token}" for token in tokens}:
+            posting = self._postings.get((group, gram))
+            if posting and len(posting) <= max_postings:
+                keys.update(posting)
+
+        scored = []
+        for key in keys:
+            target_name, target_tokens, target_grams = self._columns[key]
+            score = similarity((token_set, grams), (target_tokens, target_grams))
+            if score >= min_score:
+                scored.append((key, target_name, round(score, 3)))
+        scored.sort(key=lambda match: (-match[2], str(match[1])))
+        return scored[:limit]
+
+def suggest_column_matches(exasol_metadata: Dict, starrocks_metadata: Dict, table_mapping: Dict[str, str],
+                           column_mapping: Dict[str, int], limit: int = 3, min_score: float = 0.5,
+                           exasol_index: Optional[CatalogIndex] = None,
+                           starrocks_index: Optional[CatalogIndex] = None) -> List[Dict]:
+    """Ranked StarRocks candidates for every unmapped Exasol column of a mapped table.
+
+    Only StarRocks columns that nothing is mapped to yet are considered, and
+    only within the StarRocks table the Exasol table is mapped to.
+    """
+    exasol_index = exasol_index or CatalogIndex(exasol_metadata)
+    starrocks_index = starrocks_index or CatalogIndex(starrocks_metadata)
+    mapped_targets = set(column_mapping.values())
+
+    # One index over the unmapped columns of every mapped StarRocks table
+    index = ColumnIndex()
+    for starrocks_name in set(table_mapping.values()):
+        starrocks_table = starrocks_index.by_name.get(starrocks_name)
+        if not starrocks_table:
+            continue
+        for field in starrocks_table.get('fields', []):
+            if field.get('id') not in mapped_targets:
+                index.add(field.get('id'), field.get('name', ''), group=starrocks_name)
+
+    suggestions = []
+    for exasol_full, starrocks_name in table_mapping.items():
+        schema, _, name = exasol_full.rpartition('.')
+        exasol_table = exasol_index.table_by_schema_and_name(schema, name)
+        if not exasol_table:
+            continue
+        for field in exasol_table.get('fields', []):
+            if str(field.get('id')) in column_mapping:
+                continue
+            matches = index.candidates(field.get('name', ''), group=starrocks_name, limit=limit, min_score=min_score)
+            if not matches:
+                continue
+            suggestions.append({
+                "exasol_field_id": field.get('id'),
+                "exasol_table": exasol_full,
+                "exasol_column": field.get('name'),
+                "starrocks_table": starrocks_name,
+                "candidates": [
+                    {"starrocks_field_id": key, "starrocks_column": target_name,
+                     "score": score, "confidence": confidence(score)}
+                    for key, target_name, score in matches
+                ]
+            })
+    suggestions.sort(key=lambda suggestion: -suggestion["candidates"][0]["score"])
+    return suggestions
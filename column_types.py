@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Column type index built from the base_type/database_type Metabase reports for
+every field.
+
+The slim tables of the catalog snapshot keep both attributes. The index tells,
+by field id or by table and column name, which type family a column has, so
+conversions cast only where the Exasol and StarRocks families differ instead
+of wrapping every NULLIF and ratio in cast(... as float), and can warn when a
+DECIMAL would end up as FLOAT/DOUBLE.
+
+Families: integer, decimal, float, text, temporal, boolean (None if unknown).
+Exasol stores integers as DECIMAL(p,0), which counts as integer.
+"""
+
+import hashlib
+import json
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+BASE_TYPE_FAMILIES = {
+    "type/Integer": "integer",
+    "type/BigInteger": "integer",
+    "type/Decimal": "decimal",
+    "type/Float": "float",
+    "type/Text": "text",
+    "type/Boolean": "boolean",
+    "type/Date": "temporal",
+    "type/DateTime": "temporal",
+    "type/DateTimeWithTZ": "temporal",
+    "type/DateTimeWithLocalTZ": "temporal",
+    "type/Time": "temporal",
+}
+
+DATABASE_TYPE_FAMILIES = (
+    (re.compile(r'^(DECIMAL|NUMERIC|NUMBER)\s*\(\s*\d+\s*,\s*0\s*\)', re.IGNORECASE), "integer"),
+    (re.compile(r'^(DECIMAL|NUMERIC|NUMBER|DECIMALV3|DECIMAL32|DECIMAL64|DECIMAL128)', re.IGNORECASE), "decimal"),
+    (re.compile(r'^(TINYINT|SMALLINT|INT|INTEGER|BIGINT|LARGEINT)', re.IGNORECASE), "integer"),
+    (re.compile(r'^(FLOAT|DOUBLE|REAL)', re.IGNORECASE), "float"),
+    (re.compile(r'^(CHAR|VARCHAR|STRING|TEXT)', re.IGNORECASE), "text"),
+    (re.compile(r'^(DATE|DATETIME|TIMESTAMP)', re.IGNORECASE), "temporal"),
+    (re.compile(r'^(BOOLEAN|BOOL)', re.IGNORECASE), "boolean"),
+)
+
+def type_family(base_type: Optional[str], database_type: Optional[str] = None) -> Optional[str]:
+    """Type family of a column; the database type wins since it sees DECIMAL(18,0)"""
+    for pattern, family in DATABASE_TYPE_FAMILIES:
+        if database_type and pattern.match(database_type.strip()):
+            return family
+    return BASE_TYPE_FAMILIES.get(base_type)
+
+class TypeIndex:
+    """Type families of one catalog by field id and by (table, column) name"""
+
+    def __init__(self, metadata: Dict):
+        self.by_field_id: Dict[int, Dict] = {}
+        self.by_table_and_column: Dict[tuple, str] = {}
+        self.by_column: Dict[str, Set[str]] = defaultdict(set)
+        for table in metadata.get('tables', []):
+            table_name = (table.get('name') or '').lower()
+            for field in table.get('fields', []):
+                family = type_family(field.get('base_type'), field.get('database_type'))
+                self.by_field_id[field.get('id')] = {
+                    "family": family, "base_type": field.get('base_type'), "database_type": field.get('database_type')
+                }
+                if family:
+                    column = (field.get('name') or '').lower()
+                    self.by_table_and_column[(table_name, column)] = family
+                    self.by_column[column].add(family)
+        self._fingerprint = None
+
+    def __bool__(self):
+        return bool(self.by_field_id)
+
+    def fingerprint(self) -> str:
+        """Hash of the name lookups conversions use, for keying cached conversions"""
+        if self._fingerprint is None:
+            entries = sorted([table, column, family] for (table, column), family in self.by_table_and_column.items())
+            self._fingerprint = hashlib.sha256(json.dumps(entries).encode('utf-8')).hexdigest()
+        return self._fingerprint
+
+    def field_family(self, field_id) -> Optional[str]:
+        return (self.by_field_id.get(field_id) or {}).get("family")
+
+    def base_type(self, field_id) -> Optional[str]:
+        return (self.by_field_id.get(field_id) or {}).get("base_type")
+
+    def column_family(self, column: str, tables: Iterable[str] = ()) -> Optional[str]:
+        """Family of a column name, looked up in the given tables first.
+
+        Returns None if the name is unknown or its tables disagree.
+        """
+        column = column.lower()
+        families = {self.by_table_and_column[(table.lower(), column)] for table in tables
+                    if (table.lower(), column) in self.by_table_and_column}
+        if not families:
+            families = self.by_column.get(column, set())
+        return next(iter(families)) if len(families) == 1 else None
+
+_AGGREGATE = re.compile(r'^(sum|min|max|avg|count)\s*\((.*)\)$', re.IGNORECASE | re.DOTALL)
+_IDENTIFIER = re.compile(r'^(?:[A-Za-z_]\w*\.)?"?([A-Za-z_]\w*)"?$')
+_INTEGER_LITERAL = re.compile(r'^\d+$')
+_DECIMAL_LITERAL = re.compile(r'^\d*\.\d+$')
+
+def expression_family(expression: str, index: TypeIndex, tables: Iterable[str] = ()) -> Optional[str]:
+    """Type family of a simple SQL expression: a column, a literal, or an aggregate of one"""
+    expression = expression.strip()
+    match = _AGGREGATE.match(expression)
+    if match:
+        function, argument = match.group(1).lower(), match.group(2).strip()
+        if function == 'count':
+            return "integer"
+        if function == 'avg':
+            return "float"
+        if argument.lower().startswith('distinct '):
+            argument = argument[len('distinct '):]
+        return expression_family(argument, index, tables)
+    if _INTEGER_LITERAL.match(expression):
+        return "integer"
+    if _DECIMAL_LITERAL.match(expression):
+        return "decimal"
+    match = _IDENTIFIER.match(expression)
+    if match and index:
+        return index.column_family(match.group(1), tables)
+    return None
+
+def type_mismatches(source: TypeIndex, target: TypeIndex, column_mapping: Dict[str, int]) -> List[Dict]:
+    """Mapped columns whose type family differs, with lossy DECIMAL -> FLOAT marked"""
+    mismatches = []
+    for source_id, target_id in column_mapping.items():
+        source_family = source.field_family(int(source_id))
+        target_family = target.field_family(target_id)
+        if source_family and target_family and source_family != target_family:
+            mismatches.append({
+                "exasol_field_id": int(source_id),
+                "starrocks_field_id": target_id,
+                "exasol_type": source.by_field_id[int(source_id)]["database_type"] or source_family,
+                "starrocks_type": target.by_field_id[target_id]["database_type"] or target_family,
+                "lossy": source_family == "decimal" and target_family == "float",
+            })
+    return mismatches
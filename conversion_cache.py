@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of converted card SQL.
+
+Many cards share their SQL (duplicated dashboards, "- Duplicate" cards), and a
+conversion depends on nothing but:
+
+- the source SQL
+- the conversion context: the table mapping, the StarRocks column types, the
+  conversion mode and the rule set (the source code of the converting modules
+  and functions, and the settings they read)
+- the card's visualization columns
+
+Each converted SQL is stored in SQLite under the hashes of those three, with
+the diagnostics printed while converting it. Nothing has to be invalidated by
+hand: a changed mapping, snapshot or rule gives another context hash, so the
+old entries are no longer found, and the least recently used entries beyond
+max_entries are pruned when the cache is opened.
+
+    context = fingerprint(rules, table_mapping, column_types.fingerprint(), mode)
+    cached = cache.get(sql, columns, context)       # (converted_sql, diagnostics) or None
+    cache.store(sql, columns, context, converted_sql, diagnostics)
+"""
+
+import atexit
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from config import CONVERSION_CACHE_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Relative cache paths are relative to the repository, not to the directory a script is started from
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversions (
+    sql_hash TEXT NOT NULL,
+    context_hash TEXT NOT NULL,
+    columns_hash TEXT NOT NULL,
+    converted_sql TEXT NOT NULL,
+    diagnostics TEXT NOT NULL,    -- JSON list of the messages printed while converting
+    used_at REAL NOT NULL,
+    PRIMARY KEY (sql_hash, context_hash, columns_hash)
+);
+CREATE INDEX IF NOT EXISTS conversions_used_at ON conversions (used_at);
+"""
+
+def fingerprint(*parts) -> str:
+    """SHA-256 of the parts; modules and functions are hashed by their source code"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if inspect.ismodule(part) or inspect.isroutine(part) or inspect.isclass(part):
+            part = inspect.getsource(part)
+        elif not isinstance(part, str):
+            part = json.dumps(part, sort_keys=True, default=str)
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+class ConversionCache:
+    """SQLite table of converted SQL keyed by source SQL, context and columns"""
+
+    def __init__(self, path: str = CONVERSION_CACHE_SETTINGS["path"],
+                 max_entries: int = CONVERSION_CACHE_SETTINGS["max_entries"]):
+        self.path = path if path == ":memory:" else os.path.join(BASE_DIR, path)
+        self.hits = 0
+        self.misses = 0
+        self._used = set()  # keys read since the last write; their used_at is bumped in batches
+        directory = os.path.dirname(self.path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        # Shared by the migrator's worker threads; every access holds the lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._conn:
+            # Entries can always be converted again, so a commit need not reach the disk
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.execute(
+                "DELETE FROM conversions WHERE rowid NOT IN "
+                "(SELECT rowid FROM conversions ORDER BY used_at DESC LIMIT ?)", (max_entries,))
+
+    @staticmethod
+    def key(sql: str, columns: Iterable[str], context: str) -> Tuple[str, str, str]:
+        """(sql hash, context, columns hash); the columns are a set (callers pass one,
+        and set order changes with PYTHONHASHSEED), so they are hashed sorted"""
+        return fingerprint(sql), context, fingerprint(sorted({column for column in columns if column}))
+
+    def get(self, sql: str, columns: Iterable[str], context: str) -> Optional[Tuple[str, List[str]]]:
+        """The converted SQL and its diagnostics, if this conversion was done before"""
+        key = self.key(sql, columns, context)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT converted_sql, diagnostics FROM conversions "
+                "WHERE sql_hash = ? AND context_hash = ? AND columns_hash = ?", key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._used.add(key)
+        return row[0], json.loads(row[1])
+
+    def store(self, sql: str, columns: Iterable[str], context: str, converted_sql: str, diagnostics: List[str]):
+        """Remember a conversion"""
+        try:
+            with self._lock, self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO conversions VALUES (?, ?, ?, ?, ?, ?)",
+                                   (*self.key(sql, columns, context), converted_sql, json.dumps(diagnostics),
+                                    time.time()))
+                self._flush_used()
+        except sqlite3.Error as e:
+            # A cache that cannot be written only costs the next run a conversion
+            logger.warning(f"Could not cache SQL conversion in {self.path}: {e}")
+
+    def _flush_used(self):
+        if self._used:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE conversions SET used_at = ? WHERE sql_hash = ? AND context_hash = ? AND columns_hash = ?",
+                [(now, *key) for key in self._used])
+            self._used.clear()
+
+    def flush(self):
+        """Write the last-used times of the entries read since the last write"""
+        try:
+            with self._lock, self._conn:
+                self._flush_used()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not update {self.path}: {e}")
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM conversions")
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._conn.close()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_conversion_cache() -> Optional[ConversionCache]:
+    """Return the process-wide conversion cache, or None if it is disabled"""
+    global _cache
+    if not CONVERSION_CACHE_SETTINGS.get("enabled", True):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ConversionCache()
+            atexit.register(_cache.flush)
+        return _cache
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Batched resolution of Exasol field and table ids in MBQL to StarRocks ids.
+
+Most field and table ids are answered by the mapping store (column_mapping and
+the catalog-derived table_id_mapping). For the rest the resolver walks the
+chain field -> Exasol table -> StarRocks table -> StarRocks field by name,
+using the Metabase API:
+
+    GET /api/field/{id}                     name and table of an Exasol field
+    GET /api/table/{id}                     schema and name of an Exasol table
+    GET /api/database/{id}?include=tables   StarRocks table ids by name (once)
+    GET /api/table/{id}/query_metadata      StarRocks fields of a table
+
+All ids a query needs are collected first and each step is fetched as one
+deduplicated, concurrent batch. Results (including misses) are memoized on the
+resolver, which lives as long as its migrator, so later questions reuse them.
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+from config import MIGRATION_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+def collect_mbql_ids(mbql) -> Tuple[Set[int], Set[int]]:
+    """Return (field ids, source-table ids) referenced anywhere in an MBQL tree.
+
+    Template tags count too: "dimension" is a field clause, and older tags keep
+    the field id under "field-id" instead.
+    """
+    field_ids, table_ids = set(), set()
+
+    def walk(obj):
+        if isinstance(obj, list):
+            if len(obj) > 1 and obj[0] == 'field' and isinstance(obj[1], int):
+                field_ids.add(obj[1])
+            for item in obj:
+                walk(item)
+        elif isinstance(obj, dict):
+            if isinstance(obj.get('source-table'), int):
+                table_ids.add(obj['source-table'])
+            legacy_field_id = obj.get('field-id')
+            if isinstance(legacy_field_id, int) or (isinstance(legacy_field_id, str) and legacy_field_id.isdigit()):
+                field_ids.add(int(legacy_field_id))
+            for value in obj.values():
+                walk(value)
+
+    walk(mbql)
+    return field_ids, table_ids
+
+class _MemoFetcher:
+    """Memoized, deduplicated, concurrent loader for one kind of object"""
+
+    def __init__(self, executor: ThreadPoolExecutor, load: Callable):
+        self.executor = executor
+        self.load = load
+        self.lock = threading.Lock()
+        self.futures: Dict[object, Future] = {}
+
+    def get_many(self, keys: Iterable) -> Dict:
+        """Load every key not loaded or loading yet, in parallel, and return all results"""
+        with self.lock:
+            futures = {}
+            for key in set(keys):
+                if key not in self.futures:
+                    self.futures[key] = self.executor.submit(self._load_or_none, key)
+                futures[key] = self.futures[key]
+        return {key: future.result() for key, future in futures.items()}
+
+    def get(self, key):
+        return self.get_many([key])[key]
+
+    def _load_or_none(self, key):
+        try:
+            return self.load(key)
+        except Exception as e:
+            logger.error(f"Error resolving {key}: {str(e)}")
+            return None
+
+class FieldResolver:
+    """Resolve Exasol ids to StarRocks ids for MBQL queries, caching across questions"""
+
+    def __init__(self, migrator, mapping, max_workers: Optional[int] = None,
+                 field_overrides: Optional[Dict[Tuple[str, int], int]] = None):
+        self.migrator = migrator
+        self.mapping = mapping
+        # (column name, StarRocks table id) -> StarRocks field id
+        self.field_overrides = field_overrides or {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or MIGRATION_SETTINGS.get("max_concurrency", 8),
+            thread_name_prefix="resolver")
+        self._fields = _MemoFetcher(self._executor, lambda field_id: self._get(f"/api/field/{field_id}"))
+        self._tables = _MemoFetcher(self._executor, lambda table_id: self._get(f"/api/table/{table_id}"))
+        self._target_fields = _MemoFetcher(self._executor, self._load_target_fields)
+        self._target_tables = _MemoFetcher(self._executor, self._load_target_tables)
+
+    def _get(self, path: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        response = self.migrator.session.get(
+            urljoin(self.migrator.config.base_url, path),
+            params=params,
+            headers={"X-Metabase-Session": self.migrator.session_token}
+        )
+        if response.status_code != 200:
+            logger.warning(f"GET {path} failed: {response.status_code}")
+            return None
+        return response.json()
+
+    def _load_target_tables(self, database_id: int) -> Dict[str, int]:
+        database = self._get(f"/api/database/{database_id}", {"include": "tables"}) or {}
+        return {table.get('name'): table.get('id') for table in database.get('tables', [])}
+
+    def _load_target_fields(self, table_id: int) -> Dict[str, int]:
+        table = self._get(f"/api/table/{table_id}/query_metadata") or {}
+        return {field.get('name'): field.get('id') for field in table.get('fields', [])}
+
+    def field_names(self, field_ids: Iterable[int]) -> Dict[int, Optional[str]]:
+        """Exasol column names for field ids"""
+        return {field_id: (field or {}).get('name') for field_id, field in self._fields.get_many(field_ids).items()}
+
+    def resolve_tables(self, table_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+        """Map Exasol table ids to StarRocks table ids; None where no match exists"""
+        resolved, missing = {}, set()
+        for table_id in set(table_ids):
+            target_id = self.mapping.target_table_id(table_id)
+            if target_id is not None:
+                resolved[table_id] = target_id
+            else:
+                missing.add(table_id)
+        if not missing:
+            return resolved
+
+        # Not in the table id index yet: go through the table name mapping
+        tables = self._tables.get_many(missing)
+        target_tables = self._target_tables.get(self.mapping.target_database) or {}
+        for table_id, table in tables.items():
+            target_name = None
+            if table:
+                target_name = self.mapping.target_table(f"{table.get('schema', '')}.{table.get('name', '')}")
+            resolved[table_id] = target_tables.get(target_name) if target_name else None
+        return resolved
+
+    def resolve_fields(self, field_ids: Iterable[int]) -> Dict[int, Optional[int]]:
+        """Map Exasol field ids to StarRocks field ids; None where no match exists"""
+        resolved, missing = {}, set()
+        for field_id in set(field_ids):
+            target_id = self.mapping.target_field(field_id)
+            if target_id is not None:
+                resolved[field_id] = target_id
+            else:
+                missing.add(field_id)
+        if not missing:
+            return resolved
+
+        # Batch 1: the missing fields; batch 2: their tables; batch 3: StarRocks fields
+        fields = self._fields.get_many(missing)
+        source_tables = {field.get('table_id') for field in fields.values() if field}
+        target_table_ids = self.resolve_tables(source_tables - {None})
+        target_fields = self._target_fields.get_many(t for t in target_table_ids.values() if t)
+
+        for field_id in missing:
+            field = fields.get(field_id)
+            target_table_id = target_table_ids.get(field.get('table_id')) if field else None
+            resolved[field_id] = None
+            if not target_table_id:
+                continue
+            name = field.get('name')
+            override = self.field_overrides.get((name, target_table_id))
+            if override is not None:
+                resolved[field_id] = override
+                continue
+            candidates = target_fields.get(target_table_id) or {}
+            target_id = candidates.get(name)
+            if target_id is None and name:
+                target_id = next((fid for fname, fid in candidates.items()
+                                  if fname and fname.lower() == name.lower()), None)
+            resolved[field_id] = target_id
+        return resolved
+
+    def resolve(self, mbql) -> Tuple[Dict[int, Optional[int]], Dict[int, Optional[int]]]:
+        """Resolve every field and source table of an MBQL query in batches"""
+        field_ids, table_ids = collect_mbql_ids(mbql)
+        return self.resolve_fields(field_ids), self.resolve_tables(table_ids)
+
+    def map_fields(self, mbql) -> Tuple[object, List[int]]:
+        """Rewrite the field ids of an MBQL tree in place; return it and the unmapped ids"""
+        field_ids, _ = collect_mbql_ids(mbql)
+        resolved = self.resolve_fields(field_ids)
+
+        def walk(obj):
+            if isinstance(obj, list):
+                if len(obj) > 1 and obj[0] == 'field' and isinstance(obj[1], int) and resolved.get(obj[1]):
+                    obj[1] = resolved[obj[1]]
+                    items = obj[2:]
+                else:
+                    items = obj
+                for item in items:
+                    walk(item)
+            elif isinstance(obj, dict):
+                legacy_field_id = obj.get('field-id')
+                if isinstance(legacy_field_id, (int, str)) and str(legacy_field_id).isdigit() \
+                        and resolved.get(int(legacy_field_id)):
+                    obj['field-id'] = resolved[int(legacy_field_id)]
+                for value in obj.values():
+                    walk(value)
+
+        walk(mbql)
+        unmapped = sorted(field_id for field_id, target_id in resolved.items() if not target_id)
+        return mbql, unmapped
+
+    def map_tables(self, mbql) -> Tuple[object, List[int]]:
+        """Rewrite the source-table ids of an MBQL tree in place; return it and the unmapped ids"""
+        _, table_ids = collect_mbql_ids(mbql)
+        resolved = self.resolve_tables(table_ids)
+
+        def walk(obj):
+            if isinstance(obj, list):
+                for item in obj:
+                    walk(item)
+            elif isinstance(obj, dict):
+                source_table = obj.get('source-table')
+                if isinstance(source_table, int) and resolved.get(source_table):
+                    obj['source-table'] = resolved[source_table]
+                for value in obj.values():
+                    walk(value)
+
+        walk(mbql)
+        unmapped = sorted(table_id for table_id, target_id in resolved.items() if not target_id)
+        return mbql, unmapped
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Process-wide access to the migration mapping sources.
+
+Each source is loaded once and kept until its file's mtime changes:
+
+- migrations/migration_mapping.json, through the SQLite mapping store
+- results/migration_exceptions.json
+- column_mapping_config.json
+- migrations/catalog_snapshot.json, for the column type indexes
+
+Views derived from them (the migration mapping dict, the merged column mapping
+of a dashboard) are memoized and dropped whenever their source is reloaded, so a
+batch run does this work once instead of once per question.
+"""
+
+import copy
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+from catalog_snapshot import SNAPSHOT_FILE, metadata_from_snapshot
+from column_types import TypeIndex
+from config import MAPPING_SETTINGS
+from mapping_store import MappingStore, PairMapping, get_mapping_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COLUMN_CONFIG = {
+    "column_mappings": {
+        "exasol_to_starrocks": {}
+    },
+    "dashboard_specific_mappings": {},
+    "formatting_preservation": {
+        "percentage_columns": [],
+        "currency_columns": [],
+        "mini_bar_columns": [],
+        "conditional_formatting_rules": {}
+    }
+}
+
+DEFAULT_EXCEPTIONS = {"table_id_exceptions": {}, "table_name_exceptions": {}}
+
+class WatchedJsonFile:
+    """A JSON file that is parsed again only when its mtime changes"""
+
+    def __init__(self, path: str, default: Callable[[], Dict], on_missing: Optional[str] = None):
+        self.path = path
+        self.default = default
+        self.on_missing = on_missing
+        self.mtime = None
+        self.value = None
+        self.generation = 0
+
+    def get(self) -> Dict:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if self.value is None or mtime != self.mtime:
+            if mtime is None:
+                if self.on_missing:
+                    print(self.on_missing)
+                self.value = self.default()
+            else:
+                with open(self.path, 'r') as f:
+                    self.value = json.load(f)
+                logger.info(f"Loaded {self.path}")
+            self.mtime = mtime
+            self.generation += 1
+        return self.value
+
+class MappingService:
+    """Memoized mapping data shared by every question of a run"""
+
+    def __init__(self, store: Optional[MappingStore] = None,
+                 column_config_file: str = MAPPING_SETTINGS["column_config_file"],
+                 exceptions_file: str = MAPPING_SETTINGS["exceptions_file"],
+                 snapshot_file: str = SNAPSHOT_FILE):
+        self._store = store
+        self._lock = threading.RLock()
+        self._column_config = WatchedJsonFile(
+            column_config_file, lambda: copy.deepcopy(DEFAULT_COLUMN_CONFIG),
+            "❌ Column mapping configuration file not found. Using default mappings.")
+        self._exceptions = WatchedJsonFile(
+            exceptions_file, lambda: copy.deepcopy(DEFAULT_EXCEPTIONS),
+            f"⚠️  {exceptions_file} not found, using empty exceptions")
+        self._snapshot = WatchedJsonFile(snapshot_file, lambda: {"databases": {}})
+        self._type_indexes = None
+        self._type_generation = None
+        self._migration_mapping = None
+        self._store_generation = None
+        self._dashboard_mappings: Dict[str, Dict] = {}
+        self._column_config_generation = None
+
+    @property
+    def store(self) -> MappingStore:
+        if self._store is None:
+            self._store = get_mapping_store()
+        else:
+            self._store.sync()
+        return self._store
+
+    def pair(self) -> Optional[PairMapping]:
+        """Lookups for the configured database pair"""
+        return self.store.pair()
+
+    def migration_mapping(self) -> Optional[Dict]:
+        """The mapping in the migration_mapping.json layout; do not modify it"""
+        with self._lock:
+            store = self.store
+            if self._migration_mapping is None or self._store_generation != store.generation:
+                pair = store.pair()
+                self._migration_mapping = pair.as_migration_mapping() if pair else None
+                self._store_generation = store.generation
+            return self._migration_mapping
+
+    def type_indexes(self) -> Tuple[TypeIndex, TypeIndex]:
+        """Column types of the source and target catalogs; empty without a snapshot"""
+        with self._lock:
+            snapshot = self._snapshot.get()
+            if self._type_indexes is None or self._type_generation != self._snapshot.generation:
+                pair = self.pair()
+                source_db, target_db = (pair.source_database, pair.target_database) if pair else (None, None)
+                self._type_indexes = (TypeIndex(metadata_from_snapshot(snapshot, source_db)),
+                                      TypeIndex(metadata_from_snapshot(snapshot, target_db)))
+                self._type_generation = self._snapshot.generation
+            return self._type_indexes
+
+    def exceptions(self) -> Dict:
+        """Hardcoded table and field exceptions"""
+        with self._lock:
+            return self._exceptions.get()
+
+    def column_config(self) -> Dict:
+        """The column_mapping_config.json contents, or empty defaults"""
+        with self._lock:
+            return self._column_config.get()
+
+    def dashboard_column_mapping(self, dashboard_id, column_config: Optional[Dict] = None) -> Dict:
+        """Base column mappings merged with a dashboard's additional mappings.
+
+        Memoized per dashboard for the service's own column config; a config
+        passed in by the caller is merged on every call.
+        """
+        with self._lock:
+            current = self.column_config()
+            if column_config is not None and column_config is not current:
+                return merge_dashboard_column_mapping(dashboard_id, column_config)
+            if self._column_config_generation != self._column_config.generation:
+                self._dashboard_mappings = {}
+                self._column_config_generation = self._column_config.generation
+            key = str(dashboard_id)
+            if key not in self._dashboard_mappings:
+                self._dashboard_mappings[key] = merge_dashboard_column_mapping(dashboard_id, current)
+            return dict(self._dashboard_mappings[key])
+
+def merge_dashboard_column_mapping(dashboard_id, column_config: Dict) -> Dict:
+    """Get the complete column mapping for a specific dashboard"""
+    # Start with the base mappings
+    base_mappings = column_config.get("column_mappings", {}).get("exasol_to_starrocks", {})
+
+    # Add dashboard-specific mappings if they exist
+    dashboard_mappings = column_config.get("dashboard_specific_mappings", {}).get(str(dashboard_id), {})
+    additional_mappings = dashboard_mappings.get("additional_mappings", {})
+
+    # Merge the mappings
+    complete_mapping = base_mappings.copy()
+    complete_mapping.update(additional_mappings)
+
+    print(f"  📋 Loaded {len(complete_mapping)} column mappings for dashboard {dashboard_id}")
+    if additional_mappings:
+        print(f"  📋 Including {len(additional_mappings)} dashboard-specific mappings")
+
+    return complete_mapping
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_mapping_service() -> MappingService:
+    """Return the process-wide mapping service"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = MappingService()
+        return _service
@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+SQLite-backed store for Exasol -> StarRocks migration mappings.
+
+migrations/migration_mapping.json (written by scripts/fetch_metadata.py) and
+results/migration_exceptions.json stay the editable sources. They are imported
+into an indexed SQLite file whenever their mtime changes, so tools look up
+single tables and fields without parsing the JSON again. The store keeps one
+set of rows per database pair and indexes every mapping in both directions.
+
+    mapping = get_mapping_store().pair()
+    mapping.target_field(12345)            # Exasol field id -> StarRocks field id
+    mapping.source_fields(67890)           # StarRocks field id -> Exasol field ids
+    mapping.target_table("mart.transactions")
+    mapping.target_table_id(31801)         # Exasol table id -> StarRocks table id
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+from config import MAPPING_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS database_pairs (
+    pair_id INTEGER PRIMARY KEY,
+    source_name TEXT NOT NULL,
+    source_db INTEGER NOT NULL,
+    target_name TEXT NOT NULL,
+    target_db INTEGER NOT NULL,
+    UNIQUE (source_db, target_db)
+);
+CREATE TABLE IF NOT EXISTS table_mappings (
+    pair_id INTEGER NOT NULL,
+    source_table TEXT NOT NULL,   -- lower-case schema.table
+    target_table TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (pair_id, source_table)
+);
+CREATE INDEX IF NOT EXISTS table_mappings_reverse ON table_mappings (pair_id, target_table);
+CREATE TABLE IF NOT EXISTS column_mappings (
+    pair_id INTEGER NOT NULL,
+    source_field INTEGER NOT NULL,
+    target_field INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (pair_id, source_field)
+);
+CREATE INDEX IF NOT EXISTS column_mappings_reverse ON column_mappings (pair_id, target_field);
+CREATE TABLE IF NOT EXISTS table_id_mappings (
+    pair_id INTEGER NOT NULL,
+    source_table_id INTEGER NOT NULL,
+    target_table_id INTEGER NOT NULL,
+    PRIMARY KEY (pair_id, source_table_id)
+);
+CREATE INDEX IF NOT EXISTS table_id_mappings_reverse ON table_id_mappings (pair_id, target_table_id);
+CREATE TABLE IF NOT EXISTS exceptions (
+    pair_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,           -- 'table_id' (field ids) or 'table_name'
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    PRIMARY KEY (pair_id, kind, source)
+);
+CREATE INDEX IF NOT EXISTS exceptions_reverse ON exceptions (pair_id, kind, target);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL
+);
+"""
+
+class PairMapping:
+    """Lookups for one source -> target database pair"""
+
+    def __init__(self, store: "MappingStore", pair_id: int, source_db: int, target_db: int):
+        self.store = store
+        self.pair_id = pair_id
+        self.source_database = source_db
+        self.target_database = target_db
+
+    def target_field(self, source_field_id) -> Optional[int]:
+        """StarRocks field id for an Exasol field id; exceptions win"""
+        exception = self.store._one(
+            "SELECT target FROM exceptions WHERE pair_id = ? AND kind = 'table_id' AND source = ?",
+            (self.pair_id, str(source_field_id)))
+        if exception is not None:
+            return int(exception)
+        try:
+            source_field_id = int(source_field_id)
+        except (TypeError, ValueError):
+            return None
+        return self.store._one(
+            "SELECT target_field FROM column_mappings WHERE pair_id = ? AND source_field = ?",
+            (self.pair_id, source_field_id))
+
+    def source_fields(self, target_field_id: int) -> List[int]:
+        """Exasol field ids mapped onto a StarRocks field id, exceptions first"""
+        exceptions = self.store._column(
+            "SELECT source FROM exceptions WHERE pair_id = ? AND kind = 'table_id' AND target = ?",
+            (self.pair_id, str(target_field_id)))
+        return [int(source) for source in exceptions] + self.store._column(
+            "SELECT source_field FROM column_mappings c WHERE pair_id = ? AND target_field = ? "
+            "AND NOT EXISTS (SELECT 1 FROM exceptions e WHERE e.pair_id = c.pair_id AND e.kind = 'table_id' "
+            "AND e.source = CAST(c.source_field AS TEXT)) ORDER BY position",
+            (self.pair_id, int(target_field_id)))
+
+    def target_table(self, source_table: str) -> Optional[str]:
+        """StarRocks table name for an Exasol schema.table (case-insensitive); exceptions win"""
+        key = source_table.lower()
+        exception = self.store._one(
+            "SELECT target FROM exceptions WHERE pair_id = ? AND kind = 'table_name' AND source = ?",
+            (self.pair_id, key))
+        if exception is not None:
+            return exception
+        return self.store._one(
+            "SELECT target_table FROM table_mappings WHERE pair_id = ? AND source_table = ?",
+            (self.pair_id, key))
+
+    def source_tables(self, target_table: str) -> List[str]:
+        """Exasol schema.table names mapped onto a StarRocks table, exceptions first"""
+        return self.store._column(
+            "SELECT source FROM exceptions WHERE pair_id = ? AND kind = 'table_name' AND target = ?",
+            (self.pair_id, target_table)) + self.store._column(
+            "SELECT source_table FROM table_mappings t WHERE pair_id = ? AND target_table = ? "
+            "AND NOT EXISTS (SELECT 1 FROM exceptions e WHERE e.pair_id = t.pair_id AND e.kind = 'table_name' "
+            "AND e.source = t.source_table) ORDER BY position",
+            (self.pair_id, target_table))
+
+    def target_table_names(self) -> List[str]:
+        """Every StarRocks table name something is mapped onto"""
+        return self.store._column(
+            "SELECT target_table FROM table_mappings WHERE pair_id = ? "
+            "UNION SELECT target FROM exceptions WHERE pair_id = ? AND kind = 'table_name'",
+            (self.pair_id, self.pair_id))
+
+    def target_table_id(self, source_table_id) -> Optional[int]:
+        """StarRocks table id for an Exasol table id"""
+        try:
+            source_table_id = int(source_table_id)
+        except (TypeError, ValueError):
+            return None
+        return self.store._one(
+            "SELECT target_table_id FROM table_id_mappings WHERE pair_id = ? AND source_table_id = ?",
+            (self.pair_id, source_table_id))
+
+    def source_table_ids(self, target_table_id: int) -> List[int]:
+        """Exasol table ids mapped onto a StarRocks table id"""
+        return self.store._column(
+            "SELECT source_table_id FROM table_id_mappings WHERE pair_id = ? AND target_table_id = ?",
+            (self.pair_id, int(target_table_id)))
+
+    def table_id_mapping(self) -> Dict[str, int]:
+        """All table id mappings as {source table id (str): target table id}"""
+        rows = self.store._all(
+            "SELECT source_table_id, target_table_id FROM table_id_mappings WHERE pair_id = ?", (self.pair_id,))
+        return {str(source): target for source, target in rows}
+
+    def column_mapping(self) -> Dict[str, int]:
+        """All field mappings as {source id (str): target id}, exceptions applied"""
+        rows = self.store._all(
+            "SELECT source_field, target_field FROM column_mappings WHERE pair_id = ? ORDER BY position",
+            (self.pair_id,))
+        mapping = {str(source): target for source, target in rows}
+        for source, target in self.store._all(
+                "SELECT source, target FROM exceptions WHERE pair_id = ? AND kind = 'table_id'", (self.pair_id,)):
+            mapping[source] = int(target)
+        return mapping
+
+    def table_mapping(self) -> Dict[str, str]:
+        """All table mappings as {schema.table: StarRocks table}"""
+        rows = self.store._all(
+            "SELECT source_table, target_table FROM table_mappings WHERE pair_id = ? ORDER BY position",
+            (self.pair_id,))
+        return dict(rows)
+
+    def as_migration_mapping(self) -> Dict:
+        """The pair in the migration_mapping.json layout, for code that takes that dict"""
+        source_name, target_name = self.store._all(
+            "SELECT source_name, target_name FROM database_pairs WHERE pair_id = ?", (self.pair_id,))[0]
+        return {
+            "database_mapping": {source_name: self.source_database, target_name: self.target_database},
+            "column_mapping": self.column_mapping(),
+            "table_mapping": self.table_mapping(),
+            "table_id_mapping": self.table_id_mapping()
+        }
+
+class MappingStore:
+    """Indexed SQLite copy of the migration mapping files"""
+
+    def __init__(self, path: str = MAPPING_SETTINGS["store_path"],
+                 mapping_file: str = MAPPING_SETTINGS["mapping_file"],
+                 exceptions_file: str = MAPPING_SETTINGS["exceptions_file"]):
+        self.path = path
+        self.mapping_file = mapping_file
+        self.exceptions_file = exceptions_file
+        self.generation = 0  # bumped on every import so callers can drop derived views
+        directory = os.path.dirname(path)
+        if directory and path != ":memory:":
+            os.makedirs(directory, exist_ok=True)
+        # Shared by the migrator's worker threads; every access holds the lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+        self.sync()
+
+    def _all(self, sql: str, params=()) -> list:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _one(self, sql: str, params=()):
+        rows = self._all(sql, params)
+        return rows[0][0] if rows else None
+
+    def _column(self, sql: str, params=()) -> list:
+        return [row[0] for row in self._all(sql, params)]
+
+    def _source_changed(self, path: str) -> bool:
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        return self._one("SELECT mtime FROM sources WHERE path = ?", (path,)) != mtime
+
+    def sync(self) -> bool:
+        """Re-import the mapping files if they changed on disk; True if anything was imported"""
+        with self._lock:
+            mapping_changed = self._source_changed(self.mapping_file)
+            exceptions_changed = self._source_changed(self.exceptions_file)
+            if not (mapping_changed or exceptions_changed):
+                return False
+            try:
+                with open(self.mapping_file, 'r') as f:
+                    mapping = json.load(f)
+            except FileNotFoundError:
+                logger.warning(f"{self.mapping_file} not found; run scripts/fetch_metadata.py first")
+                return False
+            exceptions = {}
+            if os.path.exists(self.exceptions_file):
+                with open(self.exceptions_file, 'r') as f:
+                    exceptions = json.load(f)
+            self.import_mapping(mapping, exceptions)
+            with self._conn:
+                for path in (self.mapping_file, self.exceptions_file):
+                    if os.path.exists(path):
+                        self._conn.execute("INSERT OR REPLACE INTO sources (path, mtime) VALUES (?, ?)",
+                                           (path, os.path.getmtime(path)))
+            logger.info(f"Loaded migration mapping from {self.mapping_file} into {self.path}")
+            return True
+
+    def import_mapping(self, mapping: Dict, exceptions: Optional[Dict] = None) -> PairMapping:
+        """Replace one database pair's rows with a migration_mapping.json payload"""
+        (source_name, source_db), (target_name, target_db) = list(mapping['database_mapping'].items())[:2]
+        exceptions = exceptions or {}
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO database_pairs (source_name, source_db, target_name, target_db) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (source_db, target_db) DO UPDATE SET source_name = excluded.source_name, "
+                "target_name = excluded.target_name",
+                (source_name, source_db, target_name, target_db))
+            self.generation += 1
+            pair_id = self._one("SELECT pair_id FROM database_pairs WHERE source_db = ? AND target_db = ?",
+                                (source_db, target_db))
+            for table in ("table_mappings", "column_mappings", "table_id_mappings", "exceptions"):
+                self._conn.execute(f"DELETE FROM {table} WHERE pair_id = ?", (pair_id,))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO table_mappings VALUES (?, ?, ?, ?)",
+                [(pair_id, source.lower(), target, position)
+                 for position, (source, target) in enumerate(mapping.get('table_mapping', {}).items())])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO column_mappings VALUES (?, ?, ?, ?)",
+                [(pair_id, int(source), int(target), position)
+                 for position, (source, target) in enumerate(mapping.get('column_mapping', {}).items())])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO table_id_mappings VALUES (?, ?, ?)",
+                [(pair_id, int(source), int(target))
+                 for source, target in mapping.get('table_id_mapping', {}).items()])
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO exceptions VALUES (?, ?, ?, ?)",
+                [(pair_id, 'table_id', str(source), str(target))
+                 for source, target in exceptions.get('table_id_exceptions', {}).items()] +
+                [(pair_id, 'table_name', source.lower(), target)
+                 for source, target in exceptions.get('table_name_exceptions', {}).items()])
+        return PairMapping(self, pair_id, source_db, target_db)
+
+    def pair(self, source_db: Optional[int] = None, target_db: Optional[int] = None) -> Optional[PairMapping]:
+        """Lookups for a database pair; databases not given match any, without arguments
+        this is the first pair imported"""
+        conditions, params = [], []
+        for column, database_id in (("source_db", source_db), ("target_db", target_db)):
+            if database_id is not None:
+                conditions.append(f"{column} = ?")
+                params.append(database_id)
+        sql = "SELECT pair_id, source_db, target_db FROM database_pairs"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        rows = self._all(sql + " ORDER BY pair_id LIMIT 1", params)
+        return PairMapping(self, *rows[0]) if rows else None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_mapping_store() -> MappingStore:
+    """Return the process-wide mapping store, re-importing changed source files"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MappingStore()
+        else:
+            _store.sync()
+        return _store
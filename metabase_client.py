@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Shared Metabase client for the migration scripts.
+
+Every script goes through one process-wide MetabaseMigrator, so all calls share
+its session and keep-alive connection pool instead of opening a new TCP+TLS
+connection per request.
+"""
+
+import threading
+from typing import Optional
+
+import requests
+
+from config import METABASE_CONFIG
+from metabase_migrator import MetabaseMigrator, MetabaseConfig
+
+_migrator: Optional[MetabaseMigrator] = None
+_migrator_lock = threading.Lock()
+
+def get_migrator() -> MetabaseMigrator:
+    """Get the shared migrator, creating it from METABASE_CONFIG on first use"""
+    global _migrator
+    with _migrator_lock:
+        if _migrator is None:
+            _migrator = MetabaseMigrator(MetabaseConfig(
+                base_url=METABASE_CONFIG["base_url"],
+                username=METABASE_CONFIG["username"],
+                password=METABASE_CONFIG["password"]
+            ))
+        return _migrator
+
+def get_session() -> requests.Session:
+    """Get the pooled requests session of the shared migrator"""
+    return get_migrator().session
+
+def get_authenticated_migrator() -> Optional[MetabaseMigrator]:
+    """Get the shared migrator, logging in if it has no session yet"""
+    migrator = get_migrator()
+    if migrator.session_token or migrator.authenticate():
+        return migrator
+    return None
+
+def authenticate() -> Optional[str]:
+    """Authenticate with Metabase and return the session token"""
+    migrator = get_authenticated_migrator()
+    if not migrator:
+        print("❌ Authentication failed")
+        return None
+    return migrator.session_token
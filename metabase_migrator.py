@@ -8,12 +8,21 @@ import requests
 import json
 import re
 import logging
+import asyncio
+import copy
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 from urllib.parse import urljoin
 
-from config import METABASE_CONFIG, DATABASE_MAPPINGS, MIGRATION_SETTINGS
+from config import METABASE_CONFIG, DATABASE_MAPPINGS, MIGRATION_SETTINGS, HTTP_SETTINGS, SESSION_CACHE_SETTINGS
 from sql_converter import SQLConverter
+from session_cache import SessionTokenCache
+from mapping_service import get_mapping_service
+from field_resolver import FieldResolver
+from retry_policy import RetryingAdapter, call_with_retry, policy_for
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -30,11 +39,75 @@ class MetabaseMigrator:
     def __init__(self, config: MetabaseConfig):
         self.config = config
         self.session = requests.Session()
+        self.mount_connection_pool()
         self.session_token = None
+        self.token_cache = None
+        if SESSION_CACHE_SETTINGS.get("enabled", True):
+            self.token_cache = SessionTokenCache(
+                SESSION_CACHE_SETTINGS["path"],
+                SESSION_CACHE_SETTINGS["ttl_hours"] * 3600
+            )
         self.sql_converter = SQLConverter()
+        # Run-scoped snapshots of /api/card/{id}, refreshed by successful PUTs
+        self._card_cache: Dict[int, Dict] = {}
+        self._card_cache_lock = threading.Lock()
+        self._field_resolver = None
+        self._field_resolver_lock = threading.Lock()
         
+    def get_field_resolver(self) -> Optional[FieldResolver]:
+        """Field/table resolver shared by every MBQL question of this migrator"""
+        with self._field_resolver_lock:
+            if self._field_resolver is None:
+                mapping = get_mapping_service().pair()
+                if mapping is None:
+                    return None
+                self._field_resolver = FieldResolver(self, mapping)
+            return self._field_resolver
+    
+    def mount_connection_pool(self, pool_maxsize: Optional[int] = None):
+        """Mount a keep-alive, rate-limited, retrying connection pool on the session"""
+        adapter = RetryingAdapter(
+            pool_connections=HTTP_SETTINGS["pool_connections"],
+            pool_maxsize=max(pool_maxsize or 0, HTTP_SETTINGS["pool_maxsize"]),
+            pool_block=HTTP_SETTINGS["pool_block"]
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+    
     def authenticate(self) -> bool:
-        """Authenticate with Metabase and get session token"""
+        """Authenticate with Metabase, reusing a cached session token when it is still valid"""
+        if self._reuse_cached_token():
+            return True
+        return self.login()
+    
+    def _reuse_cached_token(self) -> bool:
+        """Check the cached session token with a cheap call and adopt it if accepted"""
+        if not self.token_cache:
+            return False
+        token = self.token_cache.get(self.config.base_url, self.config.username)
+        if not token:
+            return False
+        
+        try:
+            response = self.session.get(
+                urljoin(self.config.base_url, "/api/user/current"),
+                headers={"X-Metabase-Session": token}
+            )
+        except Exception as e:
+            logger.warning(f"Could not check cached session: {str(e)}")
+            return False
+        
+        if response.status_code == 200:
+            self.session_token = token
+            logger.info("Reusing cached Metabase session")
+            return True
+        
+        if response.status_code == 401:
+            self.token_cache.discard(self.config.base_url, self.config.username)
+        return False
+    
+    def login(self) -> bool:
+        """Log in with username and password and get a new session token"""
         try:
             login_data = {
                 "username": self.config.username,
@@ -49,6 +122,8 @@ class MetabaseMigrator:
             
             if response.status_code == 200:
                 self.session_token = response.json().get("id")
+                if self.token_cache and self.session_token:
+                    self.token_cache.store(self.config.base_url, self.config.username, self.session_token)
                 logger.info("Successfully authenticated with Metabase")
                 return True
             else:
@@ -97,8 +172,19 @@ class MetabaseMigrator:
             logger.error(f"Error getting dashboard details: {str(e)}")
             return None
     
-    def get_question_details(self, question_id: int) -> Optional[Dict]:
-        """Get detailed information about a specific question"""
+    def get_question_details(self, question_id: int, refresh: bool = False) -> Optional[Dict]:
+        """Get detailed information about a specific question.
+
+        Cards are fetched once per run and served from the card cache after
+        that; pass ``refresh=True`` to force a new GET. Callers get their own
+        copy and may modify it freely.
+        """
+        if not refresh:
+            with self._card_cache_lock:
+                cached = self._card_cache.get(question_id)
+            if cached is not None:
+                return copy.deepcopy(cached)
+        
         try:
             response = self.session.get(
                 urljoin(self.config.base_url, f"/api/card/{question_id}"),
@@ -106,7 +192,9 @@ class MetabaseMigrator:
             )
             
             if response.status_code == 200:
-                return response.json()
+                question = response.json()
+                self._store_card(question_id, question)
+                return copy.deepcopy(question)
             else:
                 logger.error(f"Failed to get question {question_id}: {response.status_code}")
                 return None
@@ -115,6 +203,56 @@ class MetabaseMigrator:
             logger.error(f"Error getting question details: {str(e)}")
             return None
     
+    def update_question_details(self, question_id: int, update_data: Dict) -> requests.Response:
+        """PUT changes to a question and refresh its cached snapshot from the response.
+
+        Transient failures are retried, but only while the card's updated_at
+        still matches the snapshot the update was based on. If someone else
+        changed the card, or a lost response hid a PUT that did land, the
+        update is not replayed.
+        """
+        url = urljoin(self.config.base_url, f"/api/card/{question_id}")
+        with self._card_cache_lock:
+            snapshot = self._card_cache.get(question_id)
+        base_updated_at = snapshot.get('updated_at') if snapshot else None
+        
+        def card_unchanged() -> bool:
+            if base_updated_at is None:
+                return False
+            current = self.get_question_details(question_id, refresh=True)
+            return bool(current) and current.get('updated_at') == base_updated_at
+        
+        response = call_with_retry(
+            lambda: self.session.put(
+                url,
+                headers={"X-Metabase-Session": self.session_token, "Content-Type": "application/json"},
+                json=update_data
+            ),
+            policy_for("PUT", url),
+            can_replay=card_unchanged,
+            description=f"PUT /api/card/{question_id}"
+        )
+        
+        if response.status_code == 200:
+            try:
+                self._store_card(question_id, response.json())
+            except ValueError:
+                # No usable body - fetch the card again on next read
+                self.invalidate_question(question_id)
+        else:
+            self.invalidate_question(question_id)
+        
+        return response
+    
+    def invalidate_question(self, question_id: int):
+        """Drop a question from the card cache"""
+        with self._card_cache_lock:
+            self._card_cache.pop(question_id, None)
+    
+    def _store_card(self, question_id: int, question: Dict):
+        with self._card_cache_lock:
+            self._card_cache[question_id] = question
+    
     def migrate_native_question(self, question: Dict) -> Dict:
         """Migrate a native SQL question from Exasol to StarRocks"""
         try:
@@ -161,50 +299,30 @@ class MetabaseMigrator:
                 return {"error": f"Could not get details for question {question_id}"}
 
             mbql_query = question_details.get('dataset_query', {}).get('query', {})
-            # Load migration mapping
-            with open('migrations/migration_mapping.json', 'r') as f:
-                migration_mapping = json.load(f)
-            column_mapping = migration_mapping.get('column_mapping', {})
+            resolver = self.get_field_resolver()
+            if resolver is None:
+                return {"error": "No migration mapping available; run scripts/fetch_metadata.py first"}
+            mapping = resolver.mapping
 
-            # Recursively map field IDs in MBQL
-            def map_field_ids(obj):
-                if isinstance(obj, list):
-                    return [map_field_ids(x) for x in obj]
-                elif isinstance(obj, dict):
-                    # Map field IDs
-                    if 'field' in obj and isinstance(obj['field'], int):
-                        str_id = str(obj['field'])
-                        if str_id in column_mapping:
-                            obj['field'] = column_mapping[str_id]
-                    # Map join-alias field IDs
-                    if 'join-alias' in obj and isinstance(obj['join-alias'], int):
-                        str_id = str(obj['join-alias'])
-                        if str_id in column_mapping:
-                            obj['join-alias'] = column_mapping[str_id]
-                    return {k: map_field_ids(v) for k, v in obj.items()}
-                else:
-                    return obj
-
-            migrated_mbql = map_field_ids(mbql_query)
+            # Map field IDs through the mapping store, resolving the rest by name in one batch
+            migrated_mbql, unmapped_fields = resolver.map_fields(mbql_query)
+            if unmapped_fields:
+                logger.warning(f"Question {question_id}: no StarRocks field for Exasol fields {unmapped_fields}")
 
-            # Update main and join table IDs directly
-            migrated_mbql['source-table'] = 87255  # MART__TRANSACTIONS
-            if 'joins' in migrated_mbql:
-                for join in migrated_mbql['joins']:
-                    join['source-table'] = 91055  # EIGHTB_WORLD__ACQUIRING_WP_MONEYMAPLETECHLTD
+            # Map main and join table IDs through the catalog-derived table id index
+            migrated_mbql, unmapped_tables = resolver.map_tables(migrated_mbql)
+            if unmapped_tables:
+                return {"error": f"No StarRocks table for Exasol tables {unmapped_tables}; "
+                                 f"run scripts/fetch_metadata.py --incremental"}
 
             # Update database
-            question_details['dataset_query']['database'] = 16  # StarRocks DB ID
+            question_details['dataset_query']['database'] = mapping.target_database
             question_details['dataset_query']['query'] = migrated_mbql
 
-            resp = self.session.put(
-                f"{self.config.base_url}/api/card/{question_id}",
-                headers={"X-Metabase-Session": self.session_token, "Content-Type": "application/json"},
-                json={
-                    "dataset_query": question_details['dataset_query'],
-                    "visualization_settings": question_details.get('visualization_settings', {})
-                }
-            )
+            resp = self.update_question_details(question_id, {
+                "dataset_query": question_details['dataset_query'],
+                "visualization_settings": question_details.get('visualization_settings', {})
+            })
             print(f"[DEBUG] Metabase API response: {resp.status_code} {resp.text}")
             if resp.status_code == 200:
                 return {"success": f"Question {question_id} migrated to StarRocks with full field and table mapping."}
@@ -214,6 +332,32 @@ class MetabaseMigrator:
             print(f"[DEBUG] Exception: {str(e)}")
             return {"error": str(e)}
     
+    def extract_dashboard_questions(self, dashboard_details: Dict) -> List[Dict]:
+        """Extract the question cards from a dashboard's details"""
+        # Use 'dashcards' instead of 'ordered_cards'
+        questions = []
+        for dashcard in dashboard_details.get('dashcards', []):
+            card_details = dashcard.get('card', {})
+            if card_details:
+                questions.append(card_details)
+        return questions
+    
+    def migrate_question(self, question: Dict) -> Dict:
+        """Migrate a single question according to its query type"""
+        question_type = question.get('dataset_query', {}).get('type', 'unknown')
+        
+        if question_type == 'native':
+            return self.migrate_native_question(question)
+        elif question_type == 'query':
+            return self.migrate_mbql_question(question)
+        
+        return {
+            "question_id": question.get('id'),
+            "question_name": question.get('name', 'Unknown'),
+            "type": question_type,
+            "note": f"Unsupported question type: {question_type}"
+        }
+    
     def migrate_dashboard(self, dashboard: Dict) -> Dict:
         """Migrate an entire dashboard"""
         dashboard_id = dashboard.get('id')
@@ -226,33 +370,9 @@ class MetabaseMigrator:
         if not dashboard_details:
             return {"error": f"Could not get details for dashboard {dashboard_id}"}
         
-        # Extract questions from dashboard - use 'dashcards' instead of 'ordered_cards'
-        questions = []
-        dashcards = dashboard_details.get('dashcards', [])
-        
-        for dashcard in dashcards:
-            card_details = dashcard.get('card', {})
-            if card_details:
-                questions.append(card_details)
-        
         # Migrate each question
-        migrated_questions = []
-        for question in questions:
-            question_type = question.get('dataset_query', {}).get('type', 'unknown')
-            
-            if question_type == 'native':
-                migrated_question = self.migrate_native_question(question)
-            elif question_type == 'query':
-                migrated_question = self.migrate_mbql_question(question)
-            else:
-                migrated_question = {
-                    "question_id": question.get('id'),
-                    "question_name": question.get('name', 'Unknown'),
-                    "type": question_type,
-                    "note": f"Unsupported question type: {question_type}"
-                }
-            
-            migrated_questions.append(migrated_question)
+        questions = self.extract_dashboard_questions(dashboard_details)
+        migrated_questions = [self.migrate_question(question) for question in questions]
         
         return {
             "dashboard_id": dashboard_id,
@@ -334,6 +454,103 @@ class MetabaseMigrator:
         
         return summary
 
+class AsyncMetabaseMigrator:
+    """Asyncio front-end for MetabaseMigrator with bounded concurrency.
+
+    Every blocking call on the wrapped migrator runs in a worker thread, and at
+    most ``max_concurrency`` of them are in flight at once. Dashboards and the
+    cards on them are fetched and updated in parallel instead of one round
+    trip after another.
+    """
+    
+    def __init__(self, config: MetabaseConfig, max_concurrency: Optional[int] = None,
+                 migrator: Optional[MetabaseMigrator] = None):
+        self.migrator = migrator or MetabaseMigrator(config)
+        self.max_concurrency = max_concurrency or MIGRATION_SETTINGS.get("max_concurrency", 8)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency,
+                                            thread_name_prefix="metabase")
+        self._semaphore = None
+        
+        # Keep at least one pooled connection per worker so parallel calls reuse sockets
+        self.migrator.mount_connection_pool(self.max_concurrency)
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+    
+    def close(self):
+        """Shut down the worker threads"""
+        self._executor.shutdown(wait=False)
+    
+    async def _call(self, func, *args):
+        """Run a blocking migrator call in the pool, bounded by the semaphore"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, partial(func, *args))
+    
+    async def authenticate(self) -> bool:
+        return await self._call(self.migrator.authenticate)
+    
+    async def get_dashboards(self) -> List[Dict]:
+        return await self._call(self.migrator.get_dashboards)
+    
+    async def get_dashboard_details(self, dashboard_id: int) -> Optional[Dict]:
+        return await self._call(self.migrator.get_dashboard_details, dashboard_id)
+    
+    async def get_question_details(self, question_id: int) -> Optional[Dict]:
+        return await self._call(self.migrator.get_question_details, question_id)
+    
+    async def migrate_native_question(self, question: Dict) -> Dict:
+        return await self._call(self.migrator.migrate_native_question, question)
+    
+    async def migrate_mbql_question(self, question: Dict) -> Dict:
+        return await self._call(self.migrator.migrate_mbql_question, question)
+    
+    async def migrate_question(self, question: Dict) -> Dict:
+        return await self._call(self.migrator.migrate_question, question)
+    
+    async def migrate_dashboard(self, dashboard: Dict) -> Dict:
+        """Migrate an entire dashboard, migrating its questions concurrently"""
+        dashboard_id = dashboard.get('id')
+        dashboard_name = dashboard.get('name', 'Unknown')
+        
+        logger.info(f"Migrating dashboard: {dashboard_name} (ID: {dashboard_id})")
+        
+        dashboard_details = await self.get_dashboard_details(dashboard_id)
+        if not dashboard_details:
+            return {"error": f"Could not get details for dashboard {dashboard_id}"}
+        
+        questions = self.migrator.extract_dashboard_questions(dashboard_details)
+        migrated_questions = await asyncio.gather(
+            *(self.migrate_question(question) for question in questions)
+        )
+        
+        return {
+            "dashboard_id": dashboard_id,
+            "dashboard_name": dashboard_name,
+            "questions": list(migrated_questions),
+            "total_questions": len(migrated_questions),
+            "migration_timestamp": self.migrator._get_timestamp()
+        }
+    
+    async def migrate_all_dashboards(self) -> List[Dict]:
+        """Migrate all dashboards concurrently"""
+        if not await self.authenticate():
+            return [{"error": "Authentication failed"}]
+        
+        dashboards = await self.get_dashboards()
+        if not dashboards:
+            return [{"error": "No dashboards found"}]
+        
+        results = await asyncio.gather(
+            *(self.migrate_dashboard(dashboard) for dashboard in dashboards)
+        )
+        return list(results)
+
 def main():
     """Main function to run the migration"""
     config = MetabaseConfig(
@@ -342,13 +559,17 @@ def main():
         password=METABASE_CONFIG["password"]
     )
     
-    migrator = MetabaseMigrator(config)
+    async_migrator = AsyncMetabaseMigrator(config)
+    migrator = async_migrator.migrator
     
     print("🚀 Starting Metabase migration from Exasol to StarRocks...")
     print("=" * 60)
     
     # Run migration
-    results = migrator.migrate_all_dashboards()
+    try:
+        results = asyncio.run(async_migrator.migrate_all_dashboards())
+    finally:
+        async_migrator.close()
     
     # Generate summary
     summary = migrator.generate_summary_report(results)
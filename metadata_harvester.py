@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Concurrent metadata harvest for both databases of a migration.
+
+fetch_metadata.py used to fetch the Exasol catalog, then the StarRocks catalog,
+and in --incremental mode refetch every changed table one request at a time.
+The harvester runs all of it on one bounded thread pool:
+
+- full: each database's /api/database/{id}/metadata stream is parsed on its own
+  worker, so the wall time is that of the slowest database
+- incremental: the table listings of all databases are fetched together, then
+  the /api/table/{id}/query_metadata calls for the changed tables of every
+  database share the pool, at most MIGRATION_SETTINGS["max_concurrency"] in
+  flight
+
+Progress is printed as tables complete. fetch_metadata.py writes the results
+of both databases to one combined catalog snapshot.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from config import MIGRATION_SETTINGS
+from catalog_snapshot import apply_refetched, fetch_table_metadata, list_database_tables, plan_refresh
+from metadata_stream import fetch_slim_metadata
+
+logger = logging.getLogger(__name__)
+
+class HarvestProgress:
+    """Thread-safe completion counter that prints every `step` percent"""
+
+    def __init__(self, total: int, label: str, step: int = 10):
+        self.total = total
+        self.label = label
+        self.step = step
+        self.done = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self._next_report = step
+        self._lock = threading.Lock()
+
+    def tick(self, ok: bool = True):
+        with self._lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            percent = 100 * self.done // self.total if self.total else 100
+            if percent >= self._next_report or self.done == self.total:
+                elapsed = time.monotonic() - self.started
+                print(f"  📥 {self.label}: {self.done}/{self.total} ({percent}%) in {elapsed:.1f}s")
+                self._next_report = (percent // self.step + 1) * self.step
+
+class MetadataHarvester:
+    """Fetch the catalogs of several databases at once"""
+
+    def __init__(self, migrator, max_workers: Optional[int] = None):
+        self.migrator = migrator
+        self.max_workers = max_workers or MIGRATION_SETTINGS.get("max_concurrency", 8)
+
+    def harvest(self, database_ids: Iterable[int]) -> Optional[Dict[int, Dict]]:
+        """Fetch the slim metadata of every database concurrently.
+
+        Returns {database id: metadata}, or None if any database fails.
+        """
+        database_ids = list(database_ids)
+        progress = HarvestProgress(len(database_ids), "databases")
+        metadata = {}
+        with ThreadPoolExecutor(max_workers=len(database_ids) or 1, thread_name_prefix="harvest") as executor:
+            futures = {executor.submit(self._fetch_database, database_id): database_id
+                       for database_id in database_ids}
+            for future in as_completed(futures):
+                database_id = futures[future]
+                metadata[database_id] = future.result()
+                progress.tick(metadata[database_id] is not None)
+        if any(value is None for value in metadata.values()):
+            return None
+        return {database_id: metadata[database_id] for database_id in database_ids}
+
+    def _fetch_database(self, database_id: int) -> Optional[Dict]:
+        started = time.monotonic()
+        try:
+            metadata = fetch_slim_metadata(self.migrator, database_id)
+        except Exception as e:
+            print(f"❌ Error fetching metadata for database {database_id}: {str(e)}")
+            return None
+        if metadata is None:
+            print(f"❌ Failed to fetch metadata for database {database_id}")
+            return None
+        print(f"✅ Database {database_id}: {len(metadata['tables'])} tables in {time.monotonic() - started:.1f}s")
+        return metadata
+
+    def refresh(self, snapshot: Dict, database_ids: Iterable[int]
+                ) -> Optional[Dict[int, Tuple[Dict, Set[str], Set[str]]]]:
+        """Bring several databases of a snapshot up to date concurrently.
+
+        Returns {database id: (tables, changed, removed)} as refresh_database
+        does for one database, or None if any table listing fails.
+        """
+        database_ids = list(database_ids)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="harvest") as executor:
+            listings = dict(zip(database_ids, executor.map(
+                lambda database_id: list_database_tables(self.migrator, database_id), database_ids)))
+            if any(listed is None for listed in listings.values()):
+                return None
+
+            plans = {database_id: plan_refresh(snapshot, database_id, listings[database_id])
+                     for database_id in database_ids}
+            total = sum(len(stale) for _, stale in plans.values())
+            progress = HarvestProgress(total, "changed tables")
+            futures = {}
+            for database_id, (_, stale) in plans.items():
+                for table_id in stale:
+                    futures[executor.submit(fetch_table_metadata, self.migrator, table_id)] = (database_id, table_id)
+
+            fetched = {database_id: {} for database_id in database_ids}
+            for future in as_completed(futures):
+                database_id, table_id = futures[future]
+                try:
+                    table = future.result()
+                except Exception as e:
+                    logger.error(f"Error fetching metadata for table {table_id}: {str(e)}")
+                    table = None
+                fetched[database_id][table_id] = table
+                progress.tick(table is not None)
+
+        if total and progress.failed:
+            print(f"⚠️  {progress.failed} tables could not be refetched; keeping their snapshot versions")
+        return {database_id: apply_refetched(snapshot, database_id, plans[database_id][0], fetched[database_id])
+                for database_id in database_ids}
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for /api/database/{id}/metadata responses.
+
+The metadata payload of a warehouse database can be tens of MB. Instead of
+reading it whole with response.json() (which holds both the text and the parsed
+tree), the response is scanned chunk by chunk and each element of the top-level
+"tables" array is decoded on its own. Callers can then consume tables one at a
+time, or keep only the slim projection the mapping builders need.
+"""
+
+import codecs
+import json
+import logging
+import re
+from typing import Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# Table and field attributes kept by slim_table()
+TABLE_KEYS = ("id", "name", "schema", "db_id", "updated_at")
+FIELD_KEYS = ("id", "name", "table_id", "base_type", "database_type")
+
+_STRUCTURAL = re.compile(r'["{}\[\]:]')
+_STRING_END = re.compile(r'["\\]')
+_SEPARATORS = re.compile(r'[\s,]*')
+_decoder = json.JSONDecoder()
+
+class _ArrayItemScanner:
+    """Incrementally decode the items of one top-level array in a JSON document.
+
+    Until the array starts, the text is scanned structurally (strings and
+    nesting depth) to find the key at the top level. Inside the array each item
+    is decoded with raw_decode. If an item is cut off at the end of the buffer,
+    decoding is retried only after the buffer has doubled, so a large item costs
+    amortised linear time.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self.buffer = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.string_start = None
+        self.last_string = None
+        self.expect_array = False   # saw "key": at depth 1, waiting for [
+        self.in_array = False
+        self.retry_at = 0           # buffer length needed before decoding again
+        self.done = False
+
+    def feed(self, text: str, final: bool = False) -> Iterator[Dict]:
+        """Add text and yield every array item completed by it"""
+        self.buffer += text
+        if not self.in_array:
+            self._find_array()
+        if self.in_array:
+            yield from self._decode_items(final)
+        self._compact()
+
+    def _find_array(self):
+        while not self.in_array:
+            if self.in_string:
+                if not self._skip_string():
+                    return
+                continue
+            match = _STRUCTURAL.search(self.buffer, self.pos)
+            if not match:
+                self.pos = len(self.buffer)
+                return
+            char = match.group()
+            self.pos = match.end()
+            if char == '"':
+                self.in_string = True
+                self.string_start = self.pos
+                self.expect_array = False
+            elif char == ':':
+                if self.depth == 1 and self.last_string == self.key:
+                    self.expect_array = True
+            elif char in '{[':
+                if self.expect_array and char == '[' and self.depth == 1:
+                    self.in_array = True
+                self.expect_array = False
+                self.depth += 1
+            else:  # } or ]
+                self.depth -= 1
+
+    def _skip_string(self) -> bool:
+        """Advance past the current string literal; False if it is not complete yet"""
+        while True:
+            if self.escaped:
+                if self.pos >= len(self.buffer):
+                    return False
+                self.pos += 1
+                self.escaped = False
+            match = _STRING_END.search(self.buffer, self.pos)
+            if not match:
+                self.pos = len(self.buffer)
+                return False
+            self.pos = match.end()
+            if match.group() == '\\':
+                self.escaped = True
+                continue
+            self.in_string = False
+            # Only short strings can be the key we look for
+            if self.depth == 1 and self.pos - self.string_start <= len(self.key) + 1:
+                self.last_string = self.buffer[self.string_start:self.pos - 1]
+            else:
+                self.last_string = None
+            return True
+
+    def _decode_items(self, final: bool) -> Iterator[Dict]:
+        while not self.done:
+            if len(self.buffer) < self.retry_at and not final:
+                return
+            self.pos = _SEPARATORS.match(self.buffer, self.pos).end()
+            if self.pos >= len(self.buffer):
+                return
+            if self.buffer[self.pos] == ']':
+                self.done = True
+                return
+            try:
+                item, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                # Most likely cut off mid-item: wait for the buffer to double
+                self.retry_at = 2 * len(self.buffer)
+                return
+            self.pos = end
+            self.retry_at = 0
+            yield item
+
+    def _compact(self):
+        """Drop consumed text that no pending string still needs"""
+        keep_from = self.pos
+        if self.in_string and self.string_start is not None:
+            keep_from = min(keep_from, self.string_start)
+        if keep_from == 0:
+            return
+        self.buffer = self.buffer[keep_from:]
+        self.pos -= keep_from
+        if self.string_start is not None:
+            self.string_start -= keep_from
+        if self.retry_at:
+            self.retry_at = max(len(self.buffer) + 1, self.retry_at - keep_from)
+
+def iter_json_array_items(chunks: Iterable[bytes], key: str = "tables") -> Iterator[Dict]:
+    """Yield the decoded items of the top-level array ``key`` from a byte stream"""
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    scanner = _ArrayItemScanner(key)
+    for chunk in chunks:
+        text = decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        yield from scanner.feed(text)
+        if scanner.done:
+            return
+    yield from scanner.feed(decoder.decode(b"", final=True), final=True)
+
+def slim_table(table: Dict) -> Dict:
+    """Keep only the table and field attributes the mapping builders use"""
+    slim = {key: table.get(key) for key in TABLE_KEYS}
+    slim["fields"] = [{key: field.get(key) for key in FIELD_KEYS} for field in table.get("fields", [])]
+    return slim
+
+def stream_database_tables(migrator, database_id: int, chunk_size: int = 1 << 16) -> Optional[Iterator[Dict]]:
+    """Start streaming the tables of a database's metadata, one table at a time.
+
+    Returns None if the request fails.
+    """
+    response = migrator.session.get(
+        f"{migrator.config.base_url}/api/database/{database_id}/metadata",
+        headers={"X-Metabase-Session": migrator.session_token},
+        stream=True
+    )
+    if response.status_code != 200:
+        logger.error(f"Failed to fetch metadata for database {database_id}: {response.status_code}")
+        response.close()
+        return None
+
+    def tables():
+        with response:
+            yield from iter_json_array_items(response.iter_content(chunk_size=chunk_size), "tables")
+    return tables()
+
+def fetch_slim_metadata(migrator, database_id: int) -> Optional[Dict]:
+    """Fetch a database's metadata as {"id", "tables"} with slim tables only"""
+    tables = stream_database_tables(migrator, database_id)
+    if tables is None:
+        return None
+    return {"id": database_id, "tables": [slim_table(table) for table in tables]}
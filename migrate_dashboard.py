@@ -3,13 +3,22 @@
 Script to migrate all questions in a dashboard from Exasol to StarRocks
 """
 
+import inspect
 import json
 import requests
 import re
 import time
+from functools import lru_cache
 from datetime import datetime
 from metabase_migrator import MetabaseMigrator, MetabaseConfig
 from config import METABASE_CONFIG
+from mapping_service import get_mapping_service
+from field_resolver import collect_mbql_ids
+from column_types import expression_family
+from sql_rewriter import SQLRewriter
+from sql_transpiler import SQLTranspiler
+from name_matcher import alias_normalizer, table_replacer
+from conversion_cache import fingerprint, get_conversion_cache
 import config
 print(f"[DEBUG] config.py loaded from: {config.__file__}")
 
@@ -246,13 +255,11 @@ DASHBOARD_CONFIG = {
 }
 
 def load_migration_mapping():
-    """Load the migration mapping from file"""
-    try:
-        with open('migrations/migration_mapping.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
+    """Load the migration mapping through the shared mapping service"""
+    migration_mapping = get_mapping_service().migration_mapping()
+    if migration_mapping is None:
         print("❌ Migration mapping file not found. Please run fetch_metadata.py first.")
-        return None
+    return migration_mapping
 
 def fetch_dashboard_inspection(dashboard_id, migrator):
     """Fetch dashboard inspection data from Metabase"""
@@ -490,13 +497,9 @@ def get_current_visualization_columns(question_id, migrator):
     columns = set()
     
     # Fetch the current question to get its visualization settings
-    response = migrator.session.get(
-        f"{migrator.config.base_url}/api/card/{question_id}",
-        headers={"X-Metabase-Session": migrator.session_token}
-    )
+    question = migrator.get_question_details(question_id)
     
-    if response.status_code == 200:
-        question = response.json()
+    if question:
         viz_settings = question.get('visualization_settings', {})
         print(f"    📊 Current visualization settings: {viz_settings}")
         
@@ -530,221 +533,108 @@ def log_timing(start_time, step_name):
     print(f"⏱️  [{timestamp}] {step_name}: {elapsed:.2f}s")
     return time.time()
 
-def clean_sql_for_starrocks(sql, visualization_columns, table_mapping):
-    """Clean SQL for StarRocks compatibility"""
+def needs_float_cast(expression, column_types, tables):
+    """Whether a float cast is needed to keep a division from truncating.
+
+    Decimal and float operands divide exactly without one; integer operands,
+    expressions the type index cannot type, and runs without a type index
+    (column_types is None) keep the cast.
+
+    Only the StarRocks index is consulted: the expression is checked after the
+    table names were replaced, and the division runs on the StarRocks columns,
+    so their types alone decide whether it truncates. The Exasol type cannot
+    change the answer, since Exasol's "/" never truncates: the cast only
+    restores that behaviour. Columns that changed family between the two
+    databases are reported by update_field_base_type and fetch_metadata.
+    """
+    if not column_types:
+        return True
+    return expression_family(expression, column_types, tables) not in ("decimal", "float")
+
+def find_lossy_casts(sql, column_types, tables):
+    """DECIMAL expressions cast to FLOAT/DOUBLE, which drops precision"""
+    if not column_types:
+        return []
+    casts = re.finditer(r'cast\s*\(\s*((?:[^()]|\([^()]*\))+?)\s+as\s+(?:float|double)\s*\)', sql, flags=re.IGNORECASE)
+    return [match.group(1) for match in casts
+            if expression_family(match.group(1), column_types, tables) == "decimal"]
+
+def convert_sql_for_starrocks(sql, visualization_columns, table_mapping, column_types=None, conversion_mode="regex"):
+    """The StarRocks SQL and the diagnostics clean_sql_for_starrocks prints for it"""
+    diagnostics = []
+    
+    # Table references in one scan: schema.table in any case, and bare table names
+    # of StarRocks tables the query uses
+    sql, replacements, used_starrocks_tables = table_replacer(table_mapping).replace(sql)
+    for found, replacement in dict.fromkeys(replacements):
+        diagnostics.append(f"    🔄 Replaced '{found}' -> '{replacement}'")
+    
+    # Exasol functions and keywords, rewritten in one walk over the tokenized SQL
+    # (string literals, comments and {{variables}} are left alone)
+    rewriter_class = SQLTranspiler if conversion_mode == "ast" else SQLRewriter
+    rewriter = rewriter_class(
+        float_cast=lambda expression: needs_float_cast(expression, column_types, used_starrocks_tables))
+    sql = rewriter.rewrite(sql)
+    if rewriter.rewrites['to_char'] and rewriter_class is SQLRewriter:
+        diagnostics.append(f"    🔄 Replaced to_char() with char()")
+    for warning in rewriter.warnings:
+        diagnostics.append(f"    ⚠️  WARNING: {warning}")
+    if rewriter.skipped_casts:
+        diagnostics.append(f"    🔢 Skipped {rewriter.skipped_casts} float casts on decimal/float columns")
+    for expression in find_lossy_casts(sql, column_types, used_starrocks_tables):
+        diagnostics.append(f"    ⚠️  WARNING: DECIMAL '{expression}' is cast to FLOAT - precision may be lost")
+    
+    # Fix column aliases based on visualization settings (as col, tr.col and bare col)
+    sql = alias_normalizer(visualization_columns).normalize(sql)
+    return sql, diagnostics
+
+@lru_cache(maxsize=1)
+def conversion_rules():
+    """Fingerprint of the code and settings convert_sql_for_starrocks converts with"""
+    rule_modules = [inspect.getmodule(rule) for rule in (SQLRewriter, SQLTranspiler, table_replacer, expression_family)]
+    return fingerprint(*rule_modules, needs_float_cast, find_lossy_casts, convert_sql_for_starrocks,
+                       config.FUNCTION_MAPPINGS)
+
+@lru_cache(maxsize=8)
+def _table_mapping_fingerprint(items):
+    return fingerprint(items)
+
+def conversion_context(table_mapping, column_types, conversion_mode):
+    """Cache key part for everything a conversion depends on besides the SQL and columns"""
+    return fingerprint(conversion_rules(), _table_mapping_fingerprint(tuple(table_mapping.items())),
+                       column_types.fingerprint() if column_types else "", conversion_mode)
+
+def clean_sql_for_starrocks(sql, visualization_columns, table_mapping, column_types=None, conversion_mode=None):
+    """Clean SQL for StarRocks compatibility.
+
+    column_types is the StarRocks column_types.TypeIndex; with it, float casts
+    are only added around operands that are not already decimal or float.
+    conversion_mode defaults to MIGRATION_SETTINGS["sql_conversion_mode"]: "regex"
+    for the token rewriter, "ast" for the parser-backed sql_transpiler.
+    Conversions are reused from the conversion cache for SQL, mappings, rules and
+    visualization columns seen before.
+    """
     start_time = time.time()
     print(f"  🔧 Applying StarRocks compatibility fixes...")
-    
-    # First pass: Replace schema.table patterns (longer patterns first)
-    for exasol_table, starrocks_table in table_mapping.items():
-        if '.' in exasol_table:
-            exasol_schema, exasol_name = exasol_table.split('.', 1)
-            
-            # Replace full schema.table format (e.g., mart.transactions)
-            if exasol_table in sql:
-                sql = sql.replace(exasol_table, starrocks_table)
-                print(f"    🔄 Replaced '{exasol_table}' -> '{starrocks_table}'")
-            
-            # Replace uppercase schema.table format (e.g., MART.TRANSACTIONS)
-            uppercase_pattern = f"{exasol_schema.upper()}.{exasol_name.upper()}"
-            if uppercase_pattern in sql:
-                sql = sql.replace(uppercase_pattern, starrocks_table)
-                print(f"    🔄 Replaced '{uppercase_pattern}' -> '{starrocks_table}'")
-            
-            # Replace mixed case schema.table format (e.g., MART.transactions)
-            mixed_pattern1 = f"{exasol_schema.upper()}.{exasol_name.lower()}"
-            if mixed_pattern1 in sql:
-                sql = sql.replace(mixed_pattern1, starrocks_table)
-                print(f"    🔄 Replaced '{mixed_pattern1}' -> '{starrocks_table}'")
-            
-            mixed_pattern2 = f"{exasol_schema.lower()}.{exasol_name.upper()}"
-            if mixed_pattern2 in sql:
-                sql = sql.replace(mixed_pattern2, starrocks_table)
-                print(f"    🔄 Replaced '{mixed_pattern2}' -> '{starrocks_table}'")
-    
-    # Second pass: Contextual replacement - find which StarRocks tables are actually used
-    # and only replace standalone references to those specific table names
-    used_starrocks_tables = set()
-    
-    # Find all StarRocks table names that are actually used in the SQL
-    for starrocks_table in table_mapping.values():
-        if starrocks_table in sql:
-            used_starrocks_tables.add(starrocks_table)
-            print(f"    📋 Found StarRocks table in use: '{starrocks_table}'")
-    
-    # For each used StarRocks table, find the corresponding Exasol table name
-    # and replace standalone references to that table name
-    for exasol_table, starrocks_table in table_mapping.items():
-        if starrocks_table in used_starrocks_tables:
-            if '.' in exasol_table:
-                _, exasol_name = exasol_table.split('.', 1)
-            else:
-                exasol_name = exasol_table
-            
-            # Replace standalone references to this table name
-            if re.search(rf'\b{re.escape(exasol_name.upper())}\b', sql):
-                sql = re.sub(rf'\b{re.escape(exasol_name.upper())}\b', starrocks_table, sql)
-                print(f"    🔄 Contextual replacement: '{exasol_name.upper()}' -> '{starrocks_table}'")
-            
-            if re.search(rf'\b{re.escape(exasol_name.lower())}\b', sql):
-                sql = re.sub(rf'\b{re.escape(exasol_name.lower())}\b', starrocks_table, sql)
-                print(f"    🔄 Contextual replacement: '{exasol_name.lower()}' -> '{starrocks_table}'")
-    
-    # Fix StarRocks window function syntax
-    sql = re.sub(r'PARTITION BY 1', '', sql, flags=re.IGNORECASE)
-    sql = re.sub(r'OVER \(\)', 'OVER ()', sql, flags=re.IGNORECASE)
-    
-    # Replace Exasol-specific functions with StarRocks equivalents
-    # NULLIFZERO(value) -> NULLIF(value, 0)
-    sql = re.sub(r'NULLIFZERO\s*\(\s*([^)]+)\s*\)', r'NULLIF(\1, 0)', sql, flags=re.IGNORECASE)
-    
-    # zeroifnull -> ifnull(, 0)
-    sql = re.sub(r'zeroifnull\s*\(\s*([^)]+)\s*\)', r'ifnull(\1, 0)', sql, flags=re.IGNORECASE)
-    
-    # Fix nullif(bigint(20)) compatibility issue
-    # Replace nullif(bigint(20)) with ifnull(bigint(20), 0)
-    sql = re.sub(r'nullif\s*\(\s*bigint\s*\(\s*20\s*\)\s*\)', r'ifnull(bigint(20), 0)', sql, flags=re.IGNORECASE)
-    
-    # Fix NULLIF compatibility - cast value to float
-    # NULLIF(value, 0) -> NULLIF(cast(value as float), 0)
-    # But avoid double-casting if already cast
-    sql = re.sub(
-        r'NULLIF\s*\(\s*(?!cast\()([^,]+)\s*,\s*0\s*\)',
-        r'NULLIF(cast(\1 as float), 0)',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # convert -> cast
-    sql = re.sub(r'convert\s*\(\s*([^)]+)\s*\)', r'cast(\1)', sql, flags=re.IGNORECASE)
-    
-    # to_char -> char
-    original_sql = sql
-    sql = re.sub(r'to_char\s*\(\s*([^)]+)\s*\)', r'char(\1)', sql, flags=re.IGNORECASE)
-    if sql != original_sql:
-        print(f"    🔄 Replaced to_char() with char()")
-    
-    # to_date -> date
-    sql = re.sub(r'to_date\s*\(\s*([^)]+)\s*\)', r'date(\1)', sql, flags=re.IGNORECASE)
-    
-    # Fix json_value patterns
-    # json_value(t.FEE_PARAMETERS, '$.profit_fx_markup') -> parse_json(t.FEE_PARAMETERS)->'profit_fx_markup'
-    sql = re.sub(
-        r'json_value\s*\(\s*([^,]+)\s*,\s*[\'"]([^\'"]+)[\'"]\s*\)',
-        r'parse_json(\1)->\'\2\'',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # json_value with complex path -> CAST(JSON_QUERY(...))
-    sql = re.sub(
-        r'json_value\s*\(\s*([^,]+)\s*,\s*[\'"]([^\'"]+)[\'"]\s*\)',
-        r'CAST(JSON_QUERY(parse_json(\1), \'\2\') AS VARCHAR(128))',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # Fix full outer join in CTEs - replace with left join + union
-    # This is a complex transformation that needs careful handling
-    # For now, we'll add a warning and suggest manual review
-    if re.search(r'FULL\s+OUTER\s+JOIN', sql, flags=re.IGNORECASE):
-        print(f"    ⚠️  WARNING: Found FULL OUTER JOIN - may need manual conversion")
-    
-    # Fix null handling in != comparisons
-    # In Exasol, != preserves nulls, in StarRocks it filters them out
-    # We need to explicitly handle nulls: column != value -> (column != value OR column IS NULL)
-    # This is complex and may need manual review for specific cases
-    
-    # Fix distinct in window functions
-    # count(distinct column) over (partition by ...) -> not supported in StarRocks
-    # We'll add a warning for this
-    if re.search(r'count\s*\(\s*distinct\s+[^)]+\)\s+over\s*\(', sql, flags=re.IGNORECASE):
-        print(f"    ⚠️  WARNING: Found DISTINCT in window function - not supported in StarRocks")
-    
-    # Fix sum()/sum() division patterns
-    # sum(revenue_EUR)/sum(Turnover_EUR) -> sum(revenue_EUR)/cast(sum(Turnover_EUR) as float)
-    sql = re.sub(
-        r'sum\s*\(\s*([^)]+)\s*\)\s*/\s*sum\s*\(\s*([^)]+)\s*\)',
-        r'sum(\1)/cast(sum(\2) as float)',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # Add table aliases to subqueries without names
-    # select * from (select * from table) -> select * from (select * from table) as subquery
-    sql = re.sub(
-        r'from\s*\(\s*select\s+\*\s+from\s+([^)]+)\s*\)\s*(?=\s|$)',
-        r'from (select * from \1) as subquery',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # Convert granularity field reference to template tag parameter
-    # date_trunc(gran.granularity, fatpay.PAYMENT_AT) -> date_trunc({{granularity}}, fatpay.PAYMENT_AT)
-    # Handle any table alias: fg.granularity, gran.granularity, etc.
-    sql = re.sub(
-        r'date_trunc\s*\(\s*[a-zA-Z_]+\.granularity\s*,\s*([^)]+)\s*\)',
-        r'date_trunc({{granularity}}, \1)',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # Change "grouping" to "grouped" everywhere except in template variables
-    # This handles cases like "as grouping" -> "as grouped"
-    sql = re.sub(
-        r'\bgrouping\b(?!\})',  # Negative lookahead to avoid matching {{grouping}}
-        r'grouped',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # Convert listagg to group_concat for StarRocks compatibility
-    # listagg(column, ',') -> group_concat(column, ',')
-    sql = re.sub(
-        r'listagg\s*\(\s*([^)]+)\s*\)',
-        r'group_concat(\1)',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # Fix median function - StarRocks doesn't have PERCENTILE_CONT, use a different approach
-    # Replace PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY column) with a window function approach
-    sql = re.sub(
-        r'PERCENTILE_CONT\(0\.5\)\s+WITHIN\s+GROUP\s*\(\s*ORDER\s+BY\s+([^)]+)\s*\)',
-        r'PERCENTILE_CONT(\1, 0.5)',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # Also handle direct median() function calls - use correct StarRocks syntax
-    sql = re.sub(
-        r'median\s*\(\s*([^)]+)\s*\)',
-        r'PERCENTILE_CONT(\1, 0.5)',
-        sql,
-        flags=re.IGNORECASE
-    )
-    
-    # Fix column aliases based on visualization settings
-    for col in visualization_columns:
-        if col:
-            # Handle subquery aliases (as column_name)
-            pattern = rf'as\s+{re.escape(col.lower())}\b'
-            replacement = f'as {col}'
-            sql = re.sub(pattern, replacement, sql, flags=re.IGNORECASE)
-            
-            # Handle main query references (tr.column_name)
-            pattern = rf'tr\.{re.escape(col.lower())}\b'
-            replacement = f'tr.{col}'
-            sql = re.sub(pattern, replacement, sql, flags=re.IGNORECASE)
-            
-            # Handle other table references (table.column_name)
-            pattern = rf'\b{re.escape(col.lower())}\b'
-            replacement = col
-            sql = re.sub(pattern, replacement, sql, flags=re.IGNORECASE)
+    conversion_mode = conversion_mode or config.MIGRATION_SETTINGS.get("sql_conversion_mode", "regex")
+    
+    cache = get_conversion_cache()
+    context = conversion_context(table_mapping, column_types, conversion_mode) if cache else None
+    cached = cache.get(sql, visualization_columns, context) if cache else None
+    if cached:
+        cleaned_sql, diagnostics = cached
+        print(f"    ♻️  Reusing cached conversion")
+    else:
+        cleaned_sql, diagnostics = convert_sql_for_starrocks(sql, visualization_columns, table_mapping,
+                                                             column_types, conversion_mode)
+        if cache:
+            cache.store(sql, visualization_columns, context, cleaned_sql, diagnostics)
+    for diagnostic in diagnostics:
+        print(diagnostic)
     
     print(f"  ✅ StarRocks compatibility fixes applied")
     log_timing(start_time, "SQL cleaning")
-    return sql
+    return cleaned_sql
 
 def convert_granularity_to_static_list(template_tags, dashboard_id):
     """Convert granularity from field reference to static list parameter"""
@@ -829,16 +719,12 @@ def update_question(question_id, converted_sql, visualization_columns, migrator,
     print(f"  🔄 Updating Question {question_id}")
     
     # Fetch current question
-    response = migrator.session.get(
-        f"{migrator.config.base_url}/api/card/{question_id}",
-        headers={"X-Metabase-Session": migrator.session_token}
-    )
+    question = migrator.get_question_details(question_id)
     
-    if response.status_code != 200:
-        print(f"  ❌ Failed to fetch question: {response.status_code}")
+    if not question:
+        print(f"  ❌ Failed to fetch question {question_id}")
         return False
     
-    question = response.json()
     print(f"  ✅ Found question: {question.get('name', 'Unknown')}")
     
     # Get current SQL and database
@@ -864,7 +750,9 @@ def update_question(question_id, converted_sql, visualization_columns, migrator,
         print(f"  📊 Original visualization settings: {len(original_viz_settings)} keys")
     
     # Clean SQL for StarRocks
-    cleaned_sql = clean_sql_for_starrocks(converted_sql, visualization_columns, migration_mapping['table_mapping'])
+    _, starrocks_types = get_mapping_service().type_indexes()
+    cleaned_sql = clean_sql_for_starrocks(converted_sql, visualization_columns, migration_mapping['table_mapping'],
+                                          starrocks_types)
     
     # Update template tags with new column IDs
     column_mapping = migration_mapping['column_mapping']
@@ -918,14 +806,7 @@ def update_question(question_id, converted_sql, visualization_columns, migrator,
     print(f"  📤 Sending update request to Metabase...")
     print(f"  📋 Update data preview: {str(update_data)[:200]}...")
     
-    response = migrator.session.put(
-        f"{migrator.config.base_url}/api/card/{question_id}",
-        headers={
-            "X-Metabase-Session": migrator.session_token,
-            "Content-Type": "application/json"
-        },
-        json=update_data
-    )
+    response = migrator.update_question_details(question_id, update_data)
     
     print(f"  📥 Response status: {response.status_code}")
     print(f"  📥 Response headers: {dict(response.headers)}")
@@ -934,29 +815,35 @@ def update_question(question_id, converted_sql, visualization_columns, migrator,
         print(f"  ✅ Question {question_id} updated successfully!")
         print(f"  📄 Response content: {response.text[:500]}...")
         
-        # Verify the update by fetching the question again
-        verify_response = migrator.session.get(
-            f"{migrator.config.base_url}/api/card/{question_id}",
-            headers={"X-Metabase-Session": migrator.session_token}
-        )
+        # Verify the update with a fresh GET; the cached snapshot is the PUT response itself
+        updated_question = migrator.get_question_details(question_id, refresh=True)
         
-        if verify_response.status_code == 200:
-            updated_question = verify_response.json()
+        if updated_question:
             updated_dataset_query = updated_question.get('dataset_query', {})
             updated_database_id = updated_dataset_query.get('database')
-            print(f"  ✅ Verification: Question now uses database {updated_database_id}")
+            if updated_database_id == target_database_id:
+                print(f"  ✅ Verification: Question now uses database {updated_database_id}")
+            else:
+                print(f"  ⚠️  Verification: Question uses database {updated_database_id}, expected {target_database_id}")
             
             # Check if the SQL was actually updated
             updated_native_query = updated_dataset_query.get('native', {})
             updated_sql = updated_native_query.get('query', '')
-            print(f"  ✅ Verification: SQL updated successfully")
+            if updated_sql == cleaned_sql:
+                print(f"  ✅ Verification: SQL updated successfully")
+            else:
+                print(f"  ⚠️  Verification: stored SQL differs from the SQL sent")
             print(f"  📄 Updated SQL preview: {updated_sql[:100]}...")
             
             # Check if visualization settings were preserved
             updated_viz_settings = updated_question.get('visualization_settings', {})
-            print(f"  ✅ Verification: Visualization settings preserved ({len(updated_viz_settings)} keys)")
+            missing_keys = set(final_viz_settings) - set(updated_viz_settings)
+            if not missing_keys:
+                print(f"  ✅ Verification: Visualization settings preserved ({len(updated_viz_settings)} keys)")
+            else:
+                print(f"  ⚠️  Verification: Visualization settings lost {sorted(missing_keys)}")
         else:
-            print(f"  ⚠️  Could not verify update: {verify_response.status_code}")
+            print(f"  ⚠️  Could not verify update for question {question_id}")
         
         return True
     else:
@@ -968,14 +855,10 @@ def update_mbql_question(question_id, mbql_json, migrator, migration_mapping, da
     """Update a specific MBQL question in Metabase."""
     print(f"  🔄 Updating MBQL Question {question_id}")
     # Fetch current question
-    response = migrator.session.get(
-        f"{migrator.config.base_url}/api/card/{question_id}",
-        headers={"X-Metabase-Session": migrator.session_token}
-    )
-    if response.status_code != 200:
-        print(f"  ❌ Failed to fetch question: {response.status_code}")
+    question = migrator.get_question_details(question_id)
+    if not question:
+        print(f"  ❌ Failed to fetch question {question_id}")
         return False
-    question = response.json()
     print(f"  ✅ Found question: {question.get('name', 'Unknown')}")
     # Print original MBQL JSON for inspection
     print(f"  [DEBUG] Original MBQL JSON for question {question_id}:")
@@ -991,8 +874,23 @@ def update_mbql_question(question_id, mbql_json, migrator, migration_mapping, da
     # Map tables and field IDs in MBQL JSON
     table_mapping = migration_mapping['table_mapping']
     column_mapping = migration_mapping['column_mapping']
-    mapped_mbql = map_tables_in_mbql(json.loads(json.dumps(mbql_json)), table_mapping)
-    mapped_mbql = map_field_ids_in_mbql(mapped_mbql, column_mapping)
+    table_id_mapping = migration_mapping.get('table_id_mapping', {})
+    # Fields and tables missing from the mapping file are resolved by name, in one batch per question
+    resolver = migrator.get_field_resolver()
+    if resolver:
+        field_ids, table_ids = collect_mbql_ids(mbql_json)
+        missing = [field_id for field_id in field_ids if str(field_id) not in column_mapping]
+        resolved = {str(k): v for k, v in resolver.resolve_fields(missing).items() if v}
+        if resolved:
+            print(f"  🔎 Resolved {len(resolved)} unmapped field IDs by name")
+            column_mapping = {**column_mapping, **resolved}
+        missing = [table_id for table_id in table_ids if str(table_id) not in table_id_mapping]
+        resolved = {str(k): v for k, v in resolver.resolve_tables(missing).items() if v}
+        if resolved:
+            print(f"  🔎 Resolved {len(resolved)} unmapped table IDs by name")
+            table_id_mapping = {**table_id_mapping, **resolved}
+    mapped_mbql = map_tables_in_mbql(json.loads(json.dumps(mbql_json)), table_mapping, table_id_mapping)
+    mapped_mbql = map_field_ids_in_mbql(mapped_mbql, column_mapping, type_indexes=get_mapping_service().type_indexes())
     # Print mapped MBQL JSON for inspection
     print(f"  [DEBUG] Mapped MBQL JSON for question {question_id}:")
     print(json.dumps(mapped_mbql, indent=2))
@@ -1018,14 +916,7 @@ def update_mbql_question(question_id, mbql_json, migrator, migration_mapping, da
     }
     print(f"  📤 Sending MBQL update request to Metabase...")
     print(f"  📋 MBQL Update data preview: {str(update_data)[:200]}...")
-    response = migrator.session.put(
-        f"{migrator.config.base_url}/api/card/{question_id}",
-        headers={
-            "X-Metabase-Session": migrator.session_token,
-            "Content-Type": "application/json"
-        },
-        json=update_data
-    )
+    response = migrator.update_question_details(question_id, update_data)
     print(f"  📥 Response status: {response.status_code}")
     print(f"  📥 Response headers: {dict(response.headers)}")
     if response.status_code == 200:
@@ -1042,16 +933,12 @@ def validate_question_response(question_id, question_name, migrator, log_file=No
     log_and_print(f"  🔍 Validating Question {question_id}: {question_name}", log_file)
     
     # First, get the question details
-    response = migrator.session.get(
-        f"{migrator.config.base_url}/api/card/{question_id}",
-        headers={"X-Metabase-Session": migrator.session_token}
-    )
+    question = migrator.get_question_details(question_id)
     
-    if response.status_code != 200:
-        log_and_print(f"    ❌ Failed to fetch question: {response.status_code}", log_file)
+    if not question:
+        log_and_print(f"    ❌ Failed to fetch question {question_id}", log_file)
         return False
     
-    question = response.json()
     dataset_query = question.get('dataset_query', {})
     database_id = dataset_query.get('database')
     query_type = dataset_query.get('type')
@@ -1149,9 +1036,9 @@ def validate_migration(dashboard_migration, migrator):
             total_count += 1
             log_and_print(f"\n📝 Validating Question {total_count}/{len([q for q in questions if q.get('type') == 'native' and q.get('converted_sql')])}", log_file)
             log_and_print("-" * 50, log_file)
+            # Pacing comes from the migrator's shared adaptive rate limiter
             if validate_question_response(question_id, question_name, migrator, log_file):
                 success_count += 1
-            time.sleep(1)
         log_and_print(f"\n🎉 Validation Summary:", log_file)
         log_and_print(f"✅ Successfully validated: {success_count}/{total_count} questions", log_file)
         if success_count == total_count:
@@ -1162,43 +1049,12 @@ def validate_migration(dashboard_migration, migrator):
             return False
 
 def load_column_mapping_config():
-    """Load the column mapping configuration from file"""
-    try:
-        with open('column_mapping_config.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print("❌ Column mapping configuration file not found. Using default mappings.")
-        return {
-            "column_mappings": {
-                "exasol_to_starrocks": {}
-            },
-            "dashboard_specific_mappings": {},
-            "formatting_preservation": {
-                "percentage_columns": [],
-                "currency_columns": [],
-                "mini_bar_columns": [],
-                "conditional_formatting_rules": {}
-            }
-        }
+    """Load the column mapping configuration (cached until the file changes)"""
+    return get_mapping_service().column_config()
 
 def get_column_mapping_for_dashboard(dashboard_id, column_config):
     """Get the complete column mapping for a specific dashboard"""
-    # Start with the base mappings
-    base_mappings = column_config.get("column_mappings", {}).get("exasol_to_starrocks", {})
-    
-    # Add dashboard-specific mappings if they exist
-    dashboard_mappings = column_config.get("dashboard_specific_mappings", {}).get(str(dashboard_id), {})
-    additional_mappings = dashboard_mappings.get("additional_mappings", {})
-    
-    # Merge the mappings
-    complete_mapping = base_mappings.copy()
-    complete_mapping.update(additional_mappings)
-    
-    print(f"  📋 Loaded {len(complete_mapping)} column mappings for dashboard {dashboard_id}")
-    if additional_mappings:
-        print(f"  📋 Including {len(additional_mappings)} dashboard-specific mappings")
-    
-    return complete_mapping
+    return get_mapping_service().dashboard_column_mapping(dashboard_id, column_config)
 
 def enhance_visualization_settings_with_formatting(viz_settings, column_mapping, formatting_config):
     """Enhance visualization settings with formatting preservation based on configuration"""
@@ -1282,98 +1138,12 @@ def apply_display_name_mappings(viz_settings, display_name_mappings):
     
     return enhanced_settings
 
-# Add Exasol to StarRocks table ID mapping (expand as needed)
-table_id_mapping = {
-    31801: 87212,
-    71055: 87239,
-    35483: 90833,
-    35484: 90838,
-    32333: 87253,
-    37762: 90421,
-    37460: 90425,
-    24797: 87236,
-    32652: 87241,
-    164: 87251,
-    41076: 90423,
-    41074: 90419,
-    98: 87210,
-    84359: 90422,
-    77213: 90655,
-    77208: 90654,
-    26542: 87228,
-    42763: 87257,
-    51: 87209,
-    35485: 90424,
-    36348: 87237,
-    39315: 91055,
-    1161: 87218,
-    163: 87249,
-    222: 87229,
-    1570: 87225,
-    33784: 87215,
-    36071: 90835,
-    38534: 87234,
-    31632: 91065,
-    31635: 87211,
-    37403: 88338,
-    32962: 88337,
-    35325: 88772,
-    1314: 90837,
-    87010: 87232,
-    853: 87258,
-    31187: 87250,
-    37671: 88339,
-    78230: 87201,
-    39928: 87222,
-    25041: 87245,
-    34803: 87252,
-    34790: 87216,
-    36046: 87247,
-    42183: 89022,
-    2841: 87204,
-    37604: 87203,
-    45: 87255,
-    31112: 87227,
-    38562: 90597,
-    31634: 87202,
-    701: 87238,
-    74490: 87223,
-    157: 87205,
-    233: 87244,
-    160: 91005,
-    35480: 90832,
-    32503: 90420,
-    35481: 90418,
-    62: 90834,
-    108: 87235,
-    210: 87206,
-    213: 87214,
-    26390: 87230,
-    36: 89193,
-    71209: 87240,
-    36832: 87243,
-    212: 87256,
-    29: 87383,
-    147: 89180,
-    96: 91060,
-    24295: 87213,
-    24283: 87217,
-    190: 87221,
-    232: 87207,
-    39805: 87242,
-    99: 87248,
-    204: 87219,
-    37236: 87226,
-    39403: 89181,
-    24284: 87224,
-    122: 87208,
-    64538: 87254,
-    9: 87220,
-    37377: 88340
-}
+def map_tables_in_mbql(mbql_json, table_mapping, table_id_mapping):
+    """Recursively map table names and table IDs in MBQL JSON using table_mapping and table_id_mapping.
 
-def map_tables_in_mbql(mbql_json, table_mapping):
-    """Recursively map table names and table IDs in MBQL JSON using table_mapping and table_id_mapping."""
+    table_id_mapping is generated from the metadata catalog by fetch_metadata.py
+    and keyed by the Exasol table id as a string, as in migration_mapping.json.
+    """
     if isinstance(mbql_json, dict):
         for k, v in list(mbql_json.items()):  # Use list() to avoid runtime dict size change
             if k == 'table' and isinstance(v, str):
@@ -1393,22 +1163,24 @@ def map_tables_in_mbql(mbql_json, table_mapping):
                     else:
                         print(f"    ⚠️  No mapping found for MBQL table: '{v}'")
             elif k == 'source-table' and isinstance(v, int):
-                mapped_id = table_id_mapping.get(v, None)
+                mapped_id = table_id_mapping.get(str(v), None)
                 if mapped_id:
                     print(f"    🔄 MBQL table ID mapping: {v} -> {mapped_id}")
                     mbql_json[k] = mapped_id
                 else:
                     print(f"    ⚠️  No mapping found for MBQL table ID: {v}")
             # Always recurse into all values
-            map_tables_in_mbql(v, table_mapping)
+            map_tables_in_mbql(v, table_mapping, table_id_mapping)
     elif isinstance(mbql_json, list):
         for item in mbql_json:
-            map_tables_in_mbql(item, table_mapping)
+            map_tables_in_mbql(item, table_mapping, table_id_mapping)
     return mbql_json
 
-def map_field_ids_in_mbql(mbql_json, column_mapping, parent_key=None, top_level=False):
+def map_field_ids_in_mbql(mbql_json, column_mapping, parent_key=None, top_level=False, type_indexes=None):
     """Recursively map field IDs in MBQL JSON using column_mapping.
     Only skip unmapped fields in top-level 'fields' and 'aggregation' arrays.
+    With type_indexes (Exasol and StarRocks column_types.TypeIndex), base-type
+    options of mapped field references follow the StarRocks column type.
     """
     # Handle lists
     if isinstance(mbql_json, list):
@@ -1419,6 +1191,8 @@ def map_field_ids_in_mbql(mbql_json, column_mapping, parent_key=None, top_level=
             if new_id:
                 print(f"    🔄 MBQL field ID mapping: {old_id} -> {new_id}")
                 mbql_json[1] = new_id
+                if type_indexes and len(mbql_json) > 2 and isinstance(mbql_json[2], dict):
+                    update_field_base_type(mbql_json[2], old_id, new_id, type_indexes)
             else:
                 print(f"    ⚠️  No mapping found for MBQL field ID: {old_id}")
                 # Only skip if in top-level 'fields' or 'aggregation' array
@@ -1427,12 +1201,12 @@ def map_field_ids_in_mbql(mbql_json, column_mapping, parent_key=None, top_level=
                     return None
             # Recurse into the rest of the field reference
             for item in mbql_json[2:]:
-                map_field_ids_in_mbql(item, column_mapping)
+                map_field_ids_in_mbql(item, column_mapping, type_indexes=type_indexes)
             return mbql_json
         # Otherwise, process the list and filter out None results if top-level
         new_list = []
         for item in mbql_json:
-            mapped_item = map_field_ids_in_mbql(item, column_mapping, parent_key, top_level)
+            mapped_item = map_field_ids_in_mbql(item, column_mapping, parent_key, top_level, type_indexes)
             if mapped_item is not None:
                 new_list.append(mapped_item)
         return new_list
@@ -1441,14 +1215,41 @@ def map_field_ids_in_mbql(mbql_json, column_mapping, parent_key=None, top_level=
         # If this is the top-level query dict, set top_level=True for 'fields' and 'aggregation' keys
         for k, v in list(mbql_json.items()):
             if k in ("fields", "aggregation"):
-                mapped_v = map_field_ids_in_mbql(v, column_mapping, k, top_level=True)
+                mapped_v = map_field_ids_in_mbql(v, column_mapping, k, True, type_indexes)
             else:
-                mapped_v = map_field_ids_in_mbql(v, column_mapping, k, top_level=False)
+                mapped_v = map_field_ids_in_mbql(v, column_mapping, k, False, type_indexes)
             mbql_json[k] = mapped_v
         return mbql_json
     else:
         return mbql_json
 
+def update_field_base_type(options, old_id, new_id, type_indexes):
+    """Point a field reference's base-type at the StarRocks column type"""
+    source_types, target_types = type_indexes
+    base_type = target_types.base_type(new_id)
+    if 'base-type' not in options or not base_type or options['base-type'] == base_type:
+        return
+    print(f"    🔢 MBQL field {new_id} base-type: {options['base-type']} -> {base_type}")
+    options['base-type'] = base_type
+    if source_types.field_family(old_id) == "decimal" and target_types.field_family(new_id) == "float":
+        print(f"    ⚠️  WARNING: field {old_id} is DECIMAL in Exasol but FLOAT in StarRocks - precision may be lost")
+
+def save_migration_result(migration_result, migrator):
+    """Write migrations/dashboard_<id>_migration.json, which scripts/rollback_dashboard.py
+    reads; SQL recorded by an earlier run is kept for questions that have none now"""
+    path = f"migrations/dashboard_{migration_result['dashboard_id']}_migration.json"
+    try:
+        with open(path, 'r') as f:
+            previous = {question['question_id']: question.get('original_sql')
+                        for dashboard in json.load(f) for question in dashboard.get('questions', [])}
+    except (FileNotFoundError, json.JSONDecodeError):
+        previous = {}
+    for question in migration_result['questions']:
+        if question['type'] == 'native' and not question.get('original_sql'):
+            question['original_sql'] = previous.get(question['question_id'])
+    migrator.save_migration_results([migration_result], path)
+    print(f"💾 Migration results saved to {path}")
+
 def main():
     """Main function"""
     overall_start = time.time()
@@ -1517,17 +1318,13 @@ def main():
         
         # Fetch the question details
         question_start = time.time()
-        question_response = migrator.session.get(
-            f"{migrator.config.base_url}/api/card/{question_id}",
-            headers={"X-Metabase-Session": migrator.session_token}
-        )
+        question = migrator.get_question_details(question_id)
         log_timing(question_start, f"Fetch question {question_id}")
         
-        if question_response.status_code != 200:
-            print(f"  ❌ Failed to fetch question: {question_response.status_code}")
+        if not question:
+            print(f"  ❌ Failed to fetch question {question_id}")
             continue
         
-        question = question_response.json()
         dataset_query = question.get('dataset_query', {})
         query_type = dataset_query.get('type')
         
@@ -1556,7 +1353,10 @@ def main():
                     "question_id": question_id,
                     "question_name": question_name,
                     "type": "native",
-                    "converted_sql": "migrated"
+                    "converted_sql": "migrated",
+                    # Only Exasol SQL is worth restoring: a card already on StarRocks has converted SQL
+                    "original_sql": current_sql if config.MIGRATION_SETTINGS["backup_original_sql"]
+                    and dataset_query.get('database') == migration_mapping['database_mapping']['exasol'] else None
                 })
             log_timing(update_start, f"Update question {question_id}")
         elif query_type == 'query':
@@ -1591,6 +1391,7 @@ def main():
         "dashboard_name": dashboard_data.get('name', 'Unknown'),
         "questions": migrated_questions
     }
+    save_migration_result(migration_result, migrator)
     
     # Validate the migration
     print(f"\n" + "=" * 60)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Compiled multi-name matchers for table references and column aliases.
+
+The names are put into a character trie and the trie is written out as one
+case-insensitive regular expression, so common prefixes (schemas, shared table
+name stems) are matched once and a scan costs about the same for 50 names as
+for 500. Longer names are tried first at every trie node, and a match has to
+start and end on a word boundary, so MART.TRANSACTIONS_DAILY is never replaced
+as MART.TRANSACTIONS followed by _DAILY.
+
+A TableReferenceReplacer is built once per table mapping (table_replacer()
+keeps the last few) and replaces every reference in one scan:
+
+- schema.table (any case) -> the StarRocks table
+- a bare table name, upper or lower case, -> the StarRocks table, but only if
+  that StarRocks table is referenced in the same SQL (after replacement), as
+  a bare name alone is too likely to be a column or alias
+
+Nothing inside string literals or quoted identifiers is replaced.
+
+A ColumnAliasNormalizer does the same for the visualization columns of a card:
+every spelling of a column in any case becomes the one the visualization
+settings use, in one substitution pass with a dict lookup per match.
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# String literals and quoted identifiers, matched as a whole so nothing inside them is replaced
+LITERAL_PATTERN = r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\""
+
+def trie_pattern(names: Iterable[str]) -> str:
+    """Regex source matching any of the names, longest first, lowercase"""
+    trie: Dict = {}
+    for name in names:
+        node = trie
+        for char in name.lower():
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def emit(node: Dict) -> str:
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            return f'(?:{body})?'
+        return body
+
+    return emit(trie)
+
+class TableReferenceReplacer:
+    """Exasol -> StarRocks table references for one table mapping"""
+
+    def __init__(self, table_mapping: Dict[str, str], bare_names: bool = True):
+        self.qualified: Dict[str, str] = {}
+        self.bare: Dict[str, List[str]] = {}
+        for exasol_table, starrocks_table in table_mapping.items():
+            if '.' in exasol_table or not bare_names:
+                self.qualified.setdefault(exasol_table.lower(), starrocks_table)
+            if bare_names:
+                name = exasol_table.rsplit('.', 1)[-1].lower()
+                targets = self.bare.setdefault(name, [])
+                if starrocks_table not in targets:
+                    targets.append(starrocks_table)
+        self.targets = {starrocks_table.lower(): starrocks_table for starrocks_table in table_mapping.values()}
+        names = set(self.qualified) | set(self.bare) | set(self.targets)
+        self.pattern = re.compile(f"(?P<literal>{LITERAL_PATTERN})|\\b" + trie_pattern(names) + r'\b',
+                                  re.IGNORECASE) if names else None
+
+    def replace(self, sql: str) -> Tuple[str, List[Tuple[str, str]], Set[str]]:
+        """SQL with table references replaced, the (found, replacement) pairs and
+        the StarRocks tables the result references"""
+        if not self.pattern or not sql:
+            return sql, [], set()
+        matches = []
+        used = set()
+        for match in self.pattern.finditer(sql):
+            if match.group('literal'):
+                continue
+            key = match.group().lower()
+            if key in self.qualified:
+                matches.append((match, self.qualified[key]))
+                used.add(self.qualified[key])
+            elif key in self.bare:
+                matches.append((match, None))
+            if key in self.targets:
+                used.add(self.targets[key])
+
+        output = []
+        replacements = []
+        position = 0
+        for match, replacement in matches:
+            if replacement is None:
+                replacement = self._bare_target(match.group(), used)
+                if replacement is None:
+                    continue
+            output.append(sql[position:match.start()])
+            output.append(replacement)
+            position = match.end()
+            if match.group() != replacement:
+                replacements.append((match.group(), replacement))
+        output.append(sql[position:])
+        return ''.join(output), replacements, used
+
+    def _bare_target(self, name: str, used: Set[str]) -> Optional[str]:
+        """StarRocks table for a bare name, if one of its tables is used in the SQL"""
+        if not (name.isupper() or name.islower()):
+            return None
+        return next((target for target in self.bare[name.lower()] if target in used), None)
+
+class ColumnAliasNormalizer:
+    """Spells a card's visualization columns in its SQL exactly as the
+    visualization settings do, so Metabase finds the result columns again"""
+
+    def __init__(self, columns: Iterable[str]):
+        self.columns: Dict[str, str] = {}
+        for column in columns:
+            if column:
+                self.columns[column.lower()] = column
+        # "AS col" is also written as "as col", as the aliases always were
+        self.pattern = re.compile(r'(?P<alias>as\s+)?\b(?P<column>' + trie_pattern(self.columns) + r')\b',
+                                  re.IGNORECASE) if self.columns else None
+
+    def normalize(self, sql: str) -> str:
+        if not self.pattern or not sql:
+            return sql
+        return self.pattern.sub(self._replace, sql)
+
+    def _replace(self, match) -> str:
+        column = self.columns.get(match.group('column').lower(), match.group('column'))
+        return f"as {column}" if match.group('alias') else column
+
+@lru_cache(maxsize=256)
+def _cached_normalizer(columns: tuple) -> ColumnAliasNormalizer:
+    return ColumnAliasNormalizer(columns)
+
+def alias_normalizer(columns: Iterable[str]) -> ColumnAliasNormalizer:
+    """The normalizer for a card's visualization columns, compiled once per column set"""
+    return _cached_normalizer(tuple(columns))
+
+@lru_cache(maxsize=8)
+def _cached_replacer(items: tuple, bare_names: bool) -> TableReferenceReplacer:
+    return TableReferenceReplacer(dict(items), bare_names)
+
+def table_replacer(table_mapping: Dict[str, str], bare_names: bool = True) -> TableReferenceReplacer:
+    """The replacer for a table mapping, compiled once per mapping version"""
+    return _cached_replacer(tuple(table_mapping.items()), bare_names)
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Adaptive rate limiting for Metabase API calls.
+
+One AdaptiveRateLimiter is shared by every session in the process. It ramps the
+number of concurrent requests up while responses stay fast and backs off
+(fewer concurrent requests, a delay between them) on 429/5xx responses,
+connection errors or rising latency.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from requests.adapters import HTTPAdapter
+
+from config import RATE_LIMIT_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+class AdaptiveRateLimiter:
+    """AIMD controller for the number of in-flight requests and their spacing"""
+
+    def __init__(self, initial_concurrency: int = 4, min_concurrency: int = 1,
+                 max_concurrency: int = 16, latency_target: float = 2.0,
+                 backoff_factor: float = 0.5, max_interval: float = 10.0):
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.latency_target = latency_target
+        self.backoff_factor = backoff_factor
+        self.max_interval = max_interval
+
+        self.concurrency = float(max(min_concurrency, min(initial_concurrency, max_concurrency)))
+        self.interval = 0.0  # seconds between request starts, only non-zero after backing off
+        self.latency_ewma: Optional[float] = None
+
+        self._in_flight = 0
+        self._next_start = 0.0
+        self._successes = 0
+        self._since_back_off = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_concurrency, int(self.concurrency))
+
+    @contextmanager
+    def slot(self):
+        """Hold one request slot for the duration of the block"""
+        self._acquire()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
+
+    def _acquire(self):
+        with self._condition:
+            while True:
+                if self._in_flight < self.limit:
+                    wait = self._next_start - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+            self._in_flight += 1
+            self._next_start = time.monotonic() + self.interval
+
+    def record(self, latency: float, status_code: Optional[int], retry_after: Optional[float] = None):
+        """Feed back the outcome of one request; status_code None means it failed to connect"""
+        with self._condition:
+            if self.latency_ewma is None:
+                self.latency_ewma = latency
+            else:
+                self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * latency
+
+            self._since_back_off += 1
+            overloaded = status_code is None or status_code == 429 or status_code >= 500
+            # Slow responses shrink the limit at most once per window, errors always do
+            slow = self.latency_ewma > self.latency_target and self._since_back_off >= self.limit
+            if overloaded or slow:
+                self._back_off(retry_after)
+            elif self.latency_ewma <= self.latency_target:
+                self._ramp_up()
+            self._condition.notify_all()
+
+    def _back_off(self, retry_after: Optional[float]):
+        self._successes = 0
+        self._since_back_off = 0
+        self.concurrency = max(self.min_concurrency, self.concurrency * self.backoff_factor)
+        self.interval = min(self.max_interval, max(0.25, self.interval * 2))
+        if retry_after:
+            self._next_start = max(self._next_start, time.monotonic() + retry_after)
+        logger.info(f"Backing off Metabase API: {self.limit} concurrent, {self.interval:.2f}s apart")
+
+    def _ramp_up(self):
+        self._successes += 1
+        # Additive increase once per window of healthy responses
+        if self._successes >= self.limit:
+            self._successes = 0
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.interval = self.interval / 2 if self.interval > 0.05 else 0.0
+
+class RateLimitedAdapter(HTTPAdapter):
+    """HTTPAdapter that sends every request through an AdaptiveRateLimiter"""
+
+    def __init__(self, rate_limiter: Optional[AdaptiveRateLimiter] = None, **kwargs):
+        self.rate_limiter = rate_limiter or get_shared_rate_limiter()
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        with self.rate_limiter.slot():
+            start = time.monotonic()
+            try:
+                response = super().send(request, **kwargs)
+            except Exception:
+                self.rate_limiter.record(time.monotonic() - start, None)
+                raise
+            self.rate_limiter.record(time.monotonic() - start, response.status_code,
+                                     _retry_after(response))
+            return response
+
+def _retry_after(response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+_shared_rate_limiter: Optional[AdaptiveRateLimiter] = None
+_shared_lock = threading.Lock()
+
+def get_shared_rate_limiter() -> AdaptiveRateLimiter:
+    """Get the process-wide limiter configured from RATE_LIMIT_SETTINGS"""
+    global _shared_rate_limiter
+    with _shared_lock:
+        if _shared_rate_limiter is None:
+            _shared_rate_limiter = AdaptiveRateLimiter(**RATE_LIMIT_SETTINGS)
+        return _shared_rate_limiter
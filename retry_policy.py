@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Retry policies for Metabase API calls.
+
+Transient failures (connection errors, 429 and 502/503/504) are retried with
+exponential backoff and full jitter. Each endpoint has its own policy, which
+also says whether a call is safe to replay:
+
+- "always": read-only calls (every GET, query execution via POST /api/dataset,
+  login). RetryingAdapter replays these transparently.
+- "if_unchanged": PUT /api/card/{id}. Replayed only if the card's updated_at
+  still matches the snapshot the update was based on. MetabaseMigrator checks
+  this in update_question_details.
+- "never": everything else. Creates are never replayed because a lost response
+  may hide a request that actually succeeded.
+"""
+
+import logging
+import random
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+from rate_limiter import RateLimitedAdapter
+
+logger = logging.getLogger(__name__)
+
+TRANSIENT_ERRORS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How often and how patiently to retry one kind of call"""
+    max_attempts: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    retry_statuses: frozenset = frozenset({429, 502, 503, 504})
+    replay: str = "always"  # "always", "if_unchanged" or "never"
+
+    def delay(self, attempt: int) -> float:
+        """Backoff before retry number ``attempt`` (0-based), with full jitter"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+NO_RETRY = RetryPolicy(max_attempts=1, replay="never")
+
+# (method, path regex, policy) - first match wins
+ENDPOINT_POLICIES: List[Tuple[str, str, RetryPolicy]] = [
+    ("PUT", r"^/api/card/\d+$", RetryPolicy(max_attempts=4, replay="if_unchanged")),
+    ("POST", r"^/api/dataset$", RetryPolicy(max_attempts=3, base_delay=1.0, replay="always")),
+    ("POST", r"^/api/session$", RetryPolicy(max_attempts=3, replay="always")),
+    ("GET", r"/metadata$", RetryPolicy(max_attempts=3, base_delay=2.0, max_delay=60.0, replay="always")),
+    ("GET", r".*", RetryPolicy(max_attempts=4, replay="always")),
+]
+
+def policy_for(method: str, url: str) -> RetryPolicy:
+    """Look up the retry policy for a request"""
+    path = urlparse(url).path
+    for policy_method, pattern, policy in ENDPOINT_POLICIES:
+        if method.upper() == policy_method and re.search(pattern, path):
+            return policy
+    return NO_RETRY
+
+def call_with_retry(send: Callable[[], requests.Response], policy: RetryPolicy,
+                    can_replay: Optional[Callable[[], bool]] = None,
+                    description: str = "request") -> requests.Response:
+    """Call ``send`` until it succeeds, fails permanently or runs out of attempts.
+
+    ``can_replay`` is asked before every retry; returning False stops retrying
+    and the last response (or error) is returned to the caller.
+    """
+    for attempt in range(policy.max_attempts):
+        last_attempt = attempt == policy.max_attempts - 1
+        try:
+            response = send()
+        except TRANSIENT_ERRORS as e:
+            if last_attempt or (can_replay and not can_replay()):
+                raise
+            reason = str(e)
+        else:
+            if response.status_code not in policy.retry_statuses or last_attempt:
+                return response
+            if can_replay and not can_replay():
+                return response
+            reason = f"HTTP {response.status_code}"
+            # Hand the connection back to the pool before trying again
+            response.close()
+
+        delay = policy.delay(attempt)
+        logger.warning(f"{description} failed ({reason}), retry {attempt + 1}/{policy.max_attempts - 1} in {delay:.1f}s")
+        time.sleep(delay)
+
+class RetryingAdapter(RateLimitedAdapter):
+    """Rate-limited adapter that transparently replays calls whose policy allows it"""
+
+    def send(self, request, **kwargs):
+        policy = policy_for(request.method, request.url)
+        if policy.replay != "always":
+            return super().send(request, **kwargs)
+        return call_with_retry(
+            lambda: super(RetryingAdapter, self).send(request, **kwargs),
+            policy,
+            description=f"{request.method} {urlparse(request.url).path}"
+        )
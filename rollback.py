@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Rollback of migrated cards from StarRocks back to Exasol.
+
+The mapping store keeps a reverse index next to every forward map
+(column_mappings, table_mappings and table_id_mappings are indexed on their
+target column, exceptions included), so each StarRocks id or table name is
+turned back into its Exasol counterpart with one indexed lookup, memoized
+for the rest of the run:
+
+- native SQL: the original SQL recorded in the migration results file; only
+  when there is none, StarRocks table names -> SCHEMA.TABLE in one regex pass
+  that skips string literals and quoted identifiers (any other StarRocks-only
+  rewrite of the conversion stays, so the script skips such cards unless told
+  otherwise)
+- MBQL: source-table ids and ["field", id, ...] references
+- template tags: field-id and dimension
+- parameter mappings of cards and dashcards
+
+Where several Exasol ids were mapped onto one StarRocks id, the one that
+belongs to an Exasol table the card uses wins; otherwise the first in mapping
+order is used and the choice is recorded in `ambiguous`.
+"""
+
+import copy
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+from catalog_index import CatalogIndex
+from field_resolver import collect_mbql_ids
+from mapping_store import PairMapping
+from name_matcher import LITERAL_PATTERN
+
+class CardRollback:
+    """Reverse transforms for cards migrated with one database pair"""
+
+    def __init__(self, mapping: PairMapping, source_catalog: Optional[CatalogIndex] = None):
+        self.mapping = mapping
+        self.source_catalog = source_catalog
+        self.ambiguous: List[str] = []
+        self.unmapped: Set[str] = set()
+        self._fields: Dict[int, List[int]] = {}
+        self._table_ids: Dict[int, List[int]] = {}
+        self._tables: Dict[str, List[str]] = {}
+        names = sorted(mapping.target_table_names(), key=len, reverse=True)
+        self._table_pattern = re.compile(f"(?P<literal>{LITERAL_PATTERN})|\\b(?P<table>"
+                                         + '|'.join(map(re.escape, names)) + r')\b') if names else None
+
+    def _first(self, kind: str, target, candidates: list, preferred: Iterable = ()):
+        if not candidates:
+            self.unmapped.add(f"{kind} {target}")
+            return None
+        if len(candidates) > 1:
+            matching = [candidate for candidate in candidates if candidate in preferred]
+            if len(matching) == 1:
+                return matching[0]
+            self.ambiguous.append(f"{kind} {target} -> {candidates[0]} (also {candidates[1:]})")
+        return candidates[0]
+
+    def table_name(self, starrocks_table: str) -> Optional[str]:
+        """Exasol SCHEMA.TABLE for a StarRocks table name"""
+        if starrocks_table not in self._tables:
+            self._tables[starrocks_table] = self.mapping.source_tables(starrocks_table)
+        source = self._first("table", starrocks_table, self._tables[starrocks_table])
+        return source.upper() if source else None
+
+    def table_id(self, starrocks_table_id: int) -> Optional[int]:
+        if starrocks_table_id not in self._table_ids:
+            self._table_ids[starrocks_table_id] = self.mapping.source_table_ids(starrocks_table_id)
+        return self._first("table id", starrocks_table_id, self._table_ids[starrocks_table_id])
+
+    def field_id(self, starrocks_field_id: int, table_ids: Set[int] = frozenset()) -> Optional[int]:
+        """Exasol field id, preferring a field of one of the card's Exasol tables"""
+        if starrocks_field_id not in self._fields:
+            self._fields[starrocks_field_id] = self.mapping.source_fields(starrocks_field_id)
+        candidates = self._fields[starrocks_field_id]
+        preferred = []
+        if len(candidates) > 1 and self.source_catalog and table_ids:
+            preferred = [candidate for candidate in candidates
+                         if (self.source_catalog.field_by_id.get(candidate) or {}).get('table_id') in table_ids]
+        return self._first("field", starrocks_field_id, candidates, preferred)
+
+    def rollback_sql(self, sql: str) -> str:
+        """Replace StarRocks table names with the Exasol SCHEMA.TABLE they came from"""
+        if not self._table_pattern or not sql:
+            return sql
+
+        def replace(match):
+            if match.group('literal'):
+                return match.group('literal')
+            return self.table_name(match.group('table')) or match.group('table')
+
+        return self._table_pattern.sub(replace, sql)
+
+    def sql_table_ids(self, sql: str) -> Set[int]:
+        """Exasol table ids of the SCHEMA.TABLE references in rolled-back SQL"""
+        if not self.source_catalog:
+            return set()
+        table_ids = set()
+        for schema, name in re.findall(r'\b([A-Za-z_]\w*)\.([A-Za-z_]\w*)\b', sql):
+            table = self.source_catalog.table_by_schema_and_name(schema, name)
+            if table:
+                table_ids.add(table.get('id'))
+        return table_ids
+
+    def rollback_mbql(self, mbql, table_ids: Optional[Set[int]] = None):
+        """Map source-table and field ids of an MBQL tree back, in place"""
+        def walk_tables(obj):
+            if isinstance(obj, list):
+                for item in obj:
+                    walk_tables(item)
+            elif isinstance(obj, dict):
+                if isinstance(obj.get('source-table'), int):
+                    obj['source-table'] = self.table_id(obj['source-table']) or obj['source-table']
+                for value in obj.values():
+                    walk_tables(value)
+
+        walk_tables(mbql)
+        if table_ids is None:
+            table_ids = collect_mbql_ids(mbql)[1]
+
+        def walk_fields(obj):
+            if isinstance(obj, list):
+                if len(obj) > 1 and obj[0] == 'field' and isinstance(obj[1], int):
+                    obj[1] = self.field_id(obj[1], table_ids) or obj[1]
+                    items = obj[2:]
+                else:
+                    items = obj
+                for item in items:
+                    walk_fields(item)
+            elif isinstance(obj, dict):
+                for value in obj.values():
+                    walk_fields(value)
+
+        walk_fields(mbql)
+        return mbql
+
+    def rollback_template_tags(self, template_tags: Dict, table_ids: Set[int] = frozenset()) -> Dict:
+        tags = copy.deepcopy(template_tags)
+        for tag in tags.values():
+            if isinstance(tag.get('field-id'), int):
+                tag['field-id'] = self.field_id(tag['field-id'], table_ids) or tag['field-id']
+            if isinstance(tag.get('dimension'), list):
+                self.rollback_mbql(tag['dimension'], table_ids)
+        return tags
+
+    def rollback_parameter_mappings(self, parameter_mappings: List[Dict], table_ids: Set[int] = frozenset()) -> List[Dict]:
+        mappings = copy.deepcopy(parameter_mappings)
+        for mapping in mappings:
+            if 'target' in mapping:
+                self.rollback_mbql(mapping['target'], table_ids)
+        return mappings
+
+    def card_table_ids(self, dataset_query: Dict) -> Set[int]:
+        """Exasol tables a rolled-back dataset_query uses"""
+        if dataset_query.get('type') == 'native':
+            return self.sql_table_ids(dataset_query.get('native', {}).get('query', ''))
+        return collect_mbql_ids(dataset_query.get('query', {}))[1]
+
+    def rollback_card(self, card: Dict, original_sql: Optional[str] = None) -> Dict:
+        """PUT payload restoring a card's Exasol query; without original_sql a native
+        query only gets its table names back"""
+        dataset_query = copy.deepcopy(card.get('dataset_query', {}))
+        dataset_query['database'] = self.mapping.source_database
+        if dataset_query.get('type') == 'native':
+            native = dataset_query.setdefault('native', {})
+            native['query'] = original_sql or self.rollback_sql(native.get('query', ''))
+            table_ids = self.card_table_ids(dataset_query)
+            native['template-tags'] = self.rollback_template_tags(native.get('template-tags', {}), table_ids)
+        else:
+            self.rollback_mbql(dataset_query.get('query', {}))
+            table_ids = self.card_table_ids(dataset_query)
+
+        update = {"dataset_query": dataset_query}
+        if card.get('parameter_mappings'):
+            update['parameter_mappings'] = self.rollback_parameter_mappings(card['parameter_mappings'], table_ids)
+        return update
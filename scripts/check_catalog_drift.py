@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Script to report schema drift between catalog snapshots and the cards it affects
+
+Usage:
+    python3 scripts/check_catalog_drift.py OLD.json [NEW.json]  # NEW defaults to migrations/catalog_snapshot.json
+    python3 scripts/check_catalog_drift.py OLD.json --live      # compare against Metabase (changed tables only)
+    python3 scripts/check_catalog_drift.py --live               # has Metabase drifted since the last fetch_metadata run?
+"""
+
+import argparse
+import json
+import time
+from catalog_diff import InspectionCardIndex, broken_ids, diff_snapshots
+from catalog_snapshot import SNAPSHOT_FILE, load_snapshot
+from metabase_client import get_authenticated_migrator
+from metadata_harvester import MetadataHarvester
+
+def live_snapshot(snapshot):
+    """Bring a snapshot up to date from Metabase, refetching only changed tables"""
+    migrator = get_authenticated_migrator()
+    if not migrator:
+        print("❌ Authentication failed")
+        return None
+    database_ids = [int(database_id) for database_id in snapshot.get('databases', {})]
+    refreshed = MetadataHarvester(migrator).refresh(snapshot, database_ids)
+    if refreshed is None:
+        print("❌ Failed to list tables for one or more databases")
+        return None
+    return {"version": snapshot.get('version'),
+            "databases": {str(database_id): tables for database_id, (tables, _, _) in refreshed.items()}}
+
+def print_drift(drift):
+    for database_id, database_drift in drift.items():
+        print(f"\n🗄️  Database {database_id}")
+        for table in database_drift.get('added_tables', []):
+            print(f"  ➕ {table['schema']}.{table['name']} (table {table['id']}, {table['fields']} columns)")
+        for table in database_drift.get('removed_tables', []):
+            print(f"  ➖ {table['schema']}.{table['name']} (table {table['id']})")
+        for table in database_drift.get('changed_tables', []):
+            print(f"  🔄 {table['schema']}.{table['name']} (table {table['id']})")
+            if 'renamed_from' in table:
+                print(f"     renamed from {table['renamed_from']}")
+            for field in table.get('added_fields', []):
+                print(f"     + {field['name']} ({field['id']})")
+            for field in table.get('removed_fields', []):
+                print(f"     - {field['name']} ({field['id']})")
+            for field in table.get('renamed_fields', []):
+                print(f"     ~ {field['old_name']} -> {field['new_name']} ({field['id']})")
+            for change in table.get('field_id_changes', []):
+                print(f"     # {change['name']}: field ID {change['old_id']} -> {change['new_id']}")
+            if table.get('attributes_changed'):
+                print("     column attributes changed")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Report schema drift between catalog snapshots")
+    parser.add_argument("old", nargs="?", default=SNAPSHOT_FILE, help="baseline snapshot")
+    parser.add_argument("new", nargs="?", default=SNAPSHOT_FILE, help=f"snapshot to compare (default {SNAPSHOT_FILE})")
+    parser.add_argument("--live", action="store_true", help="compare the baseline against Metabase instead of NEW")
+    parser.add_argument("--output", help="also write the drift report to this JSON file")
+    args = parser.parse_args()
+
+    old = load_snapshot(args.old)
+    if old is None:
+        print(f"❌ Snapshot {args.old} not found. Run scripts/fetch_metadata.py first.")
+        return
+    new = live_snapshot(old) if args.live else load_snapshot(args.new)
+    if new is None:
+        if not args.live:
+            print(f"❌ Snapshot {args.new} not found")
+        return
+
+    if old.get('version') != new.get('version'):
+        print("⚠️  The snapshots have different formats; expect attribute changes on every table")
+    started = time.monotonic()
+    drift = diff_snapshots(old, new)
+    print(f"🔍 Compared snapshots in {(time.monotonic() - started) * 1000:.1f} ms")
+    if not drift:
+        print("✅ No drift")
+        return
+    print_drift(drift)
+
+    ids = broken_ids(drift)
+    affected = InspectionCardIndex().affected_cards(ids['fields'], ids['tables']) if ids['fields'] or ids['tables'] else []
+    print(f"\n📋 {len(affected)} cached cards reference changed fields or tables")
+    for card in affected:
+        refs = ", ".join([f"field {field_id}" for field_id in card['fields']] +
+                         [f"table {table_id}" for table_id in card['tables']])
+        print(f"  Card {card['id']} '{card['name']}' (dashboards {card['dashboards']}): {refs}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"drift": drift, "affected_cards": affected}, f, indent=2)
+        print(f"\n💾 Drift report saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -4,50 +4,37 @@ Script to check what tables are available in Exasol database
 """
 
 import json
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
-from config import METABASE_CONFIG
+from metabase_client import get_authenticated_migrator
+from metadata_stream import stream_database_tables
 
 def main():
     """Main function"""
     
     EXASOL_DB_ID = 2
     
-    # Create configuration
-    config = MetabaseConfig(
-        base_url=METABASE_CONFIG["base_url"],
-        username=METABASE_CONFIG["username"],
-        password=METABASE_CONFIG["password"]
-    )
-    
-    # Create migrator for authentication
-    migrator = MetabaseMigrator(config)
-    
-    # Authenticate
-    if not migrator.authenticate():
+    # Authenticate through the shared pooled client
+    migrator = get_authenticated_migrator()
+    if not migrator:
         print("❌ Authentication failed")
         return
     
     print("✅ Authentication successful")
     
     # Fetch metadata for Exasol database
-    response = migrator.session.get(
-        f"{migrator.config.base_url}/api/database/{EXASOL_DB_ID}/metadata",
-        headers={"X-Metabase-Session": migrator.session_token}
-    )
+    tables = stream_database_tables(migrator, EXASOL_DB_ID)
     
-    if response.status_code == 200:
-        metadata = response.json()
-        tables = metadata.get('tables', [])
-        
-        print(f"📊 Found {len(tables)} tables in Exasol database")
-        
-        # Search for tables containing GROUP_SUM or TURNOVER
+    if tables is not None:
+        # Search for tables containing GROUP_SUM or TURNOVER, one streamed table at a time
+        table_count = 0
         group_sum_tables = []
         for table in tables:
+            table_count += 1
             table_name = table.get('name', '').upper()
             if 'GROUP_SUM' in table_name or 'TURNOVER' in table_name:
                 group_sum_tables.append(table)
         
+        print(f"📊 Found {table_count} tables in Exasol database")
+        
         print(f"\n🔍 Found {len(group_sum_tables)} tables with GROUP_SUM or TURNOVER:")
         for table in group_sum_tables:
             print(f"  - {table.get('schema')}.{table.get('name')} (ID: {table.get('id')})")
@@ -61,7 +48,7 @@ def main():
                 print(f"      ... and {len(fields) - 10} more fields")
             print()
     else:
-        print(f"❌ Failed to fetch metadata: {response.status_code}")
+        print(f"❌ Failed to fetch metadata")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -4,10 +4,7 @@ Script to check Metabase questions and verify their responses after migration
 """
 
 import json
-import requests
-import time
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
-from config import METABASE_CONFIG
+from metabase_client import get_authenticated_migrator
 
 def load_migration_results():
     """Load the migration results from file"""
@@ -130,9 +127,6 @@ def check_dashboard_questions(dashboard_id, migrator):
         
         if check_question_response(question_id, question_name, migrator):
             success_count += 1
-        
-        # Add a small delay to avoid overwhelming the server
-        time.sleep(1)
     
     print(f"\n🎉 Check Summary:")
     print(f"✅ Successfully checked: {success_count}/{total_count} questions")
@@ -160,16 +154,9 @@ def check_specific_question(question_id, migrator):
 
 def main():
     """Main function"""
-    # Create configuration and authenticate
-    config = MetabaseConfig(
-        base_url=METABASE_CONFIG["base_url"],
-        username=METABASE_CONFIG["username"],
-        password=METABASE_CONFIG["password"]
-    )
-    
-    migrator = MetabaseMigrator(config)
-    
-    if not migrator.authenticate():
+    # Authenticate through the shared pooled client
+    migrator = get_authenticated_migrator()
+    if not migrator:
         print("❌ Authentication failed")
         return
     
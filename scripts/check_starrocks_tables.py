@@ -4,26 +4,17 @@ Script to check what tables are available in StarRocks database
 """
 
 import json
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
-from config import METABASE_CONFIG
+from metabase_client import get_authenticated_migrator
+from metadata_stream import stream_database_tables
 
 def main():
     """Main function"""
     
     STARROCKS_DB_ID = 7
     
-    # Create configuration
-    config = MetabaseConfig(
-        base_url=METABASE_CONFIG["base_url"],
-        username=METABASE_CONFIG["username"],
-        password=METABASE_CONFIG["password"]
-    )
-    
-    # Create migrator for authentication
-    migrator = MetabaseMigrator(config)
-    
-    # Authenticate
-    if not migrator.authenticate():
+    # Authenticate through the shared pooled client
+    migrator = get_authenticated_migrator()
+    if not migrator:
         print("❌ Authentication failed")
         return
     
@@ -33,18 +24,14 @@ def main():
     print(f"📊 Fetching metadata for StarRocks database {STARROCKS_DB_ID}...")
     
     try:
-        response = migrator.session.get(
-            f"{config.base_url}/api/database/{STARROCKS_DB_ID}/metadata",
-            headers={"X-Metabase-Session": migrator.session_token}
-        )
+        tables = stream_database_tables(migrator, STARROCKS_DB_ID)
         
-        if response.status_code == 200:
-            metadata = response.json()
+        if tables is not None:
             print(f"✅ Successfully fetched metadata for StarRocks database")
             
-            # List all tables
+            # List all tables as they are streamed in
             print(f"\n📋 Available tables in StarRocks database:")
-            for table in metadata.get('tables', []):
+            for table in tables:
                 schema = table.get('schema', 'unknown')
                 name = table.get('name', 'unknown')
                 table_id = table.get('id', 'unknown')
@@ -62,7 +49,7 @@ def main():
                     print()
             
         else:
-            print(f"❌ Failed to fetch metadata: {response.status_code}")
+            print(f"❌ Failed to fetch metadata")
             
     except Exception as e:
         print(f"❌ Error fetching metadata: {str(e)}")
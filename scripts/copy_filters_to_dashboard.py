@@ -3,34 +3,14 @@
 Script to copy Card_Geo and CARD_ISOCOUNTRY filters from Total Turnover question to all other questions on dashboard 485
 """
 
-import requests
 import json
 from config import METABASE_CONFIG
-
-def authenticate():
-    """Authenticate with Metabase"""
-    try:
-        response = requests.post(
-            f"{METABASE_CONFIG['base_url']}/api/session",
-            json={
-                "username": METABASE_CONFIG["username"],
-                "password": METABASE_CONFIG["password"]
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("id")
-        else:
-            print(f"❌ Authentication failed: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"❌ Authentication error: {str(e)}")
-        return None
+from metabase_client import authenticate, get_session
 
 def get_dashboard_details(session_token, dashboard_id):
     """Get detailed information about a dashboard"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/dashboard/{dashboard_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -47,7 +27,7 @@ def get_dashboard_details(session_token, dashboard_id):
 def get_card_details(session_token, card_id):
     """Get detailed information about a card"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/card/{card_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -128,7 +108,7 @@ def add_filters_to_card(session_token, card_id, filters_to_add):
         dataset_query['native'] = native_query
         card_data['dataset_query'] = dataset_query
         
-        update_response = requests.put(
+        update_response = get_session().put(
             f"{METABASE_CONFIG['base_url']}/api/card/{card_id}",
             headers={
                 "X-Metabase-Session": session_token,
@@ -3,34 +3,14 @@
 Script to create metric mappings and generate new StarRocks metrics with SR suffix
 """
 
-import requests
 import json
 from config import METABASE_CONFIG
-
-def authenticate():
-    """Authenticate with Metabase"""
-    try:
-        response = requests.post(
-            f"{METABASE_CONFIG['base_url']}/api/session",
-            json={
-                "username": METABASE_CONFIG["username"],
-                "password": METABASE_CONFIG["password"]
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("id")
-        else:
-            print(f"❌ Authentication failed: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"❌ Authentication error: {str(e)}")
-        return None
+from metabase_client import authenticate, get_session
 
 def fetch_starrocks_metrics(session_token):
     """Fetch metrics from StarRocks collection (ID: 767)"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/collection/767/items",
             headers={"X-Metabase-Session": session_token}
         )
@@ -48,7 +28,7 @@ def fetch_starrocks_metrics(session_token):
 def fetch_all_metrics(session_token):
     """Fetch all metrics from search endpoint"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/search?models=metric",
             headers={"X-Metabase-Session": session_token}
         )
@@ -66,7 +46,7 @@ def fetch_all_metrics(session_token):
 def get_metric_details(session_token, metric_id):
     """Get detailed information about a specific metric"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/metric/{metric_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -169,7 +149,7 @@ def create_new_starrocks_metric(session_token, original_metric, new_name):
         }
         
         # Create the new metric
-        response = requests.post(
+        response = get_session().post(
             f"{METABASE_CONFIG['base_url']}/api/metric",
             headers={
                 "X-Metabase-Session": session_token,
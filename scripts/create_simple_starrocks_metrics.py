@@ -3,34 +3,14 @@
 Script to create new StarRocks metrics with SR suffix using a simpler approach
 """
 
-import requests
 import json
 from config import METABASE_CONFIG
-
-def authenticate():
-    """Authenticate with Metabase"""
-    try:
-        response = requests.post(
-            f"{METABASE_CONFIG['base_url']}/api/session",
-            json={
-                "username": METABASE_CONFIG["username"],
-                "password": METABASE_CONFIG["password"]
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("id")
-        else:
-            print(f"❌ Authentication failed: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"❌ Authentication error: {str(e)}")
-        return None
+from metabase_client import authenticate, get_session
 
 def fetch_browse_metrics(session_token):
     """Fetch metrics from browse that are not in StarRocks collection"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/search?models=metric&archived=false",
             headers={"X-Metabase-Session": session_token}
         )
@@ -80,7 +60,7 @@ def create_simple_starrocks_metric(session_token, original_metric, new_name):
         print(f"    📋 Database: {new_metric['dataset_query']['database']}")
         
         # Try to create the metric using the card endpoint (since metrics might be cards)
-        response = requests.post(
+        response = get_session().post(
             f"{METABASE_CONFIG['base_url']}/api/card",
             headers={
                 "X-Metabase-Session": session_token,
@@ -3,34 +3,14 @@
 Script to create new StarRocks metrics with SR suffix based on browse metrics
 """
 
-import requests
 import json
 from config import METABASE_CONFIG
-
-def authenticate():
-    """Authenticate with Metabase"""
-    try:
-        response = requests.post(
-            f"{METABASE_CONFIG['base_url']}/api/session",
-            json={
-                "username": METABASE_CONFIG["username"],
-                "password": METABASE_CONFIG["password"]
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("id")
-        else:
-            print(f"❌ Authentication failed: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"❌ Authentication error: {str(e)}")
-        return None
+from metabase_client import authenticate, get_session
 
 def fetch_browse_metrics(session_token):
     """Fetch metrics from browse that are not in StarRocks collection"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/search?models=metric",
             headers={"X-Metabase-Session": session_token}
         )
@@ -54,7 +34,7 @@ def fetch_browse_metrics(session_token):
 def get_metric_details(session_token, metric_id):
     """Get detailed information about a specific metric"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/metric/{metric_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -92,7 +72,7 @@ def create_starrocks_metric(session_token, original_metric, new_name):
         print(f"    📋 Definition: {new_metric['definition']}")
         
         # Create the new metric
-        response = requests.post(
+        response = get_session().post(
             f"{METABASE_CONFIG['base_url']}/api/metric",
             headers={
                 "X-Metabase-Session": session_token,
@@ -1,4 +1,4 @@
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
+from metabase_client import get_authenticated_migrator
 
 def extract_field_ids(obj, ids):
     if isinstance(obj, list):
@@ -11,12 +11,7 @@ def extract_field_ids(obj, ids):
             extract_field_ids(v, ids)
 
 def main():
-    m = MetabaseMigrator(MetabaseConfig(
-        base_url='https://metabase.mrcr.io',
-        username='YOUR_USERNAME_HERE',
-        password='***REMOVED***'
-    ))
-    m.authenticate()
+    m = get_authenticated_migrator()
     q = m.get_question_details(5280)
     ids = set()
     extract_field_ids(q['dataset_query']['query'], ids)
@@ -1,66 +1,53 @@
 #!/usr/bin/env python3
 """
 Script to fetch metadata from Exasol and StarRocks databases and create mapping dictionaries
+
+Usage:
+    python3 scripts/fetch_metadata.py                # full rebuild
+    python3 scripts/fetch_metadata.py --incremental  # refetch only changed tables
 """
 
+import argparse
 import json
-import requests
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
-from config import METABASE_CONFIG
+import os
+from collections import defaultdict
+from metabase_client import get_authenticated_migrator
+from metadata_harvester import MetadataHarvester
+from catalog_index import CatalogIndex, map_columns_by_name
+from column_matcher import suggest_column_matches
+from config import MAPPING_SETTINGS
+from mapping_service import get_mapping_service
+from catalog_snapshot import (SNAPSHOT_VERSION, load_snapshot, save_snapshot, snapshot_from_metadata,
+                              metadata_from_snapshot)
+from column_types import TypeIndex, type_mismatches
+
+MAPPING_FILE = MAPPING_SETTINGS['mapping_file']
+SUGGESTIONS_FILE = MAPPING_SETTINGS['suggestions_file']
 
 def load_migration_exceptions():
     """Load migration exceptions from config file"""
     try:
-        with open('migration_exceptions.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print("⚠️  migration_exceptions.json not found, using empty exceptions")
-        return {"table_id_exceptions": {}, "table_name_exceptions": {}}
+        return get_mapping_service().exceptions()
     except Exception as e:
-        print(f"❌ Error loading migration_exceptions.json: {str(e)}")
+        print(f"❌ Error loading {MAPPING_SETTINGS['exceptions_file']}: {str(e)}")
         return {"table_id_exceptions": {}, "table_name_exceptions": {}}
 
-def fetch_database_metadata(database_id: int, migrator: MetabaseMigrator):
-    """Fetch metadata for a specific database"""
-    print(f"📊 Fetching metadata for database {database_id}...")
-    
-    try:
-        response = migrator.session.get(
-            f"{migrator.config.base_url}/api/database/{database_id}/metadata",
-            headers={"X-Metabase-Session": migrator.session_token}
-        )
-        
-        if response.status_code == 200:
-            metadata = response.json()
-            print(f"✅ Successfully fetched metadata for database {database_id}")
-            return metadata
-        else:
-            print(f"❌ Failed to fetch metadata for database {database_id}: {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"❌ Error fetching metadata for database {database_id}: {str(e)}")
-        return None
-
 def find_table_with_prefix(metadata, exasol_table_name, exasol_schema=None):
-    """Find a table in StarRocks with a prefix matching the Exasol schema (if any)"""
-    candidates = []
-    for table in metadata.get('tables', []):
-        name = table.get('name', '')
-        if '__' in name:
-            prefix, base_name = name.split('__', 1)
-            if base_name.upper() == exasol_table_name.upper():
-                if exasol_schema is None or prefix.upper() == exasol_schema.upper():
-                    candidates.append(table)
-        elif name.upper() == exasol_table_name.upper():
-            candidates.append(table)
-    return candidates[0] if candidates else None
+    """Find a table in StarRocks with a prefix matching the Exasol schema (if any).
+
+    Builds a CatalogIndex for a single lookup; use one index for many lookups.
+    """
+    return CatalogIndex(metadata).find_table_with_prefix(exasol_table_name, exasol_schema)
 
 def create_column_mapping_for_all_tables(exasol_metadata, starrocks_metadata, table_mapping, exceptions):
     """Create column mapping for all tables that have a successful table mapping"""
     print("\n🔍 Creating column mapping for all mapped tables...")
     column_mapping = {}
     
+    # One pass over each catalog indexes tables and fields by id and name
+    exasol_index = CatalogIndex(exasol_metadata)
+    starrocks_index = CatalogIndex(starrocks_metadata)
+    
     for exasol_table_full, starrocks_table_name in table_mapping.items():
         print(f"\n📋 Processing table mapping: {exasol_table_full} -> {starrocks_table_name}")
         
@@ -71,20 +58,8 @@ def create_column_mapping_for_all_tables(exasol_metadata, starrocks_metadata, ta
             exasol_schema = None
             exasol_name = exasol_table_full
         
-        # Find Exasol table
-        exasol_table = None
-        for table in exasol_metadata.get('tables', []):
-            if (table.get('name', '').lower() == exasol_name.lower() and 
-                table.get('schema', '').lower() == exasol_schema.lower()):
-                exasol_table = table
-                break
-        
-        # Find StarRocks table
-        starrocks_table = None
-        for table in starrocks_metadata.get('tables', []):
-            if table.get('name', '') == starrocks_table_name:
-                starrocks_table = table
-                break
+        exasol_table = exasol_index.table_by_schema_and_name(exasol_schema, exasol_name)
+        starrocks_table = starrocks_index.by_name.get(starrocks_table_name)
         
         if not exasol_table:
             print(f"  ❌ Could not find Exasol table: {exasol_table_full}")
@@ -96,17 +71,10 @@ def create_column_mapping_for_all_tables(exasol_metadata, starrocks_metadata, ta
         print(f"  ✅ Found both tables, mapping columns...")
         
         # Map columns by name
-        exasol_columns = {col.get('name', '').lower(): col for col in exasol_table.get('fields', [])}
-        starrocks_columns = {col.get('name', '').lower(): col for col in starrocks_table.get('fields', [])}
-        
-        mapped_count = 0
-        for col_name, exasol_col in exasol_columns.items():
-            if col_name in starrocks_columns:
-                starrocks_col = starrocks_columns[col_name]
-                column_mapping[str(exasol_col.get('id'))] = starrocks_col.get('id')
-                mapped_count += 1
+        table_columns = map_columns_by_name(exasol_index, exasol_table, starrocks_index, starrocks_table)
+        column_mapping.update(table_columns)
         
-        print(f"  🔄 Mapped {mapped_count} columns for {exasol_table_full}")
+        print(f"  🔄 Mapped {len(table_columns)} columns for {exasol_table_full}")
     
     # Add hardcoded exceptions from config
     for exasol_id, starrocks_id in exceptions.get('table_id_exceptions', {}).items():
@@ -115,36 +83,190 @@ def create_column_mapping_for_all_tables(exasol_metadata, starrocks_metadata, ta
     
     return column_mapping
 
+def exasol_full_name(exasol_table):
+    """schema.table key used in table_mapping"""
+    return f"{(exasol_table.get('schema') or '').lower()}.{(exasol_table.get('name') or '').lower()}"
+
+def match_starrocks_table(exasol_table, starrocks_index, exceptions):
+    """Return (StarRocks table name or None, whether it came from an exception)"""
+    exasol_full = exasol_full_name(exasol_table)
+    
+    # Check if there's a hardcoded exception for this table
+    if exasol_full in exceptions.get('table_name_exceptions', {}):
+        return exceptions['table_name_exceptions'][exasol_full], True
+    
+    # Find matching StarRocks table (by prefix logic)
+    starrocks_table = starrocks_index.find_table_with_prefix(
+        exasol_table.get('name', '').upper(), exasol_table.get('schema', '').upper()
+    )
+    return (starrocks_table.get('name') if starrocks_table else None), False
+
 def create_table_mapping(exasol_metadata, starrocks_metadata, exceptions):
     """Create mapping between Exasol and StarRocks table names"""
     print("\n🔍 Creating table mapping...")
     table_mapping = {}
     
+    # Index the StarRocks catalog once instead of scanning it for every Exasol table
+    starrocks_index = CatalogIndex(starrocks_metadata)
+    
     # For each Exasol table, find the corresponding StarRocks table
     for exasol_table in exasol_metadata.get('tables', []):
-        exasol_schema = exasol_table.get('schema', '').upper()
-        exasol_name = exasol_table.get('name', '').upper()
-        exasol_full = f"{exasol_schema.lower()}.{exasol_name.lower()}"
-        
-        # Check if there's a hardcoded exception for this table
-        if exasol_full in exceptions.get('table_name_exceptions', {}):
-            starrocks_table_name = exceptions['table_name_exceptions'][exasol_full]
+        exasol_full = exasol_full_name(exasol_table)
+        starrocks_table_name, is_exception = match_starrocks_table(exasol_table, starrocks_index, exceptions)
+        if starrocks_table_name:
             table_mapping[exasol_full] = starrocks_table_name
-            print(f"  🔄 Exception: {exasol_full} -> {starrocks_table_name}")
-            continue
-        
-        # Find matching StarRocks table (by prefix logic)
-        starrocks_table = find_table_with_prefix(starrocks_metadata, exasol_name, exasol_schema)
-        if starrocks_table:
-            table_mapping[exasol_full] = starrocks_table.get('name')
-            print(f"  {exasol_full} -> {starrocks_table.get('name')}")
+            print(f"  {'🔄 Exception: ' if is_exception else ''}{exasol_full} -> {starrocks_table_name}")
         else:
             print(f"  ⚠️  No match for {exasol_full}")
     
     return table_mapping
 
+def create_table_id_mapping(exasol_index, starrocks_index, table_mapping):
+    """Map Exasol table ids to StarRocks table ids for every mapped table"""
+    table_id_mapping = {}
+    for exasol_table_full, starrocks_table_name in table_mapping.items():
+        schema, _, name = exasol_table_full.rpartition('.')
+        exasol_table = exasol_index.table_by_schema_and_name(schema, name)
+        starrocks_table = starrocks_index.by_name.get(starrocks_table_name)
+        if exasol_table and starrocks_table:
+            table_id_mapping[str(exasol_table.get('id'))] = starrocks_table.get('id')
+    return table_id_mapping
+
+def save_column_suggestions(snapshot, migration_mapping, exasol_db_id, starrocks_db_id):
+    """Write ranked fuzzy matches for the columns the name mapping left unmapped"""
+    suggestions = suggest_column_matches(
+        metadata_from_snapshot(snapshot, exasol_db_id), metadata_from_snapshot(snapshot, starrocks_db_id),
+        migration_mapping['table_mapping'], migration_mapping['column_mapping']
+    )
+    os.makedirs(os.path.dirname(SUGGESTIONS_FILE) or '.', exist_ok=True)
+    with open(SUGGESTIONS_FILE, 'w') as f:
+        json.dump(suggestions, f, indent=2)
+    
+    print(f"\n💡 {len(suggestions)} unmapped columns have match suggestions, saved to {SUGGESTIONS_FILE}")
+    for suggestion in suggestions[:5]:
+        best = suggestion['candidates'][0]
+        print(f"  {suggestion['exasol_table']}.{suggestion['exasol_column']} -> "
+              f"{suggestion['starrocks_table']}.{best['starrocks_column']} ({best['score']}, {best['confidence']})")
+    if suggestions:
+        print("  Accepted matches go into table_id_exceptions of the exceptions file")
+
+def report_type_mismatches(snapshot, migration_mapping, exasol_db_id, starrocks_db_id):
+    """Print mapped columns whose type family changed between the databases"""
+    mismatches = type_mismatches(
+        TypeIndex(metadata_from_snapshot(snapshot, exasol_db_id)),
+        TypeIndex(metadata_from_snapshot(snapshot, starrocks_db_id)),
+        migration_mapping['column_mapping']
+    )
+    lossy = [mismatch for mismatch in mismatches if mismatch['lossy']]
+    print(f"\n🔢 {len(mismatches)} mapped columns change type family, {len(lossy)} of them DECIMAL -> FLOAT")
+    for mismatch in (lossy or mismatches)[:5]:
+        print(f"  {'⚠️  ' if mismatch['lossy'] else ''}Exasol ID {mismatch['exasol_field_id']} ({mismatch['exasol_type']}) -> "
+              f"StarRocks ID {mismatch['starrocks_field_id']} ({mismatch['starrocks_type']})")
+
+def refresh_mapping_incrementally(migrator, snapshot, exceptions, exasol_db_id, starrocks_db_id):
+    """Patch the existing mapping file for tables that changed since the snapshot.
+
+    Returns (migration_mapping, new_snapshot), or None if a full rebuild is needed.
+    """
+    try:
+        with open(MAPPING_FILE, 'r') as f:
+            migration_mapping = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️  {MAPPING_FILE} not found")
+        return None
+    
+    print("\n🔍 Checking both catalogs for changed tables...")
+    refreshed = MetadataHarvester(migrator).refresh(snapshot, [exasol_db_id, starrocks_db_id])
+    if refreshed is None:
+        print("❌ Failed to list tables for one or more databases")
+        return None
+    exasol_refresh, starrocks_refresh = refreshed[exasol_db_id], refreshed[starrocks_db_id]
+    
+    old_exasol_tables = snapshot['databases'].get(str(exasol_db_id), {})
+    old_starrocks_tables = snapshot['databases'].get(str(starrocks_db_id), {})
+    exasol_tables, exasol_changed, exasol_removed = exasol_refresh
+    starrocks_tables, starrocks_changed, starrocks_removed = starrocks_refresh
+    print(f"  Exasol: {len(exasol_changed)} new/changed, {len(exasol_removed)} removed")
+    print(f"  StarRocks: {len(starrocks_changed)} new/changed, {len(starrocks_removed)} removed")
+    
+    new_snapshot = dict(snapshot)
+    new_snapshot['databases'] = dict(snapshot['databases'])
+    new_snapshot['databases'][str(exasol_db_id)] = exasol_tables
+    new_snapshot['databases'][str(starrocks_db_id)] = starrocks_tables
+    
+    old_exasol_index = CatalogIndex(metadata_from_snapshot(snapshot, exasol_db_id))
+    exasol_index = CatalogIndex(metadata_from_snapshot(new_snapshot, exasol_db_id))
+    starrocks_index = CatalogIndex(metadata_from_snapshot(new_snapshot, starrocks_db_id))
+    table_mapping = migration_mapping.setdefault('table_mapping', {})
+    column_mapping = migration_mapping.setdefault('column_mapping', {})
+    
+    # Exasol tables whose own definition changed
+    affected = set()
+    for table_id in exasol_changed | exasol_removed:
+        for table in (old_exasol_tables.get(table_id), exasol_tables.get(table_id)):
+            if table:
+                affected.add(exasol_full_name(table))
+    
+    # Exasol tables mapped to, or now matching, a changed StarRocks table
+    starrocks_names = set()
+    for table_id in starrocks_changed | starrocks_removed:
+        for table in (old_starrocks_tables.get(table_id), starrocks_tables.get(table_id)):
+            if table:
+                starrocks_names.add(table.get('name', ''))
+    exasol_by_name = defaultdict(list)
+    for table in exasol_tables.values():
+        exasol_by_name[(table.get('name') or '').upper()].append(table)
+    for exasol_full, starrocks_name in table_mapping.items():
+        if starrocks_name in starrocks_names:
+            affected.add(exasol_full)
+    for starrocks_name in starrocks_names:
+        base_name = starrocks_name.split('__', 1)[1] if '__' in starrocks_name else starrocks_name
+        for table in exasol_by_name.get(base_name.upper(), []):
+            affected.add(exasol_full_name(table))
+    
+    print(f"\n🔄 Re-mapping {len(affected)} affected Exasol tables...")
+    exception_ids = {str(exasol_id) for exasol_id in exceptions.get('table_id_exceptions', {})}
+    for exasol_full in sorted(affected):
+        schema, name = exasol_full.split('.', 1)
+        old_table = old_exasol_index.table_by_schema_and_name(schema, name)
+        old_columns = {str(field.get('id')) for field in old_table.get('fields', [])} if old_table else set()
+        
+        exasol_table = exasol_index.table_by_schema_and_name(schema, name)
+        starrocks_table_name = None
+        if exasol_table:
+            starrocks_table_name, _ = match_starrocks_table(exasol_table, starrocks_index, exceptions)
+        starrocks_table = starrocks_index.by_name.get(starrocks_table_name) if starrocks_table_name else None
+        table_columns = {}
+        if starrocks_table:
+            table_columns = map_columns_by_name(exasol_index, exasol_table, starrocks_index, starrocks_table)
+        
+        # Entries are updated in place so the mapping file keeps its order and diffs cleanly;
+        # only what the previous mapping derived from this table and no longer holds is dropped
+        for field_id in old_columns - table_columns.keys() - exception_ids:
+            column_mapping.pop(field_id, None)
+        column_mapping.update(table_columns)
+        if starrocks_table_name:
+            table_mapping[exasol_full] = starrocks_table_name
+            print(f"  {exasol_full} -> {starrocks_table_name} ({len(table_columns)} columns)")
+        else:
+            table_mapping.pop(exasol_full, None)
+            print(f"  🗑️  {exasol_full} removed" if not exasol_table else f"  ⚠️  No match for {exasol_full}")
+    
+    # Hardcoded exceptions always win
+    for exasol_id, starrocks_id in exceptions.get('table_id_exceptions', {}).items():
+        column_mapping[str(exasol_id)] = starrocks_id
+    
+    # Derived from the refreshed catalogs in one pass, so table ids that moved are picked up too
+    migration_mapping['table_id_mapping'] = create_table_id_mapping(exasol_index, starrocks_index, table_mapping)
+    
+    return migration_mapping, new_snapshot
+
 def main():
     """Main function"""
+    parser = argparse.ArgumentParser(description="Build migrations/migration_mapping.json from Metabase metadata")
+    parser.add_argument("--incremental", action="store_true",
+                        help="refetch only tables changed since the last catalog snapshot")
+    args = parser.parse_args()
     
     # Database IDs
     EXASOL_DB_ID = 2
@@ -155,55 +277,71 @@ def main():
     print(f"📋 Loaded {len(exceptions.get('table_id_exceptions', {}))} table ID exceptions")
     print(f"📋 Loaded {len(exceptions.get('table_name_exceptions', {}))} table name exceptions")
     
-    # Create configuration
-    config = MetabaseConfig(
-        base_url=METABASE_CONFIG["base_url"],
-        username=METABASE_CONFIG["username"],
-        password=METABASE_CONFIG["password"]
-    )
-    
-    # Create migrator for authentication
-    migrator = MetabaseMigrator(config)
-    
-    # Authenticate
-    if not migrator.authenticate():
+    # Authenticate through the shared pooled client
+    migrator = get_authenticated_migrator()
+    if not migrator:
         print("❌ Authentication failed")
         return
     
     print("✅ Authentication successful")
     
-    # Fetch metadata for databases
-    exasol_metadata = fetch_database_metadata(EXASOL_DB_ID, migrator)
-    starrocks_metadata = fetch_database_metadata(STARROCKS_DB_ID, migrator)
-    
-    if not exasol_metadata or not starrocks_metadata:
-        print("❌ Failed to fetch metadata for one or more databases")
-        return
-    
-    # Create table mapping first
-    table_mapping = create_table_mapping(exasol_metadata, starrocks_metadata, exceptions)
+    result = None
+    if args.incremental:
+        snapshot = load_snapshot()
+        if snapshot is None:
+            print("⚠️  No catalog snapshot yet, doing a full rebuild")
+        elif snapshot.get('version') != SNAPSHOT_VERSION:
+            print("⚠️  Catalog snapshot predates column types, doing a full rebuild")
+        else:
+            result = refresh_mapping_incrementally(migrator, snapshot, exceptions, EXASOL_DB_ID, STARROCKS_DB_ID)
+            if result is None:
+                print("⚠️  Incremental refresh not possible, doing a full rebuild")
     
-    # Create column mapping for all mapped tables
-    column_mapping = create_column_mapping_for_all_tables(exasol_metadata, starrocks_metadata, table_mapping, exceptions)
+    if result is not None:
+        migration_mapping, snapshot = result
+    else:
+        # Fetch metadata for both databases at once
+        print(f"📊 Fetching metadata for databases {EXASOL_DB_ID} and {STARROCKS_DB_ID}...")
+        metadata = MetadataHarvester(migrator).harvest([EXASOL_DB_ID, STARROCKS_DB_ID])
+        if metadata is None:
+            print("❌ Failed to fetch metadata for one or more databases")
+            return
+        exasol_metadata, starrocks_metadata = metadata[EXASOL_DB_ID], metadata[STARROCKS_DB_ID]
+        
+        # Create table mapping first
+        table_mapping = create_table_mapping(exasol_metadata, starrocks_metadata, exceptions)
+        
+        # Create column mapping for all mapped tables
+        column_mapping = create_column_mapping_for_all_tables(exasol_metadata, starrocks_metadata, table_mapping, exceptions)
+        
+        # Table ID index for MBQL source-table references
+        table_id_mapping = create_table_id_mapping(CatalogIndex(exasol_metadata), CatalogIndex(starrocks_metadata), table_mapping)
+        
+        # Create the complete mapping dictionary
+        migration_mapping = {
+            "database_mapping": {
+                "exasol": EXASOL_DB_ID,
+                "starrocks": STARROCKS_DB_ID
+            },
+            "column_mapping": column_mapping,
+            "table_mapping": table_mapping,
+            "table_id_mapping": table_id_mapping
+        }
+        snapshot = snapshot_from_metadata(metadata)
     
-    # Create the complete mapping dictionary
-    migration_mapping = {
-        "database_mapping": {
-            "exasol": EXASOL_DB_ID,
-            "starrocks": STARROCKS_DB_ID
-        },
-        "column_mapping": column_mapping,
-        "table_mapping": table_mapping
-    }
+    table_mapping = migration_mapping['table_mapping']
+    column_mapping = migration_mapping['column_mapping']
     
     # Save mapping to file
-    with open('migrations/migration_mapping.json', 'w') as f:
+    with open(MAPPING_FILE, 'w') as f:
         json.dump(migration_mapping, f, indent=2)
+    save_snapshot(snapshot)
     
-    print(f"\n💾 Migration mapping saved to migrations/migration_mapping.json")
+    print(f"\n💾 Migration mapping saved to {MAPPING_FILE}")
     print(f"📊 Database mapping: Exasol ({EXASOL_DB_ID}) -> StarRocks ({STARROCKS_DB_ID})")
     print(f"🔗 Table mappings: {len(table_mapping)} tables mapped")
     print(f"🔗 Column mappings: {len(column_mapping)} columns mapped")
+    print(f"🔗 Table ID mappings: {len(migration_mapping['table_id_mapping'])} table IDs mapped")
     
     # Print some examples
     print("\n📝 Example table mappings:")
@@ -217,6 +355,9 @@ def main():
         print(f"  Exasol ID {exasol_id} -> StarRocks ID {starrocks_id}")
         if i >= 4:
             break
+    
+    save_column_suggestions(snapshot, migration_mapping, EXASOL_DB_ID, STARROCKS_DB_ID)
+    report_type_mismatches(snapshot, migration_mapping, EXASOL_DB_ID, STARROCKS_DB_ID)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -3,35 +3,15 @@
 Script to fix all template tags to use double brackets {{}} instead of single brackets {}
 """
 
-import requests
 import json
 import re
 from config import METABASE_CONFIG
-
-def authenticate():
-    """Authenticate with Metabase"""
-    try:
-        response = requests.post(
-            f"{METABASE_CONFIG['base_url']}/api/session",
-            json={
-                "username": METABASE_CONFIG["username"],
-                "password": METABASE_CONFIG["password"]
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("id")
-        else:
-            print(f"❌ Authentication failed: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"❌ Authentication error: {str(e)}")
-        return None
+from metabase_client import authenticate, get_session
 
 def get_dashboard_details(session_token, dashboard_id):
     """Get detailed information about a dashboard"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/dashboard/{dashboard_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -48,7 +28,7 @@ def get_dashboard_details(session_token, dashboard_id):
 def get_card_details(session_token, card_id):
     """Get detailed information about a card"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/card/{card_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -122,7 +102,7 @@ def fix_card_brackets(session_token, card_id, card_data):
         card_data['dataset_query'] = dataset_query
         
         # Send update to Metabase
-        update_response = requests.put(
+        update_response = get_session().put(
             f"{METABASE_CONFIG['base_url']}/api/card/{card_id}",
             headers={
                 "X-Metabase-Session": session_token,
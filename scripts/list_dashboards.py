@@ -3,8 +3,7 @@
 Script to list all available dashboards
 """
 
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
-from config import METABASE_CONFIG
+from metabase_client import get_authenticated_migrator
 
 def list_dashboards():
     """List all available dashboards"""
@@ -12,18 +11,9 @@ def list_dashboards():
     print("📋 Listing All Dashboards")
     print("=" * 50)
     
-    # Create configuration
-    config = MetabaseConfig(
-        base_url=METABASE_CONFIG["base_url"],
-        username=METABASE_CONFIG["username"],
-        password=METABASE_CONFIG["password"]
-    )
-    
-    # Create migrator
-    migrator = MetabaseMigrator(config)
-    
-    # Authenticate
-    if not migrator.authenticate():
+    # Authenticate through the shared pooled client
+    migrator = get_authenticated_migrator()
+    if not migrator:
         print("❌ Authentication failed")
         return
     
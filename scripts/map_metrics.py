@@ -3,34 +3,14 @@
 Script to map metrics from StarRocks collection to main metrics browse page
 """
 
-import requests
 import json
 from config import METABASE_CONFIG
-
-def authenticate():
-    """Authenticate with Metabase"""
-    try:
-        response = requests.post(
-            f"{METABASE_CONFIG['base_url']}/api/session",
-            json={
-                "username": METABASE_CONFIG["username"],
-                "password": METABASE_CONFIG["password"]
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("id")
-        else:
-            print(f"❌ Authentication failed: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"❌ Authentication error: {str(e)}")
-        return None
+from metabase_client import authenticate, get_session
 
 def fetch_collection_items(session_token, collection_id):
     """Fetch items from a specific collection"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/collection/{collection_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -57,7 +37,7 @@ def fetch_metrics_from_browse(session_token):
         ]
         
         for endpoint in endpoints:
-            response = requests.get(
+            response = get_session().get(
                 f"{METABASE_CONFIG['base_url']}{endpoint}",
                 headers={"X-Metabase-Session": session_token}
             )
@@ -1,5 +1,7 @@
 import json
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
+from metabase_client import get_authenticated_migrator
+from mapping_service import get_mapping_service
+from field_resolver import FieldResolver
 
 # Optionally enforce a specific join type for all joins
 JOIN_TYPE_OVERRIDE = 'inner-join'  # Set to None to keep original
@@ -10,45 +12,6 @@ COLUMN_NAME_TABLE_OVERRIDES = {
     # Add more overrides here as needed
 }
 
-def load_table_mapping():
-    with open('migrations/migration_mapping.json', 'r') as f:
-        mapping = json.load(f)
-    # Try both table_mapping and exasol_to_starrocks if present
-    table_mapping = mapping.get('table_mapping', {})
-    # Lowercase keys for robustness
-    return {k.lower(): v for k, v in table_mapping.items()}
-
-def get_starrocks_table_id(m, exasol_table_id, exasol_table_name, table_mapping):
-    # Try mapping by schema.table, just table, and upper/lower case
-    candidates = []
-    if exasol_table_name:
-        # Try full schema.table
-        candidates.append(exasol_table_name.lower())
-        candidates.append(exasol_table_name.upper())
-        # Try just table name (no schema)
-        if '.' in exasol_table_name:
-            table_only = exasol_table_name.split('.')[-1]
-            candidates.append(table_only.lower())
-            candidates.append(table_only.upper())
-        else:
-            candidates.append(exasol_table_name.lower())
-            candidates.append(exasol_table_name.upper())
-    if exasol_table_id:
-        candidates.append(str(exasol_table_id))
-    for key in candidates:
-        sr_table_name = table_mapping.get(key)
-        if sr_table_name:
-            print(f"[DEBUG] Table mapping: Exasol '{exasol_table_name}' (candidates: {candidates}) → StarRocks '{sr_table_name}'")
-            # Find the table ID in Metabase by name
-            resp = m.session.get(f"https://metabase.mrcr.io/api/database/16/metadata", headers={"X-Metabase-Session": m.session_token})
-            if resp.status_code == 200:
-                for t in resp.json().get('tables', []):
-                    if t.get('name') == sr_table_name:
-                        print(f"[DEBUG] Found StarRocks table ID {t.get('id')} for '{sr_table_name}'")
-                        return t.get('id')
-    print(f"[WARNING] Could not map Exasol table '{exasol_table_name}' (candidates: {candidates}) to any StarRocks table.")
-    return None
-
 def extract_field_ids_with_table(obj, ids, join_tables=None, current_table=None, current_alias=None):
     if join_tables is None:
         join_tables = {}
@@ -68,24 +31,6 @@ def extract_field_ids_with_table(obj, ids, join_tables=None, current_table=None,
             for v in obj.values():
                 extract_field_ids_with_table(v, ids, join_tables, current_table, current_alias)
 
-def get_field_name(m, field_id):
-    resp = m.session.get(f"https://metabase.mrcr.io/api/field/{field_id}", headers={"X-Metabase-Session": m.session_token})
-    if resp.status_code == 200:
-        return resp.json().get('name')
-    return None
-
-def get_starrocks_field_id(m, starrocks_table_id, column_name):
-    override = COLUMN_NAME_TABLE_OVERRIDES.get((column_name, starrocks_table_id))
-    if override is not None:
-        return override
-    resp = m.session.get(f"https://metabase.mrcr.io/api/table/{starrocks_table_id}/query_metadata", headers={"X-Metabase-Session": m.session_token})
-    if resp.status_code == 200:
-        fields = resp.json().get('fields', [])
-        for f in fields:
-            if f.get('name') == column_name:
-                return f.get('id')
-    return None
-
 def map_field_ids_by_name_with_table(obj, m, exasol_to_sr, join_tables=None, current_table=None, current_alias=None, exasol_id_to_name=None):
     if join_tables is None:
         join_tables = {}
@@ -131,13 +76,9 @@ def map_field_ids_by_name_with_table(obj, m, exasol_to_sr, join_tables=None, cur
         return obj
 
 def main():
-    m = MetabaseMigrator(MetabaseConfig(
-        base_url='https://metabase.mrcr.io',
-        username='YOUR_USERNAME_HERE',
-        password='***REMOVED***'
-    ))
-    m.authenticate()
-    table_mapping = load_table_mapping()
+    m = get_authenticated_migrator()
+    # Field names, tables and StarRocks ids are fetched in deduplicated, concurrent batches
+    resolver = FieldResolver(m, get_mapping_service().pair(), field_overrides=COLUMN_NAME_TABLE_OVERRIDES)
     q = m.get_question_details(5292)
     mbql = q['dataset_query']['query']
     # Step 1: Extract all field IDs with their table and alias context
@@ -146,30 +87,14 @@ def main():
     extract_field_ids_with_table(mbql, ids, join_tables, current_table=q['dataset_query']['query'].get('source-table'), current_alias=None)
     print('Old field IDs with table and alias context:', ids)
     # Step 2: Map Exasol field ID -> column name
-    exasol_id_to_name = {fid: get_field_name(m, fid) for fid, _, _ in ids}
+    exasol_id_to_name = resolver.field_names(fid for fid, _, _ in ids)
     print('Exasol field ID to column name:', exasol_id_to_name)
-    # Step 3: Map Exasol table ID/name to StarRocks table ID
-    # Get all table IDs/names used in MBQL
-    all_tables = set([table_id for _, table_id, _ in ids])
-    exasol_table_id_to_name = {}
-    for table_id in all_tables:
-        # Try to get table name from Metabase
-        resp = m.session.get(f"https://metabase.mrcr.io/api/table/{table_id}", headers={"X-Metabase-Session": m.session_token})
-        if resp.status_code == 200:
-            exasol_table_id_to_name[table_id] = resp.json().get('name')
-        else:
-            exasol_table_id_to_name[table_id] = None
-    sr_table_ids = {}
-    for table_id, table_name in exasol_table_id_to_name.items():
-        sr_table_ids[table_id] = get_starrocks_table_id(m, table_id, table_name, table_mapping)
+    # Step 3: Map Exasol table ID to StarRocks table ID
+    sr_table_ids = resolver.resolve_tables(table_id for _, table_id, _ in ids if table_id)
     print('Exasol table ID to StarRocks table ID:', sr_table_ids)
     # Step 4: Map (Exasol field ID, table, alias) -> StarRocks field ID
-    exasol_to_sr = {}
-    for (fid, table_id, alias) in ids:
-        col_name = exasol_id_to_name[fid]
-        sr_table_id = sr_table_ids.get(table_id)
-        sr_id = get_starrocks_field_id(m, sr_table_id, col_name) if sr_table_id else None
-        exasol_to_sr[(fid, table_id, alias)] = sr_id
+    sr_field_ids = resolver.resolve_fields(fid for fid, _, _ in ids)
+    exasol_to_sr = {(fid, table_id, alias): sr_field_ids.get(fid) for fid, table_id, alias in ids}
     print('Exasol (field ID, table, alias) to StarRocks field ID:', exasol_to_sr)
     # Step 5: Update MBQL structure
     new_mbql = map_field_ids_by_name_with_table(mbql, m, exasol_to_sr, join_tables, current_table=q['dataset_query']['query'].get('source-table'), current_alias=None, exasol_id_to_name=exasol_id_to_name)
@@ -189,10 +114,10 @@ def main():
     update_source_tables(new_mbql)
     # Set root database_id and table_id to the first StarRocks table found
     sr_main_table = list(sr_table_ids.values())[0] if sr_table_ids else None
-    q['dataset_query']['database'] = 16
+    q['dataset_query']['database'] = resolver.mapping.target_database
     q['dataset_query']['query'] = new_mbql
     if sr_main_table:
-        q['database_id'] = 16
+        q['database_id'] = resolver.mapping.target_database
         q['table_id'] = sr_main_table
     print('New MBQL structure with mapped field IDs:')
     print(json.dumps(new_mbql, indent=2))
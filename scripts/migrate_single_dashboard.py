@@ -5,8 +5,7 @@ Script to migrate a single specific dashboard
 
 import sys
 import json
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
-from config import METABASE_CONFIG
+from metabase_client import get_migrator
 
 def migrate_single_dashboard(dashboard_id: int, dashboard_name: str = None):
     """Migrate a single dashboard by ID"""
@@ -18,20 +17,9 @@ def migrate_single_dashboard(dashboard_id: int, dashboard_name: str = None):
         print(f"Dashboard Name: {dashboard_name}")
     print()
     
-    # Create configuration
+    # Create migrator (shared pooled client)
     try:
-        config = MetabaseConfig(
-            base_url=METABASE_CONFIG["base_url"],
-            username=METABASE_CONFIG["username"],
-            password=METABASE_CONFIG["password"]
-        )
-    except Exception as e:
-        print(f"❌ Configuration error: {e}")
-        return None
-    
-    # Create migrator
-    try:
-        migrator = MetabaseMigrator(config)
+        migrator = get_migrator()
         print("✅ Migration tool initialized")
     except Exception as e:
         print(f"❌ Failed to initialize migration tool: {e}")
@@ -3,34 +3,14 @@
 Script to replace Exasol-based metrics in dashboard 500 with StarRocks metrics
 """
 
-import requests
 import json
 from config import METABASE_CONFIG
-
-def authenticate():
-    """Authenticate with Metabase"""
-    try:
-        response = requests.post(
-            f"{METABASE_CONFIG['base_url']}/api/session",
-            json={
-                "username": METABASE_CONFIG["username"],
-                "password": METABASE_CONFIG["password"]
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("id")
-        else:
-            print(f"❌ Authentication failed: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"❌ Authentication error: {str(e)}")
-        return None
+from metabase_client import authenticate, get_session
 
 def get_dashboard_details(session_token, dashboard_id):
     """Get detailed information about a dashboard"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/dashboard/{dashboard_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -47,7 +27,7 @@ def get_dashboard_details(session_token, dashboard_id):
 def get_starrocks_metrics(session_token):
     """Get all StarRocks metrics (cards) from collection 767"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/collection/767/items",
             headers={"X-Metabase-Session": session_token}
         )
@@ -79,7 +59,7 @@ def update_dashboard_card(session_token, card_id, new_metric_id):
     """Update a dashboard card to use a new metric"""
     try:
         # Get the current card details
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/card/{card_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -104,7 +84,7 @@ def update_dashboard_card(session_token, card_id, new_metric_id):
         }
         
         # Update the card
-        update_response = requests.put(
+        update_response = get_session().put(
             f"{METABASE_CONFIG['base_url']}/api/card/{card_id}",
             headers={
                 "X-Metabase-Session": session_token,
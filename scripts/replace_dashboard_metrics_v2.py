@@ -3,34 +3,14 @@
 Improved script to replace Exasol metrics in dashboard 500 with StarRocks metrics
 """
 
-import requests
 import json
 from config import METABASE_CONFIG
-
-def authenticate():
-    """Authenticate with Metabase"""
-    try:
-        response = requests.post(
-            f"{METABASE_CONFIG['base_url']}/api/session",
-            json={
-                "username": METABASE_CONFIG["username"],
-                "password": METABASE_CONFIG["password"]
-            }
-        )
-        
-        if response.status_code == 200:
-            return response.json().get("id")
-        else:
-            print(f"❌ Authentication failed: {response.status_code}")
-            return None
-    except Exception as e:
-        print(f"❌ Authentication error: {str(e)}")
-        return None
+from metabase_client import authenticate, get_session
 
 def get_dashboard_details(session_token, dashboard_id):
     """Get detailed information about a dashboard"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/dashboard/{dashboard_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -47,7 +27,7 @@ def get_dashboard_details(session_token, dashboard_id):
 def get_all_metrics(session_token):
     """Get all metrics and create a mapping"""
     try:
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/search?models=metric&archived=false",
             headers={"X-Metabase-Session": session_token}
         )
@@ -121,7 +101,7 @@ def update_card_metric(session_token, card_id, new_metric_id):
     """Update a card to use a new metric"""
     try:
         # Get the current card details
-        response = requests.get(
+        response = get_session().get(
             f"{METABASE_CONFIG['base_url']}/api/card/{card_id}",
             headers={"X-Metabase-Session": session_token}
         )
@@ -153,7 +133,7 @@ def update_card_metric(session_token, card_id, new_metric_id):
             card_data['dataset_query'] = dataset_query
         
         # Update the card
-        update_response = requests.put(
+        update_response = get_session().put(
             f"{METABASE_CONFIG['base_url']}/api/card/{card_id}",
             headers={
                 "X-Metabase-Session": session_token,
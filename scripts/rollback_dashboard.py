@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Script to roll migrated dashboards back from StarRocks to Exasol
+
+Usage:
+    python3 scripts/rollback_dashboard.py 503 504
+    python3 scripts/rollback_dashboard.py 385 --results migrations/dashboard_385_migration.json
+    python3 scripts/rollback_dashboard.py 503 --dry-run
+    python3 scripts/rollback_dashboard.py 503 --tables-only
+
+Native cards are restored from the original SQL in the migration results
+(migrations/dashboard_<id>_migration.json by default). Cards without it are
+skipped: reversing the table names alone leaves the rest of the StarRocks
+conversion in place, which --tables-only accepts.
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from catalog_index import CatalogIndex
+from catalog_snapshot import load_snapshot, metadata_from_snapshot
+from config import MIGRATION_SETTINGS
+from mapping_service import get_mapping_service
+from metabase_client import get_authenticated_migrator
+from rollback import CardRollback
+
+def load_original_sql(results_files):
+    """Original SQL per question id from migration results files"""
+    original_sql = {}
+    for path in results_files:
+        with open(path, 'r') as f:
+            results = json.load(f)
+        for dashboard in results:
+            for question in dashboard.get('questions', []):
+                if question.get('original_sql'):
+                    original_sql[question['question_id']] = question['original_sql']
+    return original_sql
+
+def rollback_question(migrator, rollback, card_id, original_sql, dry_run, tables_only=False):
+    card = migrator.get_question_details(card_id)
+    if not card:
+        return card_id, "❌ not found"
+    if card.get('dataset_query', {}).get('database') != rollback.mapping.target_database:
+        return card_id, "⏭️  not on StarRocks"
+    if card['dataset_query'].get('type') == 'native' and card_id not in original_sql and not tables_only:
+        return card_id, "⚠️  no original SQL recorded (--tables-only reverses the table names only)"
+    update = rollback.rollback_card(card, original_sql.get(card_id))
+    if dry_run:
+        return card_id, "🔍 would roll back"
+    response = migrator.update_question_details(card_id, update)
+    if response.status_code != 200:
+        return card_id, f"❌ update failed: {response.status_code}"
+    return card_id, "✅ rolled back"
+
+def rollback_dashboard(migrator, rollback, dashboard_id, original_sql, dry_run=False, tables_only=False):
+    """Roll back every card of a dashboard and its dashcard parameter mappings"""
+    print(f"\n🔄 Rolling back dashboard {dashboard_id}")
+    dashboard = migrator.get_dashboard_details(dashboard_id)
+    if not dashboard:
+        print(f"❌ Dashboard {dashboard_id} not found")
+        return False
+
+    card_ids = sorted({dashcard['card_id'] for dashcard in dashboard.get('dashcards', []) if dashcard.get('card_id')})
+    with ThreadPoolExecutor(max_workers=MIGRATION_SETTINGS.get("max_concurrency", 8)) as executor:
+        outcomes = list(executor.map(
+            lambda card_id: rollback_question(migrator, rollback, card_id, original_sql, dry_run, tables_only),
+            card_ids))
+    for card_id, outcome in outcomes:
+        print(f"  Card {card_id}: {outcome}")
+
+    # Dashboard filters are wired to fields through the dashcards of the rolled-back cards
+    rolled_back = {card_id for card_id, outcome in outcomes if outcome.startswith(("✅", "🔍"))}
+    dashcards = []
+    for dashcard in dashboard.get('dashcards', []):
+        dashcard = dict(dashcard)
+        if dashcard.get('card_id') in rolled_back and dashcard.get('parameter_mappings'):
+            dashcard['parameter_mappings'] = rollback.rollback_parameter_mappings(dashcard['parameter_mappings'])
+        dashcards.append(dashcard)
+    if dashcards != dashboard.get('dashcards', []) and not dry_run:
+        response = migrator.session.put(
+            urljoin(migrator.config.base_url, f"/api/dashboard/{dashboard_id}"),
+            headers={"X-Metabase-Session": migrator.session_token, "Content-Type": "application/json"},
+            json={"dashcards": dashcards}
+        )
+        if response.status_code != 200:
+            print(f"  ❌ Dashcard parameter mappings not restored: {response.status_code}")
+            return False
+        print("  ✅ Dashcard parameter mappings restored")
+    return all(outcome.startswith(("✅", "⏭️", "🔍")) for _, outcome in outcomes)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Roll migrated dashboards back to Exasol")
+    parser.add_argument("dashboard_ids", nargs="+", type=int)
+    parser.add_argument("--results", nargs="*", default=[],
+                        help="migration results files whose original_sql is restored verbatim "
+                             "(default: migrations/dashboard_<id>_migration.json where it exists)")
+    parser.add_argument("--dry-run", action="store_true", help="show what would be rolled back")
+    parser.add_argument("--tables-only", action="store_true",
+                        help="roll back native cards without original SQL by reversing their table names")
+    args = parser.parse_args()
+
+    mapping = get_mapping_service().pair()
+    if mapping is None:
+        print("❌ Migration mapping file not found. Please run fetch_metadata.py first.")
+        return
+
+    # The Exasol catalog settles which of several fields mapped onto one StarRocks field a card used
+    snapshot = load_snapshot()
+    source_catalog = CatalogIndex(metadata_from_snapshot(snapshot, mapping.source_database)) if snapshot else None
+    rollback = CardRollback(mapping, source_catalog)
+    results = args.results or [path for path in (f"migrations/dashboard_{dashboard_id}_migration.json"
+                                                 for dashboard_id in args.dashboard_ids) if os.path.exists(path)]
+    original_sql = load_original_sql(results)
+
+    migrator = get_authenticated_migrator()
+    if not migrator:
+        print("❌ Authentication failed")
+        return
+
+    failed = [dashboard_id for dashboard_id in args.dashboard_ids
+              if not rollback_dashboard(migrator, rollback, dashboard_id, original_sql, args.dry_run, args.tables_only)]
+
+    for message in rollback.ambiguous:
+        print(f"⚠️  Ambiguous: {message}")
+    for message in sorted(rollback.unmapped):
+        print(f"⚠️  No Exasol counterpart for {message}")
+    if failed:
+        print(f"\n❌ Rollback incomplete for dashboards {failed}")
+    else:
+        print(f"\n🎉 Rolled back {len(args.dashboard_ids)} dashboards")
+
+if __name__ == "__main__":
+    main()
@@ -4,19 +4,16 @@ Script to update a specific Metabase question with converted StarRocks SQL
 """
 
 import json
-import requests
 import re
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
-from config import METABASE_CONFIG
+from metabase_client import get_authenticated_migrator
+from mapping_service import get_mapping_service
 
 def load_migration_mapping():
-    """Load the migration mapping from file"""
-    try:
-        with open('migration_mapping.json', 'r') as f:
-            return json.load(f)
-    except FileNotFoundError:
+    """Load the migration mapping through the shared mapping service"""
+    migration_mapping = get_mapping_service().migration_mapping()
+    if migration_mapping is None:
         print("❌ Migration mapping file not found. Please run fetch_metadata.py first.")
-        return None
+    return migration_mapping
 
 def update_template_tags(template_tags, column_mapping):
     """Update template tags with new column IDs"""
@@ -62,18 +59,9 @@ def update_question_sql(question_id: int, new_sql: str):
     print(f"🔄 Updating Question {question_id}")
     print("=" * 50)
     
-    # Create configuration
-    config = MetabaseConfig(
-        base_url=METABASE_CONFIG["base_url"],
-        username=METABASE_CONFIG["username"],
-        password=METABASE_CONFIG["password"]
-    )
-    
-    # Create migrator for authentication
-    migrator = MetabaseMigrator(config)
-    
-    # Authenticate
-    if not migrator.authenticate():
+    # Authenticate through the shared pooled client
+    migrator = get_authenticated_migrator()
+    if not migrator:
         print("❌ Authentication failed")
         return
     
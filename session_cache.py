@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of Metabase session tokens.
+
+Logging in via POST /api/session is slow and rate-limited, and every login
+leaves another session behind on the server. Tokens are stored per
+(base_url, username) with their expiry, so a script that starts while the last
+token is still valid reuses it instead of logging in again.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class SessionTokenCache:
+    """JSON file of session tokens keyed by Metabase instance and user"""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = os.path.expanduser(path)
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(base_url: str, username: str) -> str:
+        return f"{base_url.rstrip('/')}|{username}"
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save(self, entries: dict):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Tokens are credentials: mkstemp creates the file private to the user (0600),
+        # under a name no other process writing the cache at the same time uses
+        fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f"{os.path.basename(self.path)}.",
+                                        suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, base_url: str, username: str) -> Optional[str]:
+        """Return the cached token if it has not expired yet"""
+        with self._lock:
+            entry = self._load().get(self._key(base_url, username))
+        if not entry or entry.get("expires_at", 0) <= time.time():
+            return None
+        return entry.get("token")
+
+    def store(self, base_url: str, username: str, token: str):
+        """Remember a freshly issued token"""
+        try:
+            with self._lock:
+                entries = self._load()
+                now = time.time()
+                # Drop expired entries while we are here
+                entries = {k: v for k, v in entries.items() if v.get("expires_at", 0) > now}
+                entries[self._key(base_url, username)] = {
+                    "token": token,
+                    "created_at": now,
+                    "expires_at": now + self.ttl_seconds
+                }
+                self._save(entries)
+        except OSError as e:
+            logger.warning(f"Could not write session cache {self.path}: {str(e)}")
+
+    def discard(self, base_url: str, username: str):
+        """Forget a token the server no longer accepts"""
+        try:
+            with self._lock:
+                entries = self._load()
+                if entries.pop(self._key(base_url, username), None) is not None:
+                    self._save(entries)
+        except OSError as e:
+            logger.warning(f"Could not write session cache {self.path}: {str(e)}")
@@ -56,12 +56,54 @@ FUNCTION_MAPPINGS = {
     "CURRENT_DATE": "CURDATE()",
 }
 
+# HTTP connection pool shared by the migrator and all scripts
+HTTP_SETTINGS = {
+    "pool_connections": 4,   # number of hosts to keep pools for
+    "pool_maxsize": 16,      # keep-alive connections per host
+    "pool_block": False,     # open extra connections instead of waiting when the pool is busy
+}
+
+# Session tokens are cached on disk so scripts skip POST /api/session
+SESSION_CACHE_SETTINGS = {
+    "enabled": True,
+    "path": "~/.metabase_migration/session.json",
+    "ttl_hours": 24 * 13,  # just under Metabase's default 14 day session lifetime
+}
+
+# Adaptive rate limiting shared by all Metabase API calls
+RATE_LIMIT_SETTINGS = {
+    "initial_concurrency": 4,  # concurrent requests before any feedback
+    "min_concurrency": 1,
+    "max_concurrency": 16,
+    "latency_target": 5.0,     # seconds; slower average responses trigger a back-off
+    "backoff_factor": 0.5,     # multiply the concurrency limit by this on 429/5xx
+    "max_interval": 10.0,      # upper bound on the delay between requests when backing off
+}
+
+# Migration mapping files and the SQLite store they are loaded into
+MAPPING_SETTINGS = {
+    "mapping_file": "migrations/migration_mapping.json",
+    "exceptions_file": "results/migration_exceptions.json",
+    "column_config_file": "column_mapping_config.json",
+    "store_path": "migrations/mapping_store.sqlite3",
+    "suggestions_file": "results/column_match_suggestions.json",
+}
+
+# Converted card SQL, cached by source SQL, mapping and rule set (see conversion_cache.py)
+CONVERSION_CACHE_SETTINGS = {
+    "enabled": True,
+    "path": "migrations/conversion_cache.sqlite3",  # relative to the repository root
+    "max_entries": 20000,  # least recently used entries beyond this are pruned
+}
+
 # Migration settings
 MIGRATION_SETTINGS = {
     "preserve_variables": True,
     "backup_original_sql": True,
     "output_format": "json",
     "include_metadata": True,
+    "max_concurrency": 8,  # parallel Metabase API calls during migration
+    "sql_conversion_mode": "regex",  # regex, ast (parser-backed, see sql_transpiler.py)
 }
 '''
     
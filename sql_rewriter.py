@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Single-pass rewriter for the Exasol functions and keywords StarRocks does not
+understand.
+
+The SQL is lexed once into tokens (string literals, quoted identifiers,
+comments and Metabase {{variables}} are single tokens, so nothing inside them
+is ever rewritten). Parentheses and top-level commas are paired in one stack
+pass over their positions, and one walk applies every rule and emits the
+result. The walk jumps from one rule keyword to the next and copies the tokens
+in between as they are, so its cost follows the SQL size rather than the number
+of rules:
+
+- NULLIFZERO(x) -> NULLIF(x, 0), zeroifnull(x) -> ifnull(x, 0),
+  one-argument nullif(x) -> ifnull(x, 0)
+- NULLIF(x, 0) -> NULLIF(cast(x as float), 0) and
+  sum(a)/sum(b) -> sum(a)/cast(sum(b) as float), where float_cast(x) says so
+- convert -> cast, to_char -> char, to_date -> date, listagg -> group_concat
+- json_value(x, 'path') -> parse_json(x)->'path'
+- median(x) and PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY x)
+  -> PERCENTILE_CONT(x, 0.5)
+- date_trunc(alias.granularity, x) -> date_trunc({{granularity}}, x)
+- grouping -> grouped, PARTITION BY 1 dropped, OVER () spelled out
+- (select * from t) after FROM gets the alias a derived table needs
+
+Function arguments are split on top-level commas, so nested calls such as
+median(coalesce(a, b)) are rewritten inside out instead of being cut at the
+first closing parenthesis. FULL OUTER JOIN and count(distinct ...) over (...)
+are reported in `warnings` since they need a manual rewrite.
+"""
+
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+# One alternative per token; the order makes strings, comments and {{variables}}
+# win over anything that could start inside them
+TOKEN_PATTERN = re.compile(r"""(
+    \{\{.*?\}\}                          # Metabase variable
+  | \[\[ | \]\]                          # Metabase optional clause
+  | --[^\n]* | /\*.*?(?:\*/|$)           # comments
+  | '(?:[^']|'')*'? | "(?:[^"]|"")*"?    # string literal, quoted identifier
+  | [A-Za-z_][A-Za-z0-9_$]*              # word
+  | (?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?
+  | \s+
+  | ->> | -> | :: | <= | >= | <> | != | \|\| | .
+)""", re.VERBOSE | re.DOTALL)
+
+# Words after a derived table that cannot be its alias
+CLAUSE_KEYWORDS = {
+    "where", "group", "order", "having", "limit", "union", "intersect", "except", "minus",
+    "join", "inner", "left", "right", "full", "cross", "on", "using", "qualify", "window",
+}
+
+RENAMED_FUNCTIONS = {
+    "convert": "cast",
+    "to_char": "char",
+    "to_date": "date",
+    "listagg": "group_concat",
+}
+
+STRUCTURE_TOKENS = {'(', ')', ','}
+
+def tokenize(sql: str) -> List[str]:
+    """Tokens covering the SQL exactly: ''.join(tokenize(sql)) == sql"""
+    return TOKEN_PATTERN.findall(sql)
+
+def is_word(token: str) -> bool:
+    return token[0].isalpha() or token[0] == '_'
+
+def match_parentheses(tokens: List[str]) -> Tuple[Dict[int, int], Dict[int, List[int]]]:
+    """Closing parenthesis of every balanced opening one, and the commas directly inside it"""
+    closing: Dict[int, int] = {}
+    commas: Dict[int, List[int]] = defaultdict(list)
+    stack = []
+    for index in [index for index, token in enumerate(tokens) if token in STRUCTURE_TOKENS]:
+        token = tokens[index]
+        if token == '(':
+            stack.append(index)
+        elif token == ')':
+            if stack:
+                closing[stack.pop()] = index
+        elif stack:
+            commas[stack[-1]].append(index)
+    return closing, commas
+
+class SQLRewriter:
+    """Rewrites one SQL string per call; counters accumulate across calls"""
+
+    def __init__(self, float_cast: Optional[Callable[[str], bool]] = None):
+        self.float_cast = float_cast or (lambda expression: True)
+        self.rewrites: Counter = Counter()
+        self.skipped_casts = 0
+        self.warnings: List[str] = []
+        self._calls = {
+            "nullifzero": self._nullifzero,
+            "zeroifnull": self._zeroifnull,
+            "nullif": self._nullif,
+            "json_value": self._json_value,
+            "median": self._median,
+            "percentile_cont": self._percentile_cont,
+            "date_trunc": self._date_trunc,
+            "sum": self._sum,
+            "count": self._count,
+        }
+        for name in RENAMED_FUNCTIONS:
+            self._calls[name] = self._rename
+        self._keywords = {
+            "grouping": self._grouping,
+            "partition": self._partition,
+            "over": self._over,
+            "full": self._full_outer_join,
+            "from": self._derived_table,
+        }
+        self._triggers = set(self._calls) | set(self._keywords)
+
+    def rewrite(self, sql: str) -> str:
+        if not sql:
+            return sql
+        self._tokens = tokenize(sql)
+        self._closing, self._commas = match_parentheses(self._tokens)
+        self._trigger_indexes = [index for index, token in enumerate(map(str.lower, self._tokens))
+                                 if token in self._triggers]
+        return self._walk(0, len(self._tokens))
+
+    def _walk(self, start: int, end: int) -> str:
+        """Rewritten text of tokens[start:end]"""
+        tokens, triggers = self._tokens, self._trigger_indexes
+        output = []
+        position = start
+        next_trigger = bisect_left(triggers, start)
+        while next_trigger < len(triggers) and triggers[next_trigger] < end:
+            index = triggers[next_trigger]
+            word = tokens[index].lower()
+            if word in self._calls:
+                call = self._call_at(index, end)
+                rewritten = self._rewrite_call(word, index, call, end) if call else None
+            else:
+                rewritten = self._keywords[word](index, end)
+            if rewritten is None:
+                next_trigger += 1
+                continue
+            text, after = rewritten
+            output.append(''.join(tokens[position:index]))
+            output.append(text)
+            position = after
+            next_trigger = bisect_left(triggers, after, next_trigger + 1)
+        output.append(''.join(tokens[position:end]))
+        return ''.join(output)
+
+    def _next(self, index: int, end: int) -> int:
+        """Index of the first non-whitespace token at or after index"""
+        while index < end and self._tokens[index].isspace():
+            index += 1
+        return index
+
+    def _is(self, index: int, end: int, *texts: str) -> bool:
+        return index < end and self._tokens[index].lower() in texts
+
+    def _call_at(self, index: int, end: int) -> Optional[Tuple[int, int]]:
+        """(open, close) of the argument list if a function call starts at index"""
+        open_index = self._next(index + 1, end)
+        if self._is(open_index, end, '(') and self._closing.get(open_index, end) < end:
+            return open_index, self._closing[open_index]
+        return None
+
+    def _arguments(self, open_index: int, close_index: int) -> List[str]:
+        """Rewritten arguments of a call, split on top-level commas, whitespace kept"""
+        arguments = []
+        start = open_index + 1
+        for comma in self._commas.get(open_index, ()):
+            arguments.append(self._walk(start, comma))
+            start = comma + 1
+        arguments.append(self._walk(start, close_index))
+        return arguments
+
+    def _rewrite_call(self, word: str, index: int, call: Tuple[int, int], end: int):
+        """(text, next index) for a call to a function with a rule"""
+        open_index, close_index = call
+        arguments = self._arguments(open_index, close_index)
+        rewritten = self._calls[word](word, arguments, close_index + 1, end)
+        if rewritten is not None:
+            self.rewrites[word] += 1
+            return rewritten
+        # No rule applied: keep the call as written, with its arguments rewritten
+        prefix = ''.join(self._tokens[index:open_index])
+        return f"{prefix}({','.join(arguments)})", close_index + 1
+
+    def _nullifzero(self, word, arguments, after, end):
+        if len(arguments) == 1:
+            return self._nullif(word, [arguments[0], '0'], after, end) or (f"NULLIF({arguments[0].strip()}, 0)", after)
+        return None
+
+    def _zeroifnull(self, word, arguments, after, end):
+        if len(arguments) == 1:
+            return f"ifnull({arguments[0].strip()}, 0)", after
+        return None
+
+    def _nullif(self, word, arguments, after, end):
+        if len(arguments) == 1:
+            return f"ifnull({arguments[0].strip()}, 0)", after
+        value = arguments[0].strip()
+        if len(arguments) != 2 or arguments[1].strip() != '0' or re.match(r'cast\(', value, re.IGNORECASE):
+            return None
+        if not self.float_cast(value):
+            self.skipped_casts += 1
+            return None
+        return f"NULLIF(cast({value} as float), 0)", after
+
+    def _rename(self, word, arguments, after, end):
+        return f"{RENAMED_FUNCTIONS[word]}({','.join(arguments).strip()})", after
+
+    def _json_value(self, word, arguments, after, end):
+        if len(arguments) != 2:
+            return None
+        path = arguments[1].strip()
+        if len(path) < 2 or path[0] not in "'\"" or path[-1] != path[0] or path[0] in path[1:-1]:
+            return None
+        return f"parse_json({arguments[0].strip()})->'{path[1:-1]}'", after
+
+    def _median(self, word, arguments, after, end):
+        if len(arguments) == 1:
+            return f"PERCENTILE_CONT({arguments[0].strip()}, 0.5)", after
+        return None
+
+    def _percentile_cont(self, word, arguments, after, end):
+        """PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY x) -> PERCENTILE_CONT(x, 0.5)"""
+        if len(arguments) != 1 or arguments[0].strip() != '0.5':
+            return None
+        within = self._next(after, end)
+        group = self._next(within + 1, end)
+        if not (self._is(within, end, 'within') and self._is(group, end, 'group')):
+            return None
+        call = self._call_at(group, end)
+        if not call:
+            return None
+        order = self._next(call[0] + 1, end)
+        by = self._next(order + 1, end)
+        if not (self._is(order, end, 'order') and self._is(by, end, 'by')):
+            return None
+        return f"PERCENTILE_CONT({self._walk(by + 1, call[1]).strip()}, 0.5)", call[1] + 1
+
+    def _date_trunc(self, word, arguments, after, end):
+        if len(arguments) == 2 and re.fullmatch(r'[A-Za-z_]+\.granularity', arguments[0].strip(), re.IGNORECASE):
+            return f"date_trunc({{{{granularity}}}}, {arguments[1].strip()})", after
+        return None
+
+    def _sum(self, word, arguments, after, end):
+        """sum(a)/sum(b) -> sum(a)/cast(sum(b) as float) unless a or b is decimal/float"""
+        slash = self._next(after, end)
+        denominator = self._next(slash + 1, end)
+        if not (self._is(slash, end, '/') and self._is(denominator, end, 'sum')):
+            return None
+        call = self._call_at(denominator, end)
+        if not call:
+            return None
+        numerator = ','.join(arguments).strip()
+        divisor = ','.join(self._arguments(*call)).strip()
+        if not (self.float_cast(numerator) and self.float_cast(divisor)):
+            self.skipped_casts += 1
+            return f"sum({numerator})/sum({divisor})", call[1] + 1
+        return f"sum({numerator})/cast(sum({divisor}) as float)", call[1] + 1
+
+    def _count(self, word, arguments, after, end):
+        if arguments[0].strip().lower().startswith('distinct') and self._is(self._next(after, end), end, 'over'):
+            self.warnings.append("Found DISTINCT in window function - not supported in StarRocks")
+        return None
+
+    def _grouping(self, index, end):
+        self.rewrites['grouping'] += 1
+        return 'grouped', index + 1
+
+    def _partition_by_one(self, index: int, end: int) -> Optional[int]:
+        """Index after PARTITION BY 1, which StarRocks rejects, or None"""
+        by = self._next(index + 1, end)
+        one = self._next(by + 1, end)
+        if self._is(by, end, 'by') and self._is(one, end, '1'):
+            self.rewrites['partition'] += 1
+            return one + 1
+        return None
+
+    def _partition(self, index, end):
+        after = self._partition_by_one(index, end)
+        return ('', after) if after is not None else None
+
+    def _over(self, index, end):
+        """OVER () and OVER (PARTITION BY 1) -> OVER ()"""
+        open_index = self._next(index + 1, end)
+        if not self._is(open_index, end, '('):
+            return None
+        inner = self._next(open_index + 1, end)
+        if self._is(inner, end, 'partition'):
+            after = self._partition_by_one(inner, end)
+            if after is None:
+                return None
+            inner = self._next(after, end)
+        if inner < end and self._closing.get(open_index) == inner:
+            return 'OVER ()', inner + 1
+        return None
+
+    def _full_outer_join(self, index, end):
+        outer = self._next(index + 1, end)
+        if self._is(outer, end, 'outer') and self._is(self._next(outer + 1, end), end, 'join'):
+            self.warnings.append("Found FULL OUTER JOIN - may need manual conversion")
+        return None
+
+    def _derived_table(self, index, end):
+        """FROM (select * from t) without an alias -> FROM (select * from t) as subquery"""
+        open_index = self._next(index + 1, end)
+        close_index = self._closing.get(open_index, end)
+        if close_index >= end:
+            return None
+        select = self._next(open_index + 1, end)
+        star = self._next(select + 1, end)
+        inner_from = self._next(star + 1, end)
+        if not (self._is(select, end, 'select') and self._is(star, end, '*') and self._is(inner_from, end, 'from')):
+            return None
+        if '(' in self._tokens[inner_from:close_index]:
+            return None
+        following = self._next(close_index + 1, end)
+        if following < end and (is_word(self._tokens[following]) or self._tokens[following][0] == '"') \
+                and self._tokens[following].lower() not in CLAUSE_KEYWORDS:
+            return None
+        self.rewrites['subquery_alias'] += 1
+        inner = self._walk(inner_from + 1, close_index).strip()
+        return f"{self._tokens[index]} (select * from {inner}) as subquery", close_index + 1
@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Parser-backed Exasol -> StarRocks conversion, the "ast" sql_conversion_mode.
+
+The SQL is tokenized with sql_rewriter.tokenize and parsed once into a light
+tree: parenthesized groups, and function calls whose arguments are split on
+top-level commas. Every other token (words, literals, comments, Metabase
+{{variables}} and the [[ ]] around optional clauses) is a leaf that is printed
+back exactly as it was, so anything no rule touches comes out byte for byte.
+
+The rules are tree transforms applied bottom-up in one walk, so the arguments
+of a call are converted before the call itself and nesting depth does not
+matter (MEDIAN(coalesce(a, b)), to_char(cast(x as date), 'YYYY-MM')):
+
+- calls: FUNCTION_MAPPINGS renames, ADD_DAYS/ADD_MONTHS/... -> DATE_ADD(d,
+  INTERVAL n unit), INSTR(s, t) -> LOCATE(t, s), CONVERT(type, x) ->
+  CAST(x AS type), to_char/to_date with a format -> date_format/str_to_date,
+  MEDIAN(x) -> PERCENTILE_CONT(x, 0.5), NULLIFZERO, ZEROIFNULL, json_value,
+  date_trunc on the granularity field, and the float casts of NULLIF(x, 0)
+- sequences: PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY x), LISTAGG(...)
+  WITHIN GROUP (ORDER BY ...), sum(a)/sum(b), SELECT TOP n (moved to a LIMIT
+  at the end of its query), LIMIT n OFFSET m, OVER (PARTITION BY 1),
+  CURRENT_DATE/CURRENT_TIMESTAMP, grouping -> grouped, and the alias of
+  FROM (select * from t)
+
+SQLTranspiler has the same interface as sql_rewriter.SQLRewriter.
+"""
+
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Union
+
+from config import FUNCTION_MAPPINGS
+from sql_rewriter import CLAUSE_KEYWORDS, is_word, match_parentheses, tokenize
+
+# Words that are followed by a parenthesis without being a function
+NOT_FUNCTIONS = {
+    "and", "or", "not", "in", "exists", "any", "all", "some", "as", "on", "using", "from", "join",
+    "select", "where", "having", "when", "then", "else", "over", "group", "by", "values", "with",
+    "union", "intersect", "except", "minus", "is", "between", "like", "into", "table", "filter", "within",
+}
+
+DATE_ADD_UNITS = {
+    "add_seconds": "SECOND", "add_minutes": "MINUTE", "add_hours": "HOUR", "add_days": "DAY",
+    "add_weeks": "WEEK", "add_months": "MONTH", "add_years": "YEAR",
+}
+
+# Arguments of the StarRocks function in terms of the Exasol ones
+ARGUMENT_ORDER = {"instr": (1, 0)}
+
+# Exasol datetime format elements -> MySQL-style date_format/str_to_date specifiers
+FORMAT_ELEMENTS = {
+    "YYYY": "%Y", "YY": "%y", "MONTH": "%M", "MON": "%b", "MM": "%m", "DAY": "%W", "DY": "%a", "DD": "%d",
+    "HH24": "%H", "HH12": "%h", "HH": "%h", "MI": "%i", "SS": "%s",
+}
+FORMAT_PATTERN = re.compile('|'.join(sorted(FORMAT_ELEMENTS, key=len, reverse=True)), re.IGNORECASE)
+# A format made of nothing but those elements and separators ('999.99' and 'FM9G999' are number formats)
+DATE_FORMAT = re.compile(f"(?:{FORMAT_PATTERN.pattern}|[^A-Za-z0-9'])+", re.IGNORECASE)
+
+SET_OPERATORS = {"union", "intersect", "except", "minus"}
+
+class Group:
+    """A parenthesized list of nodes"""
+    __slots__ = ('children',)
+
+    def __init__(self, children: List):
+        self.children = children
+
+    def render(self) -> str:
+        return '(' + render(self.children) + ')'
+
+class Call:
+    """A function call; arguments are node lists split on top-level commas"""
+    __slots__ = ('name', 'arguments', 'gap')
+
+    def __init__(self, name: str, arguments: List[List], gap: str = ''):
+        self.name = name
+        self.arguments = arguments
+        self.gap = gap
+
+    @property
+    def lower(self) -> str:
+        return self.name.lower()
+
+    def render(self) -> str:
+        return f"{self.name}{self.gap}(" + ','.join(render(argument) for argument in self.arguments) + ')'
+
+Node = Union[str, Group, Call]
+
+def render(nodes: List[Node]) -> str:
+    return ''.join(node if isinstance(node, str) else node.render() for node in nodes)
+
+def parse(sql: str) -> List[Node]:
+    """Tree of groups and calls over the tokens; render(parse(sql)) == sql"""
+    tokens = tokenize(sql)
+    closing, _ = match_parentheses(tokens)
+    return _parse(tokens, closing, 0, len(tokens))
+
+def _parse(tokens: List[str], closing: Dict[int, int], start: int, end: int) -> List[Node]:
+    nodes: List[Node] = []
+    index = start
+    while index < end:
+        token = tokens[index]
+        close_index = closing.get(index, end) if token == '(' else end
+        if close_index >= end:
+            nodes.append(token)
+            index += 1
+            continue
+        children = _parse(tokens, closing, index + 1, close_index)
+        callee = len(nodes) - 1
+        while callee >= 0 and isinstance(nodes[callee], str) and nodes[callee].isspace():
+            callee -= 1
+        if callee >= 0 and isinstance(nodes[callee], str) and is_word(nodes[callee]) \
+                and nodes[callee].lower() not in NOT_FUNCTIONS:
+            name, gap = nodes[callee], ''.join(nodes[callee + 1:])
+            del nodes[callee:]
+            nodes.append(Call(name, split_arguments(children), gap))
+        else:
+            nodes.append(Group(children))
+        index = close_index + 1
+    return nodes
+
+def split_arguments(children: List[Node]) -> List[List[Node]]:
+    arguments: List[List[Node]] = [[]]
+    for node in children:
+        if node == ',':
+            arguments.append([])
+        else:
+            arguments[-1].append(node)
+    return arguments
+
+def strip(nodes: List[Node]) -> List[Node]:
+    """Nodes without leading and trailing whitespace"""
+    start, end = 0, len(nodes)
+    while start < end and isinstance(nodes[start], str) and nodes[start].isspace():
+        start += 1
+    while end > start and isinstance(nodes[end - 1], str) and nodes[end - 1].isspace():
+        end -= 1
+    return nodes[start:end]
+
+def make_call(name: str, *arguments: List[Node]) -> Call:
+    """A call printed as name(a, b, ...)"""
+    return Call(name, [strip(argument) if position == 0 else [' '] + strip(argument)
+                       for position, argument in enumerate(arguments)])
+
+def is_leaf(node: Node, *words: str) -> bool:
+    return isinstance(node, str) and node.lower() in words
+
+def translate_format(literal: str) -> str:
+    """'YYYY-MM-DD HH24:MI' -> '%Y-%m-%d %H:%i'"""
+    return FORMAT_PATTERN.sub(lambda match: FORMAT_ELEMENTS[match.group().upper()], literal)
+
+class SQLTranspiler:
+    """Converts one SQL string per call; counters accumulate across calls"""
+
+    def __init__(self, float_cast: Optional[Callable[[str], bool]] = None,
+                 function_mappings: Dict[str, str] = FUNCTION_MAPPINGS):
+        self.float_cast = float_cast or (lambda expression: True)
+        self.rewrites: Counter = Counter()
+        self.skipped_casts = 0
+        self.warnings: List[str] = []
+        self.renames = {name.lower(): target for name, target in function_mappings.items()
+                        if re.fullmatch(r'\w+', target)}
+        # Mappings like CURRENT_DATE -> CURDATE() are for keywords written without parentheses
+        self.keywords = {name.lower(): target for name, target in function_mappings.items()
+                         if target.endswith('()')}
+        self._calls = {
+            "nullifzero": self._nullifzero,
+            "zeroifnull": self._zeroifnull,
+            "nullif": self._nullif,
+            "convert": self._convert,
+            "to_char": self._to_char,
+            "to_date": self._to_date,
+            "json_value": self._json_value,
+            "median": self._median,
+            "date_trunc": self._date_trunc,
+        }
+
+    def rewrite(self, sql: str) -> str:
+        if not sql:
+            return sql
+        return render(self._transform(parse(sql)))
+
+    def _transform(self, nodes: List[Node]) -> List[Node]:
+        transformed: List[Node] = []
+        for node in nodes:
+            if isinstance(node, Group):
+                transformed.append(Group(self._transform(node.children)))
+            elif isinstance(node, Call):
+                call = Call(node.name, [self._transform(argument) for argument in node.arguments], node.gap)
+                transformed.extend(self._transform_call(call))
+            else:
+                transformed.append(node)
+        return self._transform_sequence(transformed)
+
+    def _transform_call(self, call: Call) -> List[Node]:
+        name = call.lower
+        rule = self._calls.get(name)
+        if rule is None and name in DATE_ADD_UNITS and self.renames.get(name, '').lower() == 'date_add':
+            rule = self._date_add
+        elif rule is None and name in self.renames:
+            rule = self._rename
+        rewritten = rule(call) if rule else None
+        if rewritten is None:
+            return [call]
+        self.rewrites[name] += 1
+        return rewritten if isinstance(rewritten, list) else [rewritten]
+
+    # Call rules: the replacement node(s), or None to keep the call
+
+    def _rename(self, call):
+        arguments = call.arguments
+        order = ARGUMENT_ORDER.get(call.lower)
+        if order and len(arguments) == len(order):
+            return make_call(self.renames[call.lower], *[arguments[position] for position in order])
+        return Call(self.renames[call.lower], arguments, call.gap)
+
+    def _date_add(self, call):
+        if len(call.arguments) != 2:
+            return None
+        interval = ['INTERVAL', ' '] + strip(call.arguments[1]) + [' ', DATE_ADD_UNITS[call.lower]]
+        return make_call(self.renames[call.lower], call.arguments[0], interval)
+
+    def _nullifzero(self, call):
+        if len(call.arguments) != 1:
+            return None
+        return self._nullif(make_call('NULLIF', call.arguments[0], ['0'])) or make_call('NULLIF', call.arguments[0], ['0'])
+
+    def _zeroifnull(self, call):
+        if len(call.arguments) != 1:
+            return None
+        return make_call('ifnull', call.arguments[0], ['0'])
+
+    def _nullif(self, call):
+        if len(call.arguments) == 1:
+            return make_call('ifnull', call.arguments[0], ['0'])
+        if len(call.arguments) != 2 or render(call.arguments[1]).strip() != '0':
+            return None
+        value = strip(call.arguments[0])
+        if value and isinstance(value[0], Call) and value[0].lower == 'cast':
+            return None
+        if not self.float_cast(render(value)):
+            self.skipped_casts += 1
+            return None
+        return make_call('NULLIF', [make_call('cast', value + [' ', 'as', ' ', 'float'])], ['0'])
+
+    def _convert(self, call):
+        """CONVERT(type, x) -> CAST(x AS type)"""
+        if len(call.arguments) != 2:
+            return None
+        return make_call('CAST', strip(call.arguments[1]) + [' ', 'AS', ' '] + strip(call.arguments[0]))
+
+    def _formatted(self, call, function):
+        """function(x, translated format) if the format is a literal date format"""
+        literal = render(call.arguments[1]).strip()
+        if not (literal.startswith("'") and literal.endswith("'")):
+            self.warnings.append(f"{call.name}() with a non-literal format needs a manual rewrite")
+            return None
+        if not DATE_FORMAT.fullmatch(literal[1:-1]):
+            self.warnings.append(f"{call.name}() with format {literal} needs a manual rewrite")
+            return None
+        return make_call(function, call.arguments[0], [translate_format(literal)])
+
+    def _to_char(self, call):
+        if len(call.arguments) == 1:
+            return make_call('cast', strip(call.arguments[0]) + [' ', 'as', ' ', 'varchar'])
+        if len(call.arguments) == 2:
+            return self._formatted(call, 'date_format')
+        return None
+
+    def _to_date(self, call):
+        if len(call.arguments) == 1:
+            return make_call('date', call.arguments[0])
+        if len(call.arguments) == 2:
+            return self._formatted(call, 'str_to_date')
+        return None
+
+    def _json_value(self, call):
+        if len(call.arguments) != 2:
+            return None
+        path = render(call.arguments[1]).strip()
+        if len(path) < 2 or path[0] not in "'\"" or path[-1] != path[0] or path[0] in path[1:-1]:
+            return None
+        return [make_call('parse_json', call.arguments[0]), '->', f"'{path[1:-1]}'"]
+
+    def _median(self, call):
+        if len(call.arguments) != 1:
+            return None
+        return make_call('PERCENTILE_CONT', call.arguments[0], ['0.5'])
+
+    def _date_trunc(self, call):
+        if len(call.arguments) == 2 and re.fullmatch(r'[A-Za-z_]+\.granularity', render(call.arguments[0]).strip(),
+                                                     re.IGNORECASE):
+            return make_call('date_trunc', ['{{granularity}}'], call.arguments[1])
+        return None
+
+    # Sequence rules, over the nodes of one level of the tree
+
+    def _transform_sequence(self, nodes: List[Node]) -> List[Node]:
+        output: List[Node] = []
+        pending_limit = None
+        index = 0
+        while index < len(nodes):
+            node = nodes[index]
+            if isinstance(node, Call):
+                rewritten = self._sequence_call(nodes, index)
+                if rewritten:
+                    replacement, index = rewritten
+                    output.extend(replacement)
+                    continue
+            elif isinstance(node, str) and is_word(node):
+                word = node.lower()
+                if word == 'top' and pending_limit is None:
+                    after = self._top(nodes, index, output)
+                    if after:
+                        pending_limit, index = after
+                        continue
+                rewritten = self._sequence_word(nodes, index, word)
+                if rewritten:
+                    replacement, index = rewritten
+                    output.extend(replacement)
+                    continue
+            output.append(node)
+            index += 1
+        if pending_limit is not None:
+            self._append_limit(output, pending_limit)
+        return output
+
+    def _next(self, nodes: List[Node], index: int) -> int:
+        while index < len(nodes) and isinstance(nodes[index], str) and nodes[index].isspace():
+            index += 1
+        return index
+
+    def _at(self, nodes: List[Node], index: int) -> Optional[Node]:
+        return nodes[index] if index < len(nodes) else None
+
+    def _order_by(self, group: Node) -> Optional[List[Node]]:
+        """The expression list of a (ORDER BY ...) group"""
+        if not isinstance(group, Group):
+            return None
+        children = strip(group.children)
+        order = self._next(children, 0)
+        by = self._next(children, order + 1)
+        if is_leaf(self._at(children, order), 'order') and is_leaf(self._at(children, by), 'by'):
+            return strip(children[by + 1:])
+        return None
+
+    def _within_group(self, nodes: List[Node], index: int):
+        """(ORDER BY expressions, index after) of WITHIN GROUP (ORDER BY ...) after a call"""
+        within = self._next(nodes, index + 1)
+        group = self._next(nodes, within + 1)
+        ordered = self._next(nodes, group + 1)
+        if is_leaf(self._at(nodes, within), 'within') and is_leaf(self._at(nodes, group), 'group'):
+            expressions = self._order_by(self._at(nodes, ordered))
+            if expressions is not None:
+                return expressions, ordered + 1
+        return None
+
+    def _sequence_call(self, nodes: List[Node], index: int):
+        call = nodes[index]
+        name = call.lower
+        if name == 'percentile_cont' and len(call.arguments) == 1 and render(call.arguments[0]).strip() == '0.5':
+            within = self._within_group(nodes, index)
+            if within:
+                self.rewrites[name] += 1
+                return [make_call('PERCENTILE_CONT', within[0], ['0.5'])], within[1]
+        if name in ('listagg', 'group_concat') and len(call.arguments) in (1, 2):
+            within = self._within_group(nodes, index)
+            if within or name == 'listagg':
+                self.rewrites['listagg'] += 1
+                argument = strip(call.arguments[0])
+                if within:
+                    argument += [' ', 'ORDER', ' ', 'BY', ' '] + within[0]
+                if len(call.arguments) == 2:
+                    argument += [' ', 'SEPARATOR', ' '] + strip(call.arguments[1])
+                return [make_call('group_concat', argument)], within[1] if within else index + 1
+        if name == 'sum':
+            slash = self._next(nodes, index + 1)
+            divisor_index = self._next(nodes, slash + 1)
+            denominator = self._at(nodes, divisor_index)
+            if self._at(nodes, slash) == '/' and isinstance(denominator, Call) and denominator.lower == 'sum':
+                numerator = ','.join(render(argument) for argument in call.arguments).strip()
+                divisor = ','.join(render(argument) for argument in denominator.arguments).strip()
+                if not (self.float_cast(numerator) and self.float_cast(divisor)):
+                    self.skipped_casts += 1
+                    return [call, '/', denominator], divisor_index + 1
+                self.rewrites['sum'] += 1
+                return [call, '/', make_call('cast', [denominator, ' ', 'as', ' ', 'float'])], divisor_index + 1
+        if name == 'count' and render(call.arguments[0]).strip().lower().startswith('distinct') \
+                and is_leaf(self._at(nodes, self._next(nodes, index + 1)), 'over'):
+            self.warnings.append("Found DISTINCT in window function - not supported in StarRocks")
+        return None
+
+    def _sequence_word(self, nodes: List[Node], index: int, word: str):
+        following = self._at(nodes, self._next(nodes, index + 1))
+        if word == 'grouping' and not is_leaf(following, 'sets') \
+                and not (isinstance(following, Call) and following.lower == 'sets'):
+            self.rewrites[word] += 1
+            return ['grouped'], index + 1
+        if word == 'partition':
+            by = self._next(nodes, index + 1)
+            one = self._next(nodes, by + 1)
+            if is_leaf(self._at(nodes, by), 'by') and self._at(nodes, one) == '1':
+                self.rewrites[word] += 1
+                return [], one + 1
+        if word == 'over':
+            window = self._next(nodes, index + 1)
+            if isinstance(self._at(nodes, window), Group) and not strip(nodes[window].children):
+                return ['OVER ()'], window + 1
+        if word == 'full':
+            outer = self._next(nodes, index + 1)
+            if is_leaf(self._at(nodes, outer), 'outer') and is_leaf(self._at(nodes, self._next(nodes, outer + 1)), 'join'):
+                self.warnings.append("Found FULL OUTER JOIN - may need manual conversion")
+        if word == 'limit':
+            return self._limit_offset(nodes, index)
+        if word == 'from':
+            return self._derived_table(nodes, index)
+        # t.current_date is a column, not the keyword
+        if word in self.keywords and not (index > 0 and nodes[index - 1] == '.'):
+            self.rewrites[word] += 1
+            return [self.keywords[word]], index + 1
+        return None
+
+    def _top(self, nodes: List[Node], index: int, output: List[Node]):
+        """(n, index after) for SELECT [DISTINCT] TOP n; the TOP n is dropped"""
+        previous = len(output) - 1
+        while previous >= 0 and isinstance(output[previous], str) and output[previous].isspace():
+            previous -= 1
+        if previous >= 0 and is_leaf(output[previous], 'distinct'):
+            previous -= 1
+            while previous >= 0 and isinstance(output[previous], str) and output[previous].isspace():
+                previous -= 1
+        count = self._next(nodes, index + 1)
+        if previous < 0 or not is_leaf(output[previous], 'select') or not str(self._at(nodes, count)).isdigit():
+            return None
+        if any(is_leaf(node, *SET_OPERATORS) for node in nodes):
+            self.warnings.append("Found SELECT TOP in a UNION - move it to a LIMIT manually")
+            return None
+        self.rewrites['top'] += 1
+        return nodes[count], self._next(nodes, count + 1)
+
+    def _append_limit(self, output: List[Node], count: str):
+        """LIMIT n before the trailing whitespace, comments and ; of a query"""
+        end = len(output)
+        while end > 0 and isinstance(output[end - 1], str) and (
+                output[end - 1].isspace() or output[end - 1] == ';' or output[end - 1].startswith(('--', '/*'))):
+            end -= 1
+        output[end:end] = [' ', 'LIMIT', ' ', count]
+
+    def _limit_offset(self, nodes: List[Node], index: int):
+        """LIMIT n OFFSET m -> LIMIT m, n"""
+        count = self._next(nodes, index + 1)
+        offset = self._next(nodes, count + 1)
+        start = self._next(nodes, offset + 1)
+        if str(self._at(nodes, count)).isdigit() and is_leaf(self._at(nodes, offset), 'offset') \
+                and str(self._at(nodes, start)).isdigit():
+            self.rewrites['limit'] += 1
+            return [nodes[index], ' ', nodes[start], ', ', nodes[count]], start + 1
+        return None
+
+    def _derived_table(self, nodes: List[Node], index: int):
+        """FROM (select * from t) without an alias -> FROM (select * from t) as subquery"""
+        position = self._next(nodes, index + 1)
+        group = self._at(nodes, position)
+        if not isinstance(group, Group):
+            return None
+        children = strip(group.children)
+        star = self._next(children, 1)
+        inner_from = self._next(children, star + 1)
+        if not (children and is_leaf(children[0], 'select') and self._at(children, star) == '*'
+                and is_leaf(self._at(children, inner_from), 'from')):
+            return None
+        if any(not isinstance(child, str) for child in children):
+            return None
+        following = self._at(nodes, self._next(nodes, position + 1))
+        if isinstance(following, str) and (is_word(following) or following.startswith('"')) \
+                and following.lower() not in CLAUSE_KEYWORDS:
+            return None
+        self.rewrites['subquery_alias'] += 1
+        return nodes[index:position + 1] + [' ', 'as', ' ', 'subquery'], position + 1
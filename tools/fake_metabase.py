@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Metabase API, for offline runs, tests and benchmarks.
+
+Serves the endpoints the migration uses, seeded from the recorded
+inspections/dashboard_*_inspection.json files and migrations/migration_mapping.json:
+
+    POST /api/session                  GET /api/user/current
+    GET  /api/dashboard                GET /api/dashboard/{id}
+    PUT  /api/dashboard/{id}
+    GET  /api/card/{id}                PUT /api/card/{id}
+    GET  /api/database/{id}/metadata   POST /api/dataset
+    GET  /api/database/{id}            GET /api/table/{id}/query_metadata
+    GET  /api/table/{id}               GET /api/field/{id}
+
+Database metadata is synthesized from the migration mapping: every mapped
+Exasol table gets a StarRocks counterpart, and every column_mapping pair
+becomes one field on each side. A recorded payload can be used instead by
+placing database_{id}_metadata.json in the fixtures directory.
+
+Usage:
+    python3 tools/fake_metabase.py --port 3000 --latency 0.05 --error-rate 0.02
+"""
+
+import argparse
+import copy
+import glob
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class FakeMetabase:
+    """In-memory Metabase state and request routing"""
+
+    def __init__(self, fixtures_dir: str = REPO_ROOT, latency: float = 0.0,
+                 error_rate: float = 0.0, error_status: int = 503, seed: Optional[int] = None):
+        self.fixtures_dir = fixtures_dir
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sessions = set()
+        self.request_log = []
+        self.in_flight = 0
+        self.peak_in_flight = 0  # most requests being handled at once
+        self.dashboards: Dict[int, Dict] = {}
+        self.cards: Dict[int, Dict] = {}
+        self.metadata: Dict[int, Dict] = {}
+        self._load_inspections()
+        self._load_metadata()
+
+    def _load_inspections(self):
+        pattern = os.path.join(self.fixtures_dir, "inspections", "dashboard_*_inspection.json")
+        for filename in sorted(glob.glob(pattern)):
+            with open(filename, 'r') as f:
+                dashboard = json.load(f)
+            if 'id' not in dashboard:
+                continue
+            self.dashboards[dashboard['id']] = dashboard
+            for dashcard in dashboard.get('dashcards', []):
+                card = dashcard.get('card') or {}
+                if card.get('id') and card['id'] not in self.cards:
+                    card = copy.deepcopy(card)
+                    card.setdefault('updated_at', _now())
+                    self.cards[card['id']] = card
+
+    def _load_metadata(self):
+        mapping_file = os.path.join(self.fixtures_dir, "migrations", "migration_mapping.json")
+        if os.path.exists(mapping_file):
+            with open(mapping_file, 'r') as f:
+                self.metadata.update(synthesize_metadata(json.load(f)))
+        for filename in glob.glob(os.path.join(self.fixtures_dir, "database_*_metadata.json")):
+            database_id = int(re.search(r'database_(\d+)_metadata', filename).group(1))
+            with open(filename, 'r') as f:
+                self.metadata[database_id] = json.load(f)
+
+    def handle(self, method: str, path: str, headers: Dict, body: Optional[Dict]) -> Tuple[int, object]:
+        """Route one request and return (status, JSON payload)"""
+        with self.lock:
+            self.request_log.append((method, path))
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return self._route(method, path, headers, body)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def _route(self, method: str, path: str, headers: Dict, body: Optional[Dict]) -> Tuple[int, object]:
+        if self.latency:
+            time.sleep(self.latency * self.random.uniform(0.5, 1.5))
+        if self.error_rate and self.random.random() < self.error_rate:
+            return self.error_status, {"message": "Injected error"}
+
+        path, _, query = path.partition('?')
+        if method == "POST" and path == "/api/session":
+            token = str(uuid.uuid4())
+            with self.lock:
+                self.sessions.add(token)
+            return 200, {"id": token}
+        if headers.get("X-Metabase-Session") not in self.sessions:
+            return 401, "Unauthenticated"
+
+        if method == "GET" and path == "/api/user/current":
+            return 200, {"id": 1, "email": "migration@example.com"}
+        if method == "GET" and path == "/api/dashboard":
+            return 200, [{"id": d['id'], "name": d.get('name')} for d in self.dashboards.values()]
+        match = re.fullmatch(r"/api/dashboard/(\d+)", path)
+        if method == "GET" and match:
+            return self._get(self.dashboards, int(match.group(1)))
+        if method == "PUT" and match:
+            return self._update_dashboard(int(match.group(1)), body or {})
+        match = re.fullmatch(r"/api/card/(\d+)", path)
+        if match and method == "GET":
+            return self._get(self.cards, int(match.group(1)))
+        if match and method == "PUT":
+            return self._update_card(int(match.group(1)), body or {})
+        match = re.fullmatch(r"/api/database/(\d+)/metadata", path)
+        if method == "GET" and match:
+            return self._get(self.metadata, int(match.group(1)))
+        match = re.fullmatch(r"/api/database/(\d+)", path)
+        if method == "GET" and match:
+            return self._get_database(int(match.group(1)), "include=tables" in query)
+        match = re.fullmatch(r"/api/table/(\d+)(/query_metadata)?", path)
+        if method == "GET" and match:
+            return self._get_table(int(match.group(1)), with_fields=bool(match.group(2)))
+        match = re.fullmatch(r"/api/field/(\d+)", path)
+        if method == "GET" and match:
+            return self._get_field(int(match.group(1)))
+        if method == "POST" and path == "/api/dataset":
+            return 202, {"status": "completed", "row_count": 0, "data": {"rows": [], "cols": []}}
+        return 404, "API endpoint does not exist."
+
+    def _get(self, store: Dict, key: int) -> Tuple[int, object]:
+        with self.lock:
+            item = store.get(key)
+            return (200, copy.deepcopy(item)) if item is not None else (404, "Not found.")
+
+    def _get_database(self, database_id: int, include_tables: bool) -> Tuple[int, object]:
+        with self.lock:
+            metadata = self.metadata.get(database_id)
+            if metadata is None:
+                return 404, "Not found."
+            database = {k: copy.deepcopy(v) for k, v in metadata.items() if k != 'tables'}
+            if include_tables:
+                database['tables'] = [{k: copy.deepcopy(v) for k, v in table.items() if k != 'fields'}
+                                      for table in metadata.get('tables', [])]
+            return 200, database
+
+    def _get_table(self, table_id: int, with_fields: bool) -> Tuple[int, object]:
+        with self.lock:
+            for metadata in self.metadata.values():
+                for table in metadata.get('tables', []):
+                    if table.get('id') == table_id:
+                        if with_fields:
+                            return 200, copy.deepcopy(table)
+                        return 200, {k: copy.deepcopy(v) for k, v in table.items() if k != 'fields'}
+            return 404, "Not found."
+
+    def _get_field(self, field_id: int) -> Tuple[int, object]:
+        with self.lock:
+            for metadata in self.metadata.values():
+                for table in metadata.get('tables', []):
+                    for field in table.get('fields', []):
+                        if field.get('id') == field_id:
+                            return 200, copy.deepcopy(field)
+            return 404, "Not found."
+
+    def _update_dashboard(self, dashboard_id: int, changes: Dict) -> Tuple[int, object]:
+        with self.lock:
+            dashboard = self.dashboards.get(dashboard_id)
+            if dashboard is None:
+                return 404, "Not found."
+            dashboard.update(copy.deepcopy(changes))
+            dashboard['updated_at'] = _now()
+            return 200, copy.deepcopy(dashboard)
+
+    def _update_card(self, card_id: int, changes: Dict) -> Tuple[int, object]:
+        with self.lock:
+            card = self.cards.get(card_id)
+            if card is None:
+                return 404, "Not found."
+            card.update(copy.deepcopy(changes))
+            card['updated_at'] = _now()
+            return 200, copy.deepcopy(card)
+
+def synthesize_metadata(migration_mapping: Dict) -> Dict[int, Dict]:
+    """Build Exasol and StarRocks metadata consistent with a migration mapping"""
+    exasol_db = migration_mapping.get('database_mapping', {}).get('exasol', 2)
+    starrocks_db = migration_mapping.get('database_mapping', {}).get('starrocks', 16)
+    table_pairs = list(migration_mapping.get('table_mapping', {}).items())
+
+    exasol_tables, starrocks_tables = [], []
+    synced_at = _now()
+    for i, (exasol_full, starrocks_name) in enumerate(table_pairs):
+        schema, name = exasol_full.split('.', 1) if '.' in exasol_full else ("", exasol_full)
+        exasol_tables.append({"id": 100000 + i, "db_id": exasol_db, "schema": schema.upper(),
+                              "name": name.upper(), "updated_at": synced_at, "fields": []})
+        starrocks_tables.append({"id": 200000 + i, "db_id": starrocks_db, "schema": "default",
+                                 "name": starrocks_name, "updated_at": synced_at, "fields": []})
+
+    # Spread the mapped columns over the mapped tables, same name on both sides
+    if table_pairs:
+        for i, (exasol_id, starrocks_id) in enumerate(migration_mapping.get('column_mapping', {}).items()):
+            slot = i % len(table_pairs)
+            name = f"COLUMN_{exasol_id}"
+            exasol_tables[slot]["fields"].append({"id": int(exasol_id), "name": name,
+                                                  "table_id": exasol_tables[slot]["id"],
+                                                  "base_type": "type/Text", "database_type": "VARCHAR"})
+            starrocks_tables[slot]["fields"].append({"id": int(starrocks_id), "name": name.lower(),
+                                                     "table_id": starrocks_tables[slot]["id"],
+                                                     "base_type": "type/Text", "database_type": "VARCHAR"})
+
+    return {
+        exasol_db: {"id": exasol_db, "name": "Exasol", "engine": "exasol", "tables": exasol_tables},
+        starrocks_db: {"id": starrocks_db, "name": "StarRocks", "engine": "starrocks", "tables": starrocks_tables},
+    }
+
+class _Handler(BaseHTTPRequestHandler):
+    fake: FakeMetabase = None
+
+    def _dispatch(self, method: str):
+        body = None
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError:
+                body = None
+        status, payload = self.fake.handle(method, self.path, dict(self.headers), body)
+        data = (json.dumps(payload) if not isinstance(payload, str) else payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json" if not isinstance(payload, str) else "text/plain")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def log_message(self, format, *args):
+        pass
+
+class FakeMetabaseServer:
+    """Run a FakeMetabase on a local port in a background thread"""
+
+    def __init__(self, fake: Optional[FakeMetabase] = None, host: str = "127.0.0.1", port: int = 0):
+        self.fake = fake or FakeMetabase()
+        handler = type("FakeMetabaseHandler", (_Handler,), {"fake": self.fake})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeMetabaseServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Metabase API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds added to every response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--fixtures", default=REPO_ROOT, help="directory with inspections/ and migrations/")
+    args = parser.parse_args()
+
+    fake = FakeMetabase(args.fixtures, args.latency, args.error_rate, args.error_status)
+    server = FakeMetabaseServer(fake, args.host, args.port)
+    print(f"🧪 Fake Metabase serving {len(fake.dashboards)} dashboards and {len(fake.cards)} cards at {server.base_url}")
+    print("   Point METABASE_CONFIG['base_url'] at it; any username/password is accepted")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopped")
+    finally:
+        server.httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,8 @@ Simple script to run the Metabase migration
 
 import sys
 import os
-from metabase_migrator import MetabaseMigrator, MetabaseConfig
+import asyncio
+from metabase_migrator import MetabaseMigrator, AsyncMetabaseMigrator, MetabaseConfig
 from config import METABASE_CONFIG
 
 def main():
@@ -77,7 +78,11 @@ def main():
     # Run migration
     print("\n🔄 Starting migration...")
     try:
-        results = migrator.migrate_all_dashboards()
+        async_migrator = AsyncMetabaseMigrator(config, migrator=migrator)
+        try:
+            results = asyncio.run(async_migrator.migrate_all_dashboards())
+        finally:
+            async_migrator.close()
         
         # Generate summary
         summary = migrator.generate_summary_report(results)
@@ -6,14 +6,24 @@ Handles complex SQL syntax conversions while preserving Metabase variables
 import re
 import logging
 from typing import List, Dict, Tuple
-from config import DATABASE_MAPPINGS, FUNCTION_MAPPINGS, EXASOL_PATTERNS, STARROCKS_REPLACEMENTS
+from config import DATABASE_MAPPINGS, FUNCTION_MAPPINGS, EXASOL_PATTERNS, STARROCKS_REPLACEMENTS, MIGRATION_SETTINGS
+from name_matcher import TableReferenceReplacer
+from sql_transpiler import SQLTranspiler
 
 logger = logging.getLogger(__name__)
 
 class SQLConverter:
-    def __init__(self):
+    def __init__(self, conversion_mode: str = None):
         self.database_mappings = DATABASE_MAPPINGS
         self.function_mappings = FUNCTION_MAPPINGS
+        # "regex" or "ast" (parse once, rewrite the tree, see sql_transpiler.py)
+        self.conversion_mode = conversion_mode or MIGRATION_SETTINGS.get("sql_conversion_mode", "regex")
+        table_mapping = {}
+        for mapping in self.database_mappings:
+            starrocks_table = f"{mapping.starrocks_db}.{mapping.starrocks_table}"
+            table_mapping[f"{mapping.exasol_schema}.{mapping.exasol_table}"] = starrocks_table
+            table_mapping[f"{mapping.exasol_db}.{mapping.exasol_schema}.{mapping.exasol_table}"] = starrocks_table
+        self.table_replacer = TableReferenceReplacer(table_mapping, bare_names=False)
         
     def convert_sql(self, sql: str) -> str:
         """
@@ -30,11 +40,18 @@ class SQLConverter:
         # Step 2: Convert table references
         converted_sql = self._convert_table_references(protected_sql)
         
-        # Step 3: Convert functions
-        converted_sql = self._convert_functions(converted_sql)
-        
-        # Step 4: Convert syntax patterns
-        converted_sql = self._convert_syntax_patterns(converted_sql)
+        if self.conversion_mode == "ast":
+            # Steps 3-4 as tree transforms
+            transpiler = SQLTranspiler(function_mappings=self.function_mappings)
+            converted_sql = transpiler.rewrite(converted_sql)
+            for warning in transpiler.warnings:
+                logger.warning(warning)
+        else:
+            # Step 3: Convert functions
+            converted_sql = self._convert_functions(converted_sql)
+            
+            # Step 4: Convert syntax patterns
+            converted_sql = self._convert_syntax_patterns(converted_sql)
         
         # Step 5: Restore Metabase variables
         final_sql = self._restore_variables(converted_sql, variable_map)
@@ -73,23 +90,8 @@ class SQLConverter:
         """
         Convert table references from Exasol format to StarRocks format
         """
-        converted_sql = sql
-        
-        for mapping in self.database_mappings:
-            # Pattern for Exasol: SCHEMA.TABLE or DB.SCHEMA.TABLE
-            exasol_patterns = [
-                rf'\b{mapping.exasol_schema}\.{mapping.exasol_table}\b',
-                rf'\b{mapping.exasol_db}\.{mapping.exasol_schema}\.{mapping.exasol_table}\b'
-            ]
-            
-            for pattern in exasol_patterns:
-                converted_sql = re.sub(
-                    pattern,
-                    f"{mapping.starrocks_db}.{mapping.starrocks_table}",
-                    converted_sql,
-                    flags=re.IGNORECASE
-                )
-        
+        # SCHEMA.TABLE and DB.SCHEMA.TABLE of every mapping, in one scan
+        converted_sql, _, _ = self.table_replacer.replace(sql)
         return converted_sql
     
     def _convert_functions(self, sql: str) -> str:
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test script for catalog snapshot diffs and the inspection card index
+"""
+
+import copy
+import json
+import os
+import tempfile
+from catalog_diff import InspectionCardIndex, broken_ids, diff_snapshots
+from catalog_snapshot import load_snapshot, save_snapshot, snapshot_from_metadata
+from fake_metabase import REPO_ROOT
+
+METADATA = {16: {"tables": [
+    {"id": 1, "schema": None, "name": "MART__TX", "updated_at": "a", "fields": [
+        {"id": 20835, "name": "amount", "table_id": 1}, {"id": 11, "name": "status", "table_id": 1},
+        {"id": 12, "name": "created_at", "table_id": 1}]},
+    {"id": 2, "schema": None, "name": "MART__USERS", "updated_at": "a", "fields": [
+        {"id": 21, "name": "id", "table_id": 2}]},
+]}}
+
+def test_diff_reports_only_changes():
+    """Dropped, renamed and re-synced columns are reported; untouched tables are not"""
+    print("🧪 Testing catalog diff")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.json")
+        save_snapshot(snapshot_from_metadata(METADATA), path)
+        old = load_snapshot(path)
+        assert set(old["fingerprints"]["16"]) == {"1", "2"}
+
+        new = copy.deepcopy(old)
+        del new["fingerprints"]
+        fields = new["databases"]["16"]["1"]["fields"]
+        del fields[0]                                            # amount dropped
+        fields[0]["name"] = "state"                              # status renamed
+        fields[1]["id"] = 13                                     # created_at re-synced
+        new["databases"]["16"]["2"]["updated_at"] = "b"          # sync only, no drift
+
+        assert diff_snapshots(old, old) == {}
+        drift = diff_snapshots(old, new)
+        [table] = drift["16"]["changed_tables"]
+        assert table["removed_fields"] == [{"id": 20835, "name": "amount"}]
+        assert table["renamed_fields"] == [{"id": 11, "old_name": "status", "new_name": "state"}]
+        assert table["field_id_changes"] == [{"name": "created_at", "old_id": 12, "new_id": 13}]
+        assert "added_fields" not in table
+        assert broken_ids(drift)["fields"] == {20835, 11, 12}
+        print("✅ Diff OK")
+
+def test_affected_cards_from_inspections():
+    index = InspectionCardIndex(os.path.join(REPO_ROOT, "inspections"))
+    cards = index.affected_cards({20835}, set())
+    assert 3723 in [card["id"] for card in cards]
+    print(f"✅ {len(cards)} cached cards reference field 20835")
+
+def test_dropped_table_used_by_template_tags():
+    """Native cards that reach a dropped table only through template tags are reported"""
+    def native_card(card_id, tag):
+        return {"card": {"id": card_id, "name": f"Card {card_id}", "dataset_query": {
+            "type": "native", "native": {"query": "select 1 where {{user}}", "template-tags": {"user": tag}}}}}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.json")
+        save_snapshot(snapshot_from_metadata(METADATA), path)
+        old = load_snapshot(path)
+        new = copy.deepcopy(old)
+        del new["fingerprints"]
+        del new["databases"]["16"]["2"]                          # MART__USERS dropped
+        ids = broken_ids(diff_snapshots(old, new))
+        assert ids == {"fields": {21}, "tables": {2}}
+
+        with open(os.path.join(tmp, "dashboard_1_inspection.json"), 'w') as f:
+            json.dump({"id": 1, "dashcards": [
+                native_card(101, {"type": "dimension", "field-id": 21}),
+                native_card(102, {"type": "dimension", "dimension": ["field", 21, None]}),
+                native_card(103, {"type": "text"}),
+            ]}, f)
+        cards = InspectionCardIndex(tmp).affected_cards(ids["fields"], ids["tables"])
+        assert [(card["id"], card["fields"]) for card in cards] == [(101, [21]), (102, [21])]
+    print("✅ Dropped table reported for cards using it through template tags")
+
+if __name__ == "__main__":
+    test_diff_reports_only_changes()
+    test_affected_cards_from_inspections()
+    test_dropped_table_used_by_template_tags()
+    print("🎉 All tests PASSED!")
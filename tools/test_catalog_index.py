@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test script for the catalog index used by the mapping builders
+"""
+
+import random
+from catalog_index import CatalogIndex, map_columns_by_name
+
+def find_table_by_scan(metadata, exasol_table_name, exasol_schema=None):
+    """The original linear scan, kept as the reference behaviour"""
+    candidates = []
+    for table in metadata.get('tables', []):
+        name = table.get('name', '')
+        if '__' in name:
+            prefix, base_name = name.split('__', 1)
+            if base_name.upper() == exasol_table_name.upper():
+                if exasol_schema is None or prefix.upper() == exasol_schema.upper():
+                    candidates.append(table)
+        elif name.upper() == exasol_table_name.upper():
+            candidates.append(table)
+    return candidates[0] if candidates else None
+
+def test_index_matches_scan():
+    """Index lookups return the same table as the linear scan"""
+    rng = random.Random(7)
+    schemas, bases = ["MART", "DWH", "raw"], ["ORDERS", "users", "TX__LOG", "CARDS"]
+    tables = []
+    for i in range(200):
+        base = rng.choice(bases)
+        name = f"{rng.choice(schemas)}__{base}" if rng.random() < 0.7 else base
+        tables.append({"id": i, "name": name})
+    metadata = {"tables": tables}
+    index = CatalogIndex(metadata)
+
+    print("🧪 Testing catalog index against linear scan")
+    for base in bases + ["MISSING", "LOG"]:
+        for schema in schemas + [None, "other"]:
+            assert index.find_table_with_prefix(base, schema) is find_table_by_scan(metadata, base, schema), (base, schema)
+    print("✅ All lookups match")
+
+def test_map_columns_by_name():
+    exasol = CatalogIndex({"tables": [{"id": 1, "schema": "MART", "name": "ORDERS", "fields": [
+        {"id": 10, "name": "ID"}, {"id": 11, "name": "Amount"}, {"id": 12, "name": "LEGACY"}]}]})
+    starrocks = CatalogIndex({"tables": [{"id": 2, "name": "MART__ORDERS", "fields": [
+        {"id": 20, "name": "amount"}, {"id": 21, "name": "id"}]}]})
+    exasol_table = exasol.table_by_schema_and_name("mart", "orders")
+    starrocks_table = starrocks.by_name["MART__ORDERS"]
+    assert map_columns_by_name(exasol, exasol_table, starrocks, starrocks_table) == {"10": 21, "11": 20}
+    assert exasol.field_by_id[12]["name"] == "LEGACY"
+
+if __name__ == "__main__":
+    test_index_matches_scan()
+    test_map_columns_by_name()
+    print("🎉 All tests PASSED!")
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Test script for fuzzy column match suggestions
+"""
+
+from column_matcher import ColumnIndex, name_tokens, suggest_column_matches
+
+def test_ranked_candidates():
+    """Renamed columns rank their counterpart first; unrelated names are not suggested"""
+    print("🧪 Testing column matcher")
+    assert name_tokens("avgTurnover_EUR2") == ("avg", "turnover", "eur", "2")
+    index = ColumnIndex()
+    for key, name in enumerate(["amount_eur", "discount", "created_at", "dwh_created_at", "avg_turnover_eur"]):
+        index.add(key, name, group="T")
+    assert index.candidates("AMOUNT", group="T")[0][:2] == (0, "amount_eur")
+    assert all(name != "discount" for _, name, _ in index.candidates("AMOUNT", group="T", min_score=0.3))
+    assert index.candidates("CREATED_AT_UTC", group="T")[0][1] == "created_at"
+    assert index.candidates("AMOUNT", group="other") == []
+    print("✅ Candidates ranked")
+
+def test_suggestions_cover_only_unmapped_columns():
+    exasol = {"tables": [{"id": 1, "schema": "MART", "name": "TX", "fields": [
+        {"id": 11, "name": "ID"}, {"id": 12, "name": "AMOUNT"}, {"id": 13, "name": "COMMENT"}]}]}
+    starrocks = {"tables": [{"id": 2, "schema": None, "name": "MART__TX", "fields": [
+        {"id": 21, "name": "id"}, {"id": 22, "name": "amount_eur"}]}]}
+    suggestions = suggest_column_matches(exasol, starrocks, {"mart.tx": "MART__TX"}, {"11": 21})
+    assert [s["exasol_field_id"] for s in suggestions] == [12]
+    best = suggestions[0]["candidates"][0]
+    assert best["starrocks_field_id"] == 22 and best["confidence"] in ("high", "medium")
+    print(f"✅ AMOUNT -> amount_eur ({best['score']})")
+
+if __name__ == "__main__":
+    test_ranked_candidates()
+    test_suggestions_cover_only_unmapped_columns()
+    print("🎉 All tests PASSED!")
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Test script for the column type index and type-aware casts
+"""
+
+import os
+import tempfile
+
+import conversion_cache
+from column_types import TypeIndex, expression_family, type_family, type_mismatches
+from conversion_cache import ConversionCache
+from migrate_dashboard import clean_sql_for_starrocks
+
+STARROCKS = {"tables": [{"id": 1, "name": "MART__TRANSACTIONS", "fields": [
+    {"id": 11, "name": "turnover_eur", "base_type": "type/Decimal", "database_type": "DECIMAL(18,4)"},
+    {"id": 12, "name": "count_transactions", "base_type": "type/BigInteger", "database_type": "BIGINT"},
+    {"id": 13, "name": "fee_rate", "base_type": "type/Float", "database_type": "DOUBLE"},
+]}]}
+EXASOL = {"tables": [{"id": 2, "name": "TRANSACTIONS", "fields": [
+    {"id": 21, "name": "TURNOVER_EUR", "base_type": "type/Decimal", "database_type": "DECIMAL(18,4)"},
+    {"id": 22, "name": "COUNT_TRANSACTIONS", "base_type": "type/Decimal", "database_type": "DECIMAL(18,0)"},
+    {"id": 23, "name": "FEE_RATE", "base_type": "type/Decimal", "database_type": "DECIMAL(10,6)"},
+]}]}
+
+def test_families_and_mismatches():
+    """Exasol DECIMAL(p,0) is an integer; DECIMAL -> DOUBLE is reported as lossy"""
+    print("🧪 Testing column type index")
+    assert type_family("type/Decimal", "DECIMAL(18,0)") == "integer"
+    assert type_family("type/Decimal", "DECIMAL(18,4)") == "decimal"
+    assert type_family("type/Float") == "float" and type_family(None) is None
+    types = TypeIndex(STARROCKS)
+    assert expression_family("sum(tr.turnover_eur)", types, ["MART__TRANSACTIONS"]) == "decimal"
+    assert expression_family("COUNT_TRANSACTIONS", types) == "integer"
+    assert expression_family("a - b", types) is None
+    [mismatch] = type_mismatches(TypeIndex(EXASOL), types, {"21": 11, "22": 12, "23": 13})
+    assert mismatch["exasol_field_id"] == 23 and mismatch["lossy"]
+    print("✅ Families and mismatches OK")
+
+def test_casts_only_where_needed():
+    table_mapping = {"mart.transactions": "MART__TRANSACTIONS"}
+    sql = ("select sum(turnover_eur)/sum(count_transactions) as a, "
+           "sum(count_transactions)/sum(count_transactions) as b, "
+           "x / NULLIFZERO(turnover_eur) as c, y / NULLIFZERO(count_transactions) as d "
+           "from mart.transactions")
+    # Converted fresh, not served from the repository's conversion cache
+    with tempfile.TemporaryDirectory() as tmp:
+        previous, conversion_cache._cache = conversion_cache._cache, ConversionCache(os.path.join(tmp, "c.sqlite3"))
+        try:
+            typed = clean_sql_for_starrocks(sql, [], table_mapping, TypeIndex(STARROCKS))
+            # Without type information every operand is cast, as before
+            untyped = clean_sql_for_starrocks(sql, [], table_mapping)
+        finally:
+            conversion_cache._cache.close()
+            conversion_cache._cache = previous
+    assert "sum(turnover_eur)/sum(count_transactions)" in typed
+    assert "sum(count_transactions)/cast(sum(count_transactions) as float)" in typed
+    assert "NULLIF(turnover_eur, 0)" in typed
+    assert "NULLIF(cast(count_transactions as float), 0)" in typed
+    assert "NULLIF(cast(turnover_eur as float), 0)" in untyped
+    print("✅ Casts added only for integer operands")
+
+if __name__ == "__main__":
+    test_families_and_mismatches()
+    test_casts_only_where_needed()
+    print("🎉 All tests PASSED!")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-addressed SQL conversion cache
+"""
+
+import contextlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+import conversion_cache
+from column_types import TypeIndex
+from conversion_cache import ConversionCache, fingerprint
+from migrate_dashboard import clean_sql_for_starrocks
+
+def test_cache_keys_and_pruning():
+    print("🧪 Testing conversion cache")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        cache = ConversionCache(path, max_entries=2)
+        context = fingerprint("rules", {"mart.t": "MART__T"})
+        cache.store("select 1", ["a", "b"], context, "select 1 -- converted", ["    🔄 note"])
+        assert cache.get("select 1", ["a", "b", "a", None], context) == ("select 1 -- converted", ["    🔄 note"])
+        assert cache.get("select 1", {"b", "a"}, context) == ("select 1 -- converted", ["    🔄 note"])
+        assert cache.get("select 1", ["a"], context) is None
+        assert cache.get("select 1", ["a", "b"], fingerprint("rules", {"mart.t": "MART__T2"})) is None
+        assert cache.get("select 2", ["a", "b"], context) is None
+        assert (cache.hits, cache.misses) == (2, 3)
+        cache.store("select 2", [], context, "2", [])
+        cache.store("select 3", [], context, "3", [])
+        cache.close()
+        reopened = ConversionCache(path, max_entries=2)
+        # select 1 was read after select 2 was written, so select 2 is the least recently used
+        assert reopened.get("select 2", [], context) is None
+        assert reopened.get("select 1", ["a", "b"], context) and reopened.get("select 3", [], context) == ("3", [])
+        reopened.close()
+    print("✅ Entries found only for the same SQL, context and columns; least recently used pruned")
+
+def test_column_key_is_stable_across_processes():
+    """Callers pass the columns as a set, whose order depends on PYTHONHASHSEED"""
+    script = ("from conversion_cache import ConversionCache; "
+              "print(ConversionCache.key('select 1', {'Turnover_EUR', 'count_users', 'month', 'fee'}, 'c')[2])")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    keys = set()
+    for seed in ("1", "2", "3"):
+        environment = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=root)
+        keys.add(subprocess.run([sys.executable, "-c", script], env=environment, cwd=root,
+                                capture_output=True, text=True, check=True).stdout.strip())
+    assert len(keys) == 1
+    print("✅ Column key is the same under every hash seed")
+
+def test_clean_sql_reuses_conversions():
+    sql = "select NULLIFZERO(turnover_eur) as TURNOVER from mart.transactions"
+    types = TypeIndex({"tables": [{"id": 1, "name": "MART__TRANSACTIONS", "fields": [
+        {"id": 11, "name": "turnover_eur", "base_type": "type/Decimal", "database_type": "DECIMAL(18,4)"}]}]})
+    with tempfile.TemporaryDirectory() as tmp:
+        previous, conversion_cache._cache = conversion_cache._cache, ConversionCache(os.path.join(tmp, "c.sqlite3"))
+        try:
+            outputs = []
+            for table_mapping in ({"mart.transactions": "MART__TRANSACTIONS"},) * 2 + ({"mart.transactions": "T2"},):
+                printed = io.StringIO()
+                with contextlib.redirect_stdout(printed):
+                    converted = clean_sql_for_starrocks(sql, ["turnover"], table_mapping, types)
+                outputs.append((converted, "Reusing cached conversion" in printed.getvalue(),
+                                "Replaced 'mart.transactions'" in printed.getvalue()))
+        finally:
+            conversion_cache._cache.close()
+            conversion_cache._cache = previous
+    assert outputs[0] == ("select NULLIF(turnover_eur, 0) as turnover from MART__TRANSACTIONS", False, True)
+    # Same SQL and mapping: reused, diagnostics printed again; changed mapping: converted again
+    assert outputs[1] == (outputs[0][0], True, True)
+    assert outputs[2] == ("select NULLIF(turnover_eur, 0) as turnover from T2", False, True)
+    print("✅ clean_sql_for_starrocks reuses conversions until the mapping changes")
+
+if __name__ == "__main__":
+    test_cache_keys_and_pruning()
+    test_column_key_is_stable_across_processes()
+    test_clean_sql_reuses_conversions()
+    print("🎉 All tests PASSED!")
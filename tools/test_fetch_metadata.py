@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for the incremental mapping refresh of scripts/fetch_metadata.py, against the fake Metabase
+"""
+
+import importlib.util
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+from fake_metabase import FakeMetabase, FakeMetabaseServer
+from catalog_snapshot import snapshot_from_metadata
+from metabase_migrator import MetabaseConfig, MetabaseMigrator
+from metadata_harvester import MetadataHarvester
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+spec = importlib.util.spec_from_file_location("fetch_metadata", os.path.join(ROOT, "scripts", "fetch_metadata.py"))
+fetch_metadata = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(fetch_metadata)
+
+# The fake spreads the columns over the tables in turn: 101, 104 -> transactions; 102, 105 -> users; 103, 106 -> fees
+MAPPING = {
+    "database_mapping": {"exasol": 2, "starrocks": 16},
+    "column_mapping": {"101": 901, "102": 902, "103": 903, "104": 904, "105": 905, "106": 906},
+    "table_mapping": {"mart.transactions": "MART__TRANSACTIONS", "mart.users": "MART__USERS", "mart.fees": "MART__FEES"},
+    "table_id_mapping": {"100000": 200000, "100001": 200001, "100002": 200002}
+}
+
+def test_refresh_patches_only_changed_tables():
+    """A changed Exasol table and a removed StarRocks table are re-mapped in place; nothing else is refetched"""
+    print("🧪 Testing incremental mapping refresh")
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "migrations"))
+        mapping_file = os.path.join(tmp, "migrations", "migration_mapping.json")
+        with open(mapping_file, 'w') as f:
+            json.dump(MAPPING, f)
+        fake = FakeMetabase(fixtures_dir=tmp)
+        previous, fetch_metadata.MAPPING_FILE = fetch_metadata.MAPPING_FILE, mapping_file
+        try:
+            with FakeMetabaseServer(fake) as server:
+                migrator = MetabaseMigrator(MetabaseConfig(server.base_url, "test@example.com", "secret"))
+                migrator.token_cache = None
+                assert migrator.authenticate()
+                snapshot = snapshot_from_metadata(MetadataHarvester(migrator).harvest([2, 16]))
+
+                unchanged, _ = fetch_metadata.refresh_mapping_incrementally(migrator, snapshot, {}, 2, 16)
+                assert unchanged == MAPPING
+
+                # USERS loses column 105, MART__FEES is dropped from StarRocks
+                users = next(table for table in fake.metadata[2]['tables'] if table['name'] == "USERS")
+                users['fields'] = [field for field in users['fields'] if field['id'] != 105]
+                users['updated_at'] = datetime.now(timezone.utc).isoformat()
+                fake.metadata[16]['tables'] = [table for table in fake.metadata[16]['tables'] if table['name'] != "MART__FEES"]
+                before = len(fake.request_log)
+                mapping, new_snapshot = fetch_metadata.refresh_mapping_incrementally(migrator, snapshot, {}, 2, 16)
+                refetched = [path for _, path in fake.request_log[before:] if path.endswith("/query_metadata")]
+        finally:
+            fetch_metadata.MAPPING_FILE = previous
+
+    assert refetched == ["/api/table/100001/query_metadata"]
+    # Kept entries stay where they were, so the mapping file diffs cleanly
+    assert list(mapping['column_mapping'].items()) == [("101", 901), ("102", 902), ("104", 904)]
+    assert list(mapping['table_mapping']) == ["mart.transactions", "mart.users"]
+    assert mapping['table_id_mapping'] == {"100000": 200000, "100001": 200001}
+    assert "200002" not in new_snapshot['databases']['16']
+    print("✅ Only the changed tables were refetched and patched, in place")
+
+if __name__ == "__main__":
+    test_refresh_patches_only_changed_tables()
+    print("🎉 All tests PASSED!")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the batched MBQL field resolver, against the fake Metabase
+"""
+
+import json
+import os
+import tempfile
+from fake_metabase import FakeMetabaseServer, REPO_ROOT
+from field_resolver import FieldResolver, collect_mbql_ids
+from mapping_store import MappingStore
+from metabase_migrator import MetabaseConfig, MetabaseMigrator
+
+def test_resolves_missing_fields_once():
+    """Fields missing from the mapping are resolved by name with memoized fetches"""
+    print("🧪 Testing field resolver")
+    with open(os.path.join(REPO_ROOT, "migrations", "migration_mapping.json")) as f:
+        mapping = json.load(f)
+    dropped = dict(list(mapping["column_mapping"].items())[:20])
+    partial = dict(mapping, column_mapping={k: v for k, v in mapping["column_mapping"].items() if k not in dropped})
+
+    with tempfile.TemporaryDirectory() as tmp, FakeMetabaseServer() as server:
+        mapping_file = os.path.join(tmp, "migration_mapping.json")
+        with open(mapping_file, 'w') as f:
+            json.dump(partial, f)
+        store = MappingStore(os.path.join(tmp, "store.sqlite3"), mapping_file, os.path.join(tmp, "none.json"))
+
+        migrator = MetabaseMigrator(MetabaseConfig(server.base_url, "test@example.com", "secret"))
+        migrator.token_cache = None
+        assert migrator.authenticate()
+        resolver = FieldResolver(migrator, store.pair())
+
+        mbql = {"source-table": 1, "breakout": [["field", int(k), None] for k in dropped] + [["field", 999999999, None]]}
+        assert collect_mbql_ids(mbql) == ({int(k) for k in dropped} | {999999999}, {1})
+
+        requests_before = len(server.fake.request_log)
+        mapped, unmapped = resolver.map_fields(mbql)
+        assert [ref[1] for ref in mapped["breakout"][:-1]] == list(dropped.values())
+        assert unmapped == [999999999]
+        used = len(server.fake.request_log) - requests_before
+        print(f"✅ Resolved {len(dropped)} fields with {used} requests")
+
+        # A second question needing the same ids is served from the cache
+        requests_before = len(server.fake.request_log)
+        resolver.resolve_fields(int(k) for k in dropped)
+        assert len(server.fake.request_log) == requests_before
+        resolver.close()
+        store.close()
+
+if __name__ == "__main__":
+    test_resolves_missing_fields_once()
+    print("🎉 All tests PASSED!")
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for the SQLite mapping store and the mapping service
+"""
+
+import json
+import os
+import tempfile
+import time
+from mapping_store import MappingStore
+from mapping_service import MappingService
+
+MAPPING = {
+    "database_mapping": {"exasol": 2, "starrocks": 16},
+    "column_mapping": {"101": 901, "102": 902, "103": 902},
+    "table_mapping": {"mart.transactions": "MART__TRANSACTIONS"},
+    "table_id_mapping": {"45": 87255}
+}
+EXCEPTIONS = {"table_id_exceptions": {"104": 904}, "table_name_exceptions": {"analyst.sums": "MART__SUMS"}}
+
+def test_lookups_and_reload():
+    """Forward and reverse lookups, exceptions, and re-import on file change"""
+    print("🧪 Testing mapping store")
+    with tempfile.TemporaryDirectory() as tmp:
+        mapping_file = os.path.join(tmp, "migration_mapping.json")
+        exceptions_file = os.path.join(tmp, "migration_exceptions.json")
+        with open(mapping_file, 'w') as f:
+            json.dump(MAPPING, f)
+        with open(exceptions_file, 'w') as f:
+            json.dump(EXCEPTIONS, f)
+
+        store = MappingStore(os.path.join(tmp, "store.sqlite3"), mapping_file, exceptions_file)
+        mapping = store.pair()
+        assert mapping.target_database == 16
+        assert store.pair(target_db=16).pair_id == mapping.pair_id and store.pair(target_db=17) is None
+        assert store.pair(2, 16).pair_id == mapping.pair_id and store.pair(2, 17) is None
+        assert mapping.target_field(101) == 901 and mapping.target_field("104") == 904
+        assert mapping.target_field(999) is None
+        assert mapping.source_fields(902) == [102, 103]
+        assert mapping.target_table("MART.Transactions") == "MART__TRANSACTIONS"
+        assert mapping.target_table("analyst.sums") == "MART__SUMS"
+        assert mapping.source_tables("MART__TRANSACTIONS") == ["mart.transactions"]
+        assert mapping.target_table_id(45) == 87255 and mapping.target_table_id(1) is None
+        assert mapping.source_table_ids(87255) == [45]
+        assert mapping.as_migration_mapping()["column_mapping"] == {"101": 901, "102": 902, "103": 902, "104": 904}
+        print("✅ Lookups OK")
+
+        assert not store.sync(), "unchanged files are not re-imported"
+        changed = dict(MAPPING, column_mapping={"101": 911})
+        with open(mapping_file, 'w') as f:
+            json.dump(changed, f)
+        os.utime(mapping_file, (time.time() + 5, time.time() + 5))
+        assert store.sync()
+        assert mapping.target_field(101) == 911 and mapping.target_field(102) is None
+        store.close()
+        print("✅ Reload OK")
+
+def test_service_memoizes_until_file_changes():
+    print("🧪 Testing mapping service")
+    with tempfile.TemporaryDirectory() as tmp:
+        mapping_file = os.path.join(tmp, "migration_mapping.json")
+        config_file = os.path.join(tmp, "column_mapping_config.json")
+        with open(mapping_file, 'w') as f:
+            json.dump(MAPPING, f)
+        config = {"column_mappings": {"exasol_to_starrocks": {"A": "a"}},
+                  "dashboard_specific_mappings": {"7": {"additional_mappings": {"B": "b"}}}}
+        with open(config_file, 'w') as f:
+            json.dump(config, f)
+
+        store = MappingStore(os.path.join(tmp, "store.sqlite3"), mapping_file, os.path.join(tmp, "none.json"))
+        service = MappingService(store, config_file, os.path.join(tmp, "none.json"))
+        first = service.migration_mapping()
+        assert service.migration_mapping() is first
+        assert service.dashboard_column_mapping(7) == {"A": "a", "B": "b"}
+        assert service.dashboard_column_mapping(8) == {"A": "a"}
+
+        config["column_mappings"]["exasol_to_starrocks"]["A"] = "aa"
+        with open(config_file, 'w') as f:
+            json.dump(config, f)
+        os.utime(config_file, (time.time() + 5, time.time() + 5))
+        assert service.dashboard_column_mapping(7) == {"A": "aa", "B": "b"}
+
+        os.utime(mapping_file, (time.time() + 5, time.time() + 5))
+        assert service.migration_mapping() is not first
+        store.close()
+        print("✅ Service reloads only on change")
+
+if __name__ == "__main__":
+    test_lookups_and_reload()
+    test_service_memoizes_until_file_changes()
+    print("🎉 All tests PASSED!")
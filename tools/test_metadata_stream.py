@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming metadata parser
+"""
+
+import json
+from metadata_stream import iter_json_array_items, slim_table
+
+def make_metadata():
+    """Metadata payload with strings that look like JSON structure"""
+    return {
+        "description": 'not the "tables": [ {array} ]',
+        "tables": [
+            {
+                "id": table_id,
+                "name": f"T_{table_id}]}}\"",
+                "schema": "mart",
+                "fields": [
+                    {"id": table_id * 100 + i, "name": f"Cölumn_{i}", "fingerprint": {"x": [1, {"y": "]"}]}}
+                    for i in range(3)
+                ]
+            }
+            for table_id in range(20)
+        ],
+        "features": ["tables"]
+    }
+
+def test_stream_matches_full_parse():
+    """Every chunk size yields exactly the tables of a full json.loads"""
+    metadata = make_metadata()
+    raw = json.dumps(metadata).encode()
+
+    print("🧪 Testing streaming metadata parser")
+    for chunk_size in [1, 2, 7, 64, 4096]:
+        chunks = [raw[i:i + chunk_size] for i in range(0, len(raw), chunk_size)]
+        tables = list(iter_json_array_items(chunks, "tables"))
+        assert tables == metadata["tables"], f"chunk size {chunk_size}"
+        print(f"✅ Chunk size {chunk_size}: {len(tables)} tables")
+
+def test_empty_tables():
+    assert list(iter_json_array_items([b'{"id": 2, "tables": []}'])) == []
+
+def test_slim_table():
+    table = make_metadata()["tables"][0]
+    slim = slim_table(table)
+    assert slim["id"] == 0 and slim["schema"] == "mart"
+    assert "fingerprint" not in slim["fields"][0]
+    assert [f["id"] for f in slim["fields"]] == [0, 1, 2]
+
+if __name__ == "__main__":
+    test_stream_matches_full_parse()
+    test_empty_tables()
+    test_slim_table()
+    print("🎉 All tests PASSED!")
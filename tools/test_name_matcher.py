@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test script for the compiled table reference replacer and column alias normalizer
+"""
+
+import re
+import time
+from name_matcher import TableReferenceReplacer, alias_normalizer, table_replacer, trie_pattern
+
+TABLE_MAPPING = {
+    "mart.transactions": "MART__TRANSACTIONS",
+    "mart.transactions_daily": "MART__TRANSACTIONS_DAILY",
+    "raw.nuvei__movement_csv": "RAW__NUVEI__MOVEMENT_CSV",
+    "mart.users": "MART__USERS",
+}
+
+def test_trie_pattern_prefers_longest():
+    pattern = re.compile(r'\b' + trie_pattern(["ab", "abc", "abcd", "b"]) + r'\b', re.IGNORECASE)
+    assert pattern.findall("ABCD abc ab abx b") == ["ABCD", "abc", "ab", "b"]
+    print("✅ Trie pattern matches the longest name on word boundaries")
+
+def test_replacements():
+    print("🧪 Testing table reference replacement")
+    replacer = TableReferenceReplacer(TABLE_MAPPING)
+    sql = ("select transactions.id, 'mart.users' as label, \"users\" from MART.Transactions "
+           "join mart.TRANSACTIONS_DAILY d on 1=1 join raw.nuvei__movement_csv_unduplicated u on 1=1 "
+           "where users.id is null and Transactions.id > 0")
+    replaced, replacements, used = replacer.replace(sql)
+    assert replaced == ("select MART__TRANSACTIONS.id, 'mart.users' as label, \"users\" from MART__TRANSACTIONS "
+                        "join MART__TRANSACTIONS_DAILY d on 1=1 join raw.nuvei__movement_csv_unduplicated u on 1=1 "
+                        "where users.id is null and Transactions.id > 0")
+    assert used == {"MART__TRANSACTIONS", "MART__TRANSACTIONS_DAILY"}
+    assert ("transactions", "MART__TRANSACTIONS") in replacements
+    assert table_replacer(dict(TABLE_MAPPING)) is table_replacer(dict(TABLE_MAPPING))
+    print("✅ Qualified, bare and quoted references handled")
+
+def test_alias_normalizer():
+    normalizer = alias_normalizer(["Turnover_EUR", "count_users", "Turnover_EUR_1", None])
+    sql = ("select tr.TURNOVER_EUR, sum(turnover_eur_1) AS   TURNOVER_EUR_1, "
+           "count(*) as COUNT_USERS from t tr group by turnover_eur_10")
+    assert normalizer.normalize(sql) == ("select tr.Turnover_EUR, sum(Turnover_EUR_1) as Turnover_EUR_1, "
+                                         "count(*) as count_users from t tr group by turnover_eur_10")
+    assert alias_normalizer([]).normalize(sql) == sql
+    print("✅ Visualization columns normalized in one pass")
+
+def test_large_mappings():
+    """Unrelated mapping entries change nothing; the timings are printed for reference, not asserted"""
+    sql = open(__file__).read() * 5 + " from mart.transactions"
+    outputs, timings = [], []
+    for size in (50, 500):
+        mapping = dict(TABLE_MAPPING, **{f"schema_{i % 7}.table_{i}": f"SCHEMA__TABLE_{i}" for i in range(size)})
+        replacer = TableReferenceReplacer(mapping)
+        started = time.perf_counter()
+        for _ in range(20):
+            replaced, _, _ = replacer.replace(sql)
+        timings.append(time.perf_counter() - started)
+        outputs.append(replaced)
+    assert outputs[0] == outputs[1] and outputs[0].endswith(" from MART__TRANSACTIONS")
+    print(f"  ⏱️  50 tables: {timings[0] * 50:.2f} ms, 500 tables: {timings[1] * 50:.2f} ms per scan")
+    print("✅ Same replacements with 50 and 500 mapped tables")
+
+if __name__ == "__main__":
+    test_trie_pattern_prefers_longest()
+    test_replacements()
+    test_alias_normalizer()
+    test_large_mappings()
+    print("🎉 All tests PASSED!")
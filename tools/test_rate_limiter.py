@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the adaptive (AIMD) rate limiter, against the fake Metabase
+"""
+
+import requests
+from fake_metabase import FakeMetabase, FakeMetabaseServer
+from rate_limiter import AdaptiveRateLimiter, RateLimitedAdapter
+
+def make_limiter():
+    # A short max_interval keeps the back-off delays from slowing the test down
+    return AdaptiveRateLimiter(initial_concurrency=4, min_concurrency=1, max_concurrency=6,
+                               latency_target=1.0, max_interval=0.05)
+
+def test_back_off_and_ramp_up():
+    """Injected 503s halve the limit down to the minimum, fast responses raise it to the maximum"""
+    print("🧪 Testing adaptive rate limiter")
+    limiter = make_limiter()
+    fake = FakeMetabase(error_rate=1.0, seed=1)
+    with FakeMetabaseServer(fake) as server:
+        session = requests.Session()
+        session.mount("http://", RateLimitedAdapter(limiter))
+
+        limits = []
+        for _ in range(3):
+            assert session.get(f"{server.base_url}/api/user/current").status_code == 503
+            limits.append(limiter.limit)
+        assert limits == [2, 1, 1], "multiplicative decrease, clamped at min_concurrency"
+        assert limiter.interval == 0.05, "requests spaced out, at most max_interval apart"
+
+        fake.error_rate = 0.0
+        for _ in range(30):
+            session.get(f"{server.base_url}/api/user/current")
+        assert limiter.limit == 6 and limiter.interval == 0.0, "additive increase, clamped at max_concurrency"
+    print("✅ Back-off on 503, ramp-up on healthy latency, limits clamped")
+
+def test_slow_responses_back_off():
+    """Latency above the target shrinks the limit once per window of responses"""
+    limiter = make_limiter()
+    for _ in range(4):
+        limiter.record(3.0, 200)
+    assert limiter.limit == 2
+    limiter.record(3.0, 200)
+    assert limiter.limit == 2, "no second back-off within the same window"
+    limiter.record(3.0, 429, retry_after=0.01)
+    assert limiter.limit == 1
+    print("✅ Slow responses and 429s back off")
+
+if __name__ == "__main__":
+    test_back_off_and_ramp_up()
+    test_slow_responses_back_off()
+    print("🎉 All tests PASSED!")
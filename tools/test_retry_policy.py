@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-endpoint retry policies, against the fake Metabase
+"""
+
+import requests
+from fake_metabase import FakeMetabase, FakeMetabaseServer
+from metabase_migrator import MetabaseConfig, MetabaseMigrator
+from rate_limiter import AdaptiveRateLimiter
+from retry_policy import RetryingAdapter, RetryPolicy, call_with_retry, policy_for
+
+FAST = RetryPolicy(max_attempts=3, base_delay=0.01)
+
+def make_migrator(server):
+    migrator = MetabaseMigrator(MetabaseConfig(server.base_url, "test@example.com", "secret"))
+    migrator.token_cache = None
+    # A limiter of its own, so the injected errors do not back off the shared one
+    adapter = RetryingAdapter(AdaptiveRateLimiter(max_interval=0.05))
+    migrator.session.mount("http://", adapter)
+    assert migrator.authenticate()
+    return migrator
+
+def make_response(status: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    response._content_consumed = True  # nothing to release on close()
+    return response
+
+def failing_first(send, failures, status=503):
+    """Wrap send so its first calls answer `status`; with land=True they still reach the server"""
+    calls = []
+
+    def wrapped(*args, land=False, **kwargs):
+        calls.append(args[0])
+        if len(calls) <= failures:
+            if land:
+                send(*args, **kwargs)
+            return make_response(status)
+        return send(*args, **kwargs)
+    return wrapped, calls
+
+def test_call_with_retry():
+    print("🧪 Testing retry policies")
+    assert policy_for("GET", "http://mb/api/card/1").replay == "always"
+    assert policy_for("PUT", "http://mb/api/card/1").replay == "if_unchanged"
+    assert policy_for("POST", "http://mb/api/card").replay == "never"
+
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise requests.exceptions.ConnectionError("reset")
+        return make_response(200)
+    assert call_with_retry(flaky, FAST).status_code == 200 and len(attempts) == 3
+
+    statuses = iter([503, 429, 503])
+    assert call_with_retry(lambda: make_response(next(statuses)), FAST).status_code == 503, \
+        "the last response is returned once the policy is exhausted"
+
+    attempts.clear()
+    try:
+        call_with_retry(flaky, RetryPolicy(max_attempts=2, base_delay=0.01))
+        assert False, "the last error is raised once the policy is exhausted"
+    except requests.exceptions.ConnectionError:
+        assert len(attempts) == 2
+
+    attempts.clear()
+    try:
+        call_with_retry(flaky, FAST, can_replay=lambda: False)
+        assert False, "no replay when can_replay says no"
+    except requests.exceptions.ConnectionError:
+        assert len(attempts) == 1
+    print("✅ Retries until success, gives up when exhausted or not replayable")
+
+def test_adapter_replays_reads_only():
+    """GETs are replayed by the adapter until the policy runs out; PUT /api/card is left to the caller"""
+    fake = FakeMetabase(seed=1)
+    with FakeMetabaseServer(fake) as server:
+        migrator = make_migrator(server)
+        card_id = next(iter(fake.cards))
+        fake.error_rate = 1.0
+        before = len(fake.request_log)
+        assert migrator.session.get(f"{server.base_url}/api/card/{card_id}").status_code == 503
+        assert len(fake.request_log) - before == policy_for("GET", "/api/card/1").max_attempts
+
+        before = len(fake.request_log)
+        assert migrator.session.put(f"{server.base_url}/api/card/{card_id}", json={}).status_code == 503
+        assert len(fake.request_log) - before == 1
+    print("✅ GET replayed until exhausted, PUT sent once by the adapter")
+
+def test_card_update_replays_only_if_unchanged():
+    fake = FakeMetabase(seed=1)
+    with FakeMetabaseServer(fake) as server:
+        migrator = make_migrator(server)
+        card_id = next(iter(fake.cards))
+        real_put = migrator.session.put
+
+        # The 503 came before the server saw the PUT: updated_at is unchanged, so it is replayed
+        migrator.get_question_details(card_id)
+        migrator.session.put, calls = failing_first(real_put, 1)
+        assert migrator.update_question_details(card_id, {"description": "first"}).status_code == 200
+        assert len(calls) == 2 and fake.cards[card_id]['description'] == "first"
+
+        # The PUT landed and only its response was lost: updated_at moved, so it is not replayed
+        migrator.get_question_details(card_id)
+        put, calls = failing_first(real_put, 1)
+        migrator.session.put = lambda *args, **kwargs: put(*args, land=True, **kwargs)
+        assert migrator.update_question_details(card_id, {"description": "second"}).status_code == 503
+        assert len(calls) == 1 and fake.cards[card_id]['description'] == "second"
+    print("✅ PUT /api/card replayed only while updated_at is unchanged")
+
+if __name__ == "__main__":
+    test_call_with_retry()
+    test_adapter_replays_reads_only()
+    test_card_update_replays_only_if_unchanged()
+    print("🎉 All tests PASSED!")
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for rolling migrated cards back through the reverse mapping indexes
+"""
+
+import json
+import os
+import tempfile
+from catalog_index import CatalogIndex
+from mapping_store import MappingStore
+from rollback import CardRollback
+
+MAPPING = {
+    "database_mapping": {"exasol": 2, "starrocks": 16},
+    "column_mapping": {"101": 901, "102": 902, "103": 902},
+    "table_mapping": {"mart.transactions": "MART__TRANSACTIONS", "mart.users": "MART__USERS"},
+    "table_id_mapping": {"45": 87255, "46": 87256}
+}
+EXCEPTIONS = {"table_id_exceptions": {"101": 911}, "table_name_exceptions": {}}
+EXASOL = {"tables": [
+    {"id": 45, "schema": "MART", "name": "TRANSACTIONS", "fields": [{"id": 101, "table_id": 45}, {"id": 102, "table_id": 45}]},
+    {"id": 46, "schema": "MART", "name": "USERS", "fields": [{"id": 103, "table_id": 46}]},
+]}
+
+def make_rollback(tmp):
+    mapping_file = os.path.join(tmp, "migration_mapping.json")
+    exceptions_file = os.path.join(tmp, "migration_exceptions.json")
+    with open(mapping_file, 'w') as f:
+        json.dump(MAPPING, f)
+    with open(exceptions_file, 'w') as f:
+        json.dump(EXCEPTIONS, f)
+    store = MappingStore(os.path.join(tmp, "store.sqlite3"), mapping_file, exceptions_file)
+    return store, CardRollback(store.pair(), CatalogIndex(EXASOL))
+
+def test_rollback_native_and_mbql_cards():
+    """Table names, table ids, field ids, template tags and parameter mappings go back to Exasol"""
+    print("🧪 Testing card rollback")
+    with tempfile.TemporaryDirectory() as tmp:
+        store, rollback = make_rollback(tmp)
+        assert store.pair().source_fields(911) == [101] and store.pair().source_fields(901) == []
+
+        native = {"dataset_query": {"type": "native", "database": 16, "native": {
+            "query": "select * from MART__USERS u join MART__TRANSACTIONS t on t.id = u.id where {{status}}",
+            "template-tags": {"status": {"type": "dimension", "dimension": ["field", 902, None]}}}},
+            "parameter_mappings": [{"target": ["dimension", ["field", 911, None]]}]}
+        update = rollback.rollback_card(native)
+        query = update["dataset_query"]
+        assert query["database"] == 2
+        assert query["native"]["query"] == "select * from MART.USERS u join MART.TRANSACTIONS t on t.id = u.id where {{status}}"
+        # 902 came from 102 (TRANSACTIONS) and 103 (USERS): both tables are used, so the first wins
+        assert query["native"]["template-tags"]["status"]["dimension"] == ["field", 102, None]
+        assert update["parameter_mappings"][0]["target"] == ["dimension", ["field", 101, None]]
+        assert native["dataset_query"]["database"] == 16, "the card itself is not modified"
+        assert rollback.rollback_sql("""select 'MART__USERS', "MART__USERS".id from MART__USERS""") == (
+            """select 'MART__USERS', "MART__USERS".id from MART.USERS"""), "literals and quoted names are kept"
+        assert rollback.rollback_card(native, "SELECT * FROM MART.USERS")["dataset_query"]["native"]["query"] == (
+            "SELECT * FROM MART.USERS")
+
+        mbql = {"dataset_query": {"type": "query", "database": 16, "query": {
+            "source-table": 87256, "breakout": [["field", 902, {"temporal-unit": "day"}]]}}}
+        query = rollback.rollback_card(mbql)["dataset_query"]["query"]
+        assert query == {"source-table": 46, "breakout": [["field", 103, {"temporal-unit": "day"}]]}
+        assert len(rollback.ambiguous) == 1 and not rollback.unmapped
+        store.close()
+        print("✅ Rollback OK")
+
+if __name__ == "__main__":
+    test_rollback_native_and_mbql_cards()
+    print("🎉 All tests PASSED!")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test script for the on-disk session token cache, against the fake Metabase
+"""
+
+import os
+import stat
+import tempfile
+from fake_metabase import FakeMetabase, FakeMetabaseServer
+from metabase_migrator import MetabaseConfig, MetabaseMigrator
+from session_cache import SessionTokenCache
+
+def test_file_mode_and_expiry():
+    print("🧪 Testing session token cache")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache", "sessions.json")
+        cache = SessionTokenCache(path, ttl_seconds=3600)
+        cache.store("http://mb/", "user", "token-1")
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert os.listdir(os.path.dirname(path)) == ["sessions.json"], "no temporary file left behind"
+        assert cache.get("http://mb", "user") == "token-1" and cache.get("http://mb", "other") is None
+
+        expired = SessionTokenCache(path, ttl_seconds=0)
+        expired.store("http://mb", "other", "token-2")
+        assert expired.get("http://mb", "other") is None
+        cache.discard("http://mb", "user")
+        assert cache.get("http://mb", "user") is None
+    print("✅ Cache file is 0600; expired and discarded tokens are not returned")
+
+def test_stale_token_falls_back_to_login():
+    """A token the server rejects is discarded and replaced by a fresh login"""
+    fake = FakeMetabase()
+    with FakeMetabaseServer(fake) as server, tempfile.TemporaryDirectory() as tmp:
+        cache = SessionTokenCache(os.path.join(tmp, "sessions.json"), ttl_seconds=3600)
+        cache.store(server.base_url, "test@example.com", "stale-token")
+
+        def authenticate():
+            migrator = MetabaseMigrator(MetabaseConfig(server.base_url, "test@example.com", "secret"))
+            migrator.token_cache = cache
+            before = len(fake.request_log)
+            assert migrator.authenticate()
+            return migrator.session_token, fake.request_log[before:].count(("POST", "/api/session"))
+
+        token, logins = authenticate()
+        assert token != "stale-token" and logins == 1
+        assert cache.get(server.base_url, "test@example.com") == token
+        # The next run reuses the fresh token without logging in
+        assert authenticate() == (token, 0)
+    print("✅ Stale token rejected, login() fallback cached its token")
+
+if __name__ == "__main__":
+    test_file_mode_and_expiry()
+    test_stale_token_falls_back_to_login()
+    print("🎉 All tests PASSED!")
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test script for the single-pass SQL rewriter
+"""
+
+from sql_rewriter import SQLRewriter, tokenize
+
+def test_tokens_cover_sql():
+    sql = "select 'it''s -- no comment', \"Col\" -- note\nfrom t /* x */ where {{var}} [[and a = 1]]"
+    tokens = tokenize(sql)
+    assert ''.join(tokens) == sql
+    assert "'it''s -- no comment'" in tokens and "{{var}}" in tokens and "[[" in tokens
+    print("✅ Tokens cover the SQL exactly")
+
+def test_function_rewrites():
+    print("🧪 Testing function rewrites")
+    rewriter = SQLRewriter()
+    sql = ("select NULLIFZERO(a), zeroifnull(b), to_char(created_at), convert(varchar, x), "
+           "json_value(t.FEE_PARAMETERS, '$.markup'), listagg(name, ','), "
+           "median(coalesce(a, b)), PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY fee), "
+           "date_trunc(gran.granularity, t.created_at) as grouping, "
+           "sum(a) over (partition by 1) "
+           "from (select * from t) where x = 'to_char(y)' -- median(z)")
+    rewritten = rewriter.rewrite(sql)
+    for expected in ("NULLIF(cast(a as float), 0)", "ifnull(b, 0)", "char(created_at)", "cast(varchar, x)",
+                     "parse_json(t.FEE_PARAMETERS)->'$.markup'", "group_concat(name, ',')",
+                     "PERCENTILE_CONT(coalesce(a, b), 0.5)", "PERCENTILE_CONT(fee, 0.5)",
+                     "date_trunc({{granularity}}, t.created_at) as grouped", "sum(a) OVER ()",
+                     "from (select * from t) as subquery"):
+        assert expected in rewritten, expected
+    # String literals and comments are left alone
+    assert rewritten.endswith("where x = 'to_char(y)' -- median(z)")
+    print("✅ Function and keyword rewrites OK")
+
+def test_casts_follow_float_cast():
+    rewriter = SQLRewriter(float_cast=lambda expression: 'decimal' not in expression)
+    sql = ("select NULLIF(count(case when a then 1 end), 0), sum(x)/sum(y), "
+           "sum(decimal_x)/sum(y), count(distinct u) over (partition by d) from t full outer join s on 1=1")
+    rewritten = rewriter.rewrite(sql)
+    assert "NULLIF(cast(count(case when a then 1 end) as float), 0)" in rewritten
+    assert "sum(x)/cast(sum(y) as float)" in rewritten
+    assert "sum(decimal_x)/sum(y)" in rewritten and rewriter.skipped_casts == 1
+    assert len(rewriter.warnings) == 2
+    print("✅ Casts follow float_cast, warnings reported")
+
+if __name__ == "__main__":
+    test_tokens_cover_sql()
+    test_function_rewrites()
+    test_casts_follow_float_cast()
+    print("🎉 All tests PASSED!")
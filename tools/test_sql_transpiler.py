@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Test script for the parser-backed (ast mode) SQL transpiler
+"""
+
+from sql_transpiler import Call, Group, SQLTranspiler, parse, render
+
+def test_parse_round_trip():
+    sql = ("select f (a, (b + 1)), x in (1, 2), 'g(' from t -- h(\n"
+           "where {{var}} [[and y = {{y}}]] and z = (select max(z) from u")
+    tree = parse(sql)
+    assert render(tree) == sql
+    call = next(node for node in tree if isinstance(node, Call))
+    assert call.name == "f" and call.gap == " " and len(call.arguments) == 2
+    assert isinstance(call.arguments[1][1], Group)
+    assert any(isinstance(node, Group) for node in tree[tree.index(call):])
+    print("✅ Parse tree prints back exactly")
+
+def test_tree_transforms():
+    print("🧪 Testing tree transforms")
+    transpiler = SQLTranspiler()
+    sql = ("SELECT TOP 10 MEDIAN(coalesce(a, b)) as m, to_char(cast(x as date), 'YYYY-MM') as month, "
+           "ADD_MONTHS(current_date, -6), INSTR(name, 'x'), CONVERT(varchar(10), d), "
+           "listagg(name, ', ') within group (order by name) "
+           "from (select top 3 b from t) where c = {{var}} [[and y = {{y}}]] and s = 'median(z)';\n-- top 5")
+    assert transpiler.rewrite(sql) == (
+        "SELECT PERCENTILE_CONT(coalesce(a, b), 0.5) as m, date_format(cast(x as date), '%Y-%m') as month, "
+        "DATE_ADD(CURDATE(), INTERVAL -6 MONTH), LOCATE('x', name), CAST(d AS varchar(10)), "
+        "group_concat(name ORDER BY name SEPARATOR ', ') "
+        "from (select b from t LIMIT 3) where c = {{var}} [[and y = {{y}}]] and s = 'median(z)' LIMIT 10;\n-- top 5")
+    assert transpiler.rewrite("select * from t limit 10 offset 20") == "select * from t limit 20, 10"
+    print("✅ Functions, casts, median and TOP/LIMIT rewritten; Metabase syntax kept")
+
+def test_casts_and_warnings():
+    transpiler = SQLTranspiler(float_cast=lambda expression: 'decimal' not in expression)
+    sql = ("select NULLIFZERO(count(*)), sum(x)/sum(y), sum(decimal_x)/sum(y), to_char(d, fmt), "
+           "sum(a) over (partition by 1) from t union all select top 5 1 from u")
+    rewritten = transpiler.rewrite(sql)
+    assert "NULLIF(cast(count(*) as float), 0)" in rewritten
+    assert "sum(x)/cast(sum(y) as float)" in rewritten and "sum(decimal_x)/sum(y)" in rewritten
+    assert "sum(a) over ()" not in rewritten and "OVER ()" in rewritten and "top 5" in rewritten
+    assert transpiler.skipped_casts == 1 and len(transpiler.warnings) == 2
+    print("✅ Casts follow float_cast, unsupported constructs reported")
+
+def test_rules_leave_lookalikes_alone():
+    """Number formats, qualified column names and GROUPING SETS are not rewritten"""
+    transpiler = SQLTranspiler()
+    sql = ("select to_char(amount, '999.99'), to_char(d, 'DD.MM.YYYY'), t.current_date, current_date, "
+           "x as grouping from t group by grouping sets ((a), (b))")
+    assert transpiler.rewrite(sql) == (
+        "select to_char(amount, '999.99'), date_format(d, '%d.%m.%Y'), t.current_date, CURDATE(), "
+        "x as grouped from t group by grouping sets ((a), (b))")
+    assert transpiler.warnings == ["to_char() with format '999.99' needs a manual rewrite"]
+    print("✅ Number formats, t.current_date and GROUPING SETS kept")
+
+if __name__ == "__main__":
+    test_parse_round_trip()
+    test_tree_transforms()
+    test_casts_and_warnings()
+    test_rules_leave_lookalikes_alone()
+    print("🎉 All tests PASSED!")